@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Memory footprint benchmark for the image cache and catalog.
+
+Compares the previous representation (a dataclass with an instance dict per image
+that repeats its path, plus a list of path strings per monitor) with the current
+one (slotted ImageInfo keyed by path, interned ImageCatalog and array-backed
+monitor pools). Both caches are loaded from the same cache file, so the numbers
+include every string the loader creates.
+
+    python benchmarks/bench_memory.py --images 500000 --monitors 3
+"""
+
+import argparse
+import gc
+import json
+import tempfile
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from rotato.cache import ImageCache
+from rotato.catalog import ImageCatalog
+
+
+@dataclass
+class LegacyImageInfo:
+    """ImageInfo as it was before slots, repeating the path it is keyed by"""
+
+    path: str
+    width: int
+    height: int
+    aspect_ratio: float
+    brightness: float
+    file_size: int
+    last_modified: float
+    content_id: Optional[str] = None
+    last_seen: float = 0.0
+    focal_x: float = 0.5
+    focal_y: float = 0.5
+    analysis_version: int = 0
+
+
+def synthetic_paths(count: int, files_per_dir: int = 200) -> List[str]:
+    """Realistic-looking absolute paths spread over nested folders"""
+    return [
+        f"/mnt/nas/photos/library/{i // (files_per_dir * 50):03d}/"
+        f"{(i // files_per_dir) % 50:03d}/IMG_{i:08d}.jpg"
+        for i in range(count)
+    ]
+
+
+def write_cache_file(path: Path, paths: List[str]):
+    """Cache file in the layout written before entries dropped their path"""
+    entries = {
+        image_path: {
+            "path": image_path,
+            "width": 3840,
+            "height": 2160,
+            "aspect_ratio": 1.78,
+            "brightness": 120.0 + i % 50,
+            "file_size": 2_500_000 + i,
+            "last_modified": 1.7e9 + i,
+            "content_id": f"{2_500_000 + i}:{1_700_000_000 + i}:{i:032x}",
+            "last_seen": 1.7e9,
+            "focal_x": 0.5,
+            "focal_y": 0.5,
+            "analysis_version": 1,
+        }
+        for i, image_path in enumerate(paths)
+    }
+    path.write_text(json.dumps({"version": 2, "entries": entries}), encoding="utf-8")
+
+
+def load_legacy(cache_file: Path):
+    """What the previous load_cache kept: entries and the content index"""
+    with open(cache_file, "r", encoding="utf-8") as f:
+        entries = json.load(f)["entries"]
+    cache = {path: LegacyImageInfo(**info) for path, info in entries.items()}
+    content_index = {info.content_id: path for path, info in cache.items()}
+    return cache, content_index
+
+
+def legacy_pools(paths: List[str], monitors: int):
+    # Each pool held its own path strings (discovery produced fresh str objects)
+    return {
+        f"monitor{m}": [path.encode().decode() for path in paths] for m in range(monitors)
+    }
+
+
+def current_pools(paths: List[str], monitors: int):
+    catalog = ImageCatalog()
+    pools = {
+        f"monitor{m}": catalog.intern_many(path.encode().decode() for path in paths)
+        for m in range(monitors)
+    }
+    return catalog, pools
+
+
+def measure(build: Callable[[], object]) -> int:
+    """Bytes still allocated while holding the built structure"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def run(images: int, monitors: int) -> Dict[str, int]:
+    paths = synthetic_paths(images)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache_file = Path(tmpdir) / "cache.json"
+        write_cache_file(cache_file, paths)
+        legacy_cache = measure(lambda: load_legacy(cache_file))
+        current_cache = measure(lambda: ImageCache(str(cache_file)))
+    legacy_pool = measure(lambda: legacy_pools(paths, monitors))
+    current_pool = measure(lambda: current_pools(paths, monitors))
+    return {
+        "legacy_cache_bytes": legacy_cache,
+        "legacy_pools_bytes": legacy_pool,
+        "legacy_total_bytes": legacy_cache + legacy_pool,
+        "current_cache_bytes": current_cache,
+        "current_pools_bytes": current_pool,
+        "current_total_bytes": current_cache + current_pool,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", type=int, default=100_000)
+    parser.add_argument("--monitors", type=int, default=3)
+    args = parser.parse_args()
+
+    result = run(args.images, args.monitors)
+    mib = 1024 * 1024
+    print(f"{args.images} images, {args.monitors} monitors")
+    for part in ("cache", "pools", "total"):
+        legacy = result[f"legacy_{part}_bytes"]
+        current = result[f"current_{part}_bytes"]
+        print(
+            f"  {part:6} legacy {legacy / mib:8.1f} MiB   current {current / mib:8.1f} MiB"
+            f"   ({100 * (1 - current / legacy):.0f}% smaller)"
+        )
+
+
+if __name__ == "__main__":
+    main()
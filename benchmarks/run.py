@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Reproducible performance benchmarks for Rotato.
+
+Generates a synthetic image library, times the main pipeline stages and writes
+the results as JSON. Pass --baseline to compare against an earlier run and exit
+non-zero when a case got slower than the allowed tolerance. A baseline made with
+different library settings (images, resolutions, formats, ...) is refused.
+
+    python benchmarks/run.py --images 500 --output results.json
+    python benchmarks/run.py --images 500 --baseline baseline.json --tolerance 0.25
+    python benchmarks/run.py --resolutions 7680x4320,1280x720 --formats .jpg,.tif
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import yaml
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synth import DEFAULT_FORMATS, DEFAULT_RESOLUTIONS, generate_library  # noqa: E402
+
+from rotato.cache import ImageCache  # noqa: E402
+from rotato.config import FilterConfig  # noqa: E402
+from rotato.images import ImageManager  # noqa: E402
+from rotato.monitors import MonitorInfo, MonitorManager  # noqa: E402
+from rotato.platform.fake import FakeMonitorDetector, FakeWallpaperSetter  # noqa: E402
+
+FORMATS = [".jpg", ".jpeg", ".png", ".webp"]
+
+# Run settings that change what is measured; a baseline must match them
+WORKLOAD_KEYS = ("images", "resolutions", "formats", "depth", "fanout", "seed")
+
+# Run settings that only change how fast it runs
+ENVIRONMENT_KEYS = ("python", "platform")
+
+FILTER_CASES = {
+    "none": FilterConfig(),
+    "resolution": FilterConfig(min_width=1920, min_height=1080),
+    "aspect": FilterConfig(aspect_ratios=[1.78, 0.56], aspect_ratio_tolerance=0.1),
+    "all": FilterConfig(
+        min_width=1920,
+        min_height=1080,
+        aspect_ratios=[1.78],
+        brightness_range=(50, 200),
+        max_file_size_mb=10,
+    ),
+}
+
+MONITOR = MonitorInfo(handle=0, width=1920, height=1080, x=0, y=0, is_primary=True, name="bench")
+
+
+def time_case(func: Callable[[], object], repeat: int, setup: Optional[Callable] = None) -> Dict:
+    """Run ``func`` ``repeat`` times and summarize wall-clock durations"""
+    runs = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return {"median_s": statistics.median(runs), "min_s": min(runs), "runs": len(runs)}
+
+
+def run_benchmarks(workdir: Path, args) -> Dict[str, Dict]:
+    library = workdir / "library"
+    print(f"Generating {args.images} images (depth {args.depth}, fan-out {args.fanout})...")
+    generate_library(
+        library,
+        args.images,
+        resolutions=args.resolutions,
+        formats=args.formats,
+        depth=args.depth,
+        fanout=args.fanout,
+        seed=args.seed,
+    )
+    formats = sorted(set(FORMATS) | set(args.formats))
+
+    cache_file = workdir / "image_cache.json"
+    results: Dict[str, Dict] = {}
+
+    def fresh_cache() -> ImageCache:
+        cache_file.unlink(missing_ok=True)
+        return ImageCache(str(cache_file))
+
+    manager = ImageManager(fresh_cache(), formats, max_depth=10)
+
+    results["discover_images_cold"] = time_case(
+        lambda: manager.discover_images([str(library)]), repeat=1
+    )
+    results["discover_images_warm"] = time_case(
+        lambda: manager.discover_images([str(library)]), args.repeat
+    )
+    paths = manager.discover_images([str(library)])
+
+    def analyze_all():
+        for path in paths:
+            manager.cache.get_image_info(path)
+
+    def reset_cache():
+        manager.cache = fresh_cache()
+
+    results["get_image_info_cold"] = time_case(analyze_all, args.repeat, setup=reset_cache)
+    results["get_image_info_warm"] = time_case(analyze_all, args.repeat)
+
+    for name, filters in FILTER_CASES.items():
+        results[f"filter_images_{name}"] = time_case(
+            lambda filters=filters: manager.filter_images(paths, filters, MONITOR), args.repeat
+        )
+
+    results["save_cache"] = time_case(manager.cache.save_cache, args.repeat)
+    results["load_cache"] = time_case(lambda: ImageCache(str(cache_file)), args.repeat)
+
+    # Full catalog build through the application class
+    from rotato.core import DesktopBackgroundManager
+
+    config_path = workdir / "config.yaml"
+    config = {
+        "global": {
+            "rotation_interval_minutes": 10,
+            "cache_file": str(cache_file),
+            "stats_file": None,
+            "history_file": str(workdir / "history.jsonl"),
+            "selection_state_file": str(workdir / "selection_state.json"),
+            "max_recursion_depth": 10,
+            "supported_formats": formats,
+            "hotkeys": {},
+        },
+        "monitors": [
+            {
+                "monitor_name": "auto",
+                "image_sources": [str(library)],
+                "filters": {"min_width": 1920, "min_height": 1080},
+            }
+        ],
+    }
+    config_path.write_text(yaml.dump(config), encoding="utf-8")
+
+    def build_app():
+        return DesktopBackgroundManager(
+            str(config_path), monitor_manager=MonitorManager(FakeMonitorDetector([MONITOR]))
+        )
+
+    app = None
+
+    def cold_app():
+        nonlocal app
+        cache_file.unlink(missing_ok=True)
+        app = build_app()
+
+    def warm_app():
+        nonlocal app
+        app = build_app()
+
+    results["discover_and_filter_images_cold"] = time_case(
+        lambda: app.discover_and_filter_images(), args.repeat, setup=cold_app
+    )
+    results["discover_and_filter_images_warm"] = time_case(
+        lambda: app.discover_and_filter_images(), args.repeat, setup=warm_app
+    )
+
+    # Selection, wallpaper setting and history for a tick, without a desktop
+    app.wallpaper_manager.setter = FakeWallpaperSetter()
+    app.is_running = True
+
+    def rotate_ticks():
+        # Each tick prints the wallpaper it sets
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for _ in range(100):
+                app.rotate_wallpapers([MONITOR.name])
+        app.stop_rotation()
+        app.is_running = True
+
+    results["rotate_100_ticks"] = time_case(rotate_ticks, args.repeat)
+    app.stop_rotation()
+
+    # A week of rotation on three monitors against the virtual clock
+    from rotato.simulate import simulate
+
+    results["simulate_week_3_monitors"] = time_case(
+        lambda: simulate(
+            images=args.images,
+            monitors="1920x1080,1920x1080,1080x1920",
+            days=7,
+            interval_minutes=5,
+            seed=args.seed,
+        ),
+        args.repeat,
+    )
+    return results
+
+
+def compare(
+    results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float, min_delta: float
+) -> List[str]:
+    """Names of cases whose median got slower than the baseline by more than ``tolerance``
+
+    Slowdowns smaller than ``min_delta`` seconds are treated as timer noise.
+    """
+    regressions = []
+    print(f"\n{'case':40} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]["median_s"]
+        after = result["median_s"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > tolerance and after - before > min_delta:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:40} {before:10.4f} {after:10.4f} {change:+8.1%}{flag}")
+    return regressions
+
+
+def meta_differences(meta: Dict, baseline_meta: Dict, keys: Tuple[str, ...]) -> List[str]:
+    """Descriptions of the ``keys`` whose values differ between two runs"""
+    return [
+        f"{key}: baseline {baseline_meta.get(key)!r}, current {meta.get(key)!r}"
+        for key in keys
+        if meta.get(key) != baseline_meta.get(key)
+    ]
+
+
+def parse_resolutions(text: str) -> List[Tuple[int, int]]:
+    """``1920x1080,3840x2160`` as a list of (width, height)"""
+    resolutions = []
+    for item in text.split(","):
+        width, _, height = item.strip().lower().partition("x")
+        try:
+            size = (int(width), int(height))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {item!r}") from None
+        if min(size) < 1:
+            raise argparse.ArgumentTypeError(f"resolution must be positive, got {item!r}")
+        resolutions.append(size)
+    return resolutions
+
+
+def parse_formats(text: str) -> List[str]:
+    """``.jpg,png`` as a list of extensions Pillow can write"""
+    formats = []
+    for item in text.split(","):
+        fmt = "." + item.strip().lower().lstrip(".")
+        if Image.registered_extensions().get(fmt) not in Image.SAVE:
+            raise argparse.ArgumentTypeError(f"Pillow can't write {fmt} files")
+        formats.append(fmt)
+    return formats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", type=int, default=200, help="library size")
+    parser.add_argument(
+        "--resolutions",
+        type=parse_resolutions,
+        default=list(DEFAULT_RESOLUTIONS),
+        help="comma-separated image sizes, e.g. 1920x1080,3840x2160",
+    )
+    parser.add_argument(
+        "--formats",
+        type=parse_formats,
+        default=list(DEFAULT_FORMATS),
+        help="comma-separated file extensions, e.g. .jpg,.png",
+    )
+    parser.add_argument("--depth", type=int, default=2, help="directory depth")
+    parser.add_argument("--fanout", type=int, default=4, help="subdirectories per level")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown")
+    parser.add_argument(
+        "--min-delta", type=float, default=0.005, help="ignore slowdowns below this (seconds)"
+    )
+    args = parser.parse_args()
+
+    meta = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "images": args.images,
+        "resolutions": [f"{width}x{height}" for width, height in args.resolutions],
+        "formats": args.formats,
+        "depth": args.depth,
+        "fanout": args.fanout,
+        "seed": args.seed,
+        "repeat": args.repeat,
+    }
+    baseline = None
+    if args.baseline:
+        # Check before spending minutes on a run that can't be compared
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        mismatched = meta_differences(meta, baseline.get("meta", {}), WORKLOAD_KEYS)
+        if mismatched:
+            print(f"Baseline {args.baseline} measured a different workload:")
+            for line in mismatched:
+                print(f"  {line}")
+            print("Rerun with the baseline's settings to compare.")
+            sys.exit(2)
+        for line in meta_differences(meta, baseline.get("meta", {}), ENVIRONMENT_KEYS):
+            print(f"Warning: baseline ran elsewhere ({line})")
+
+    with tempfile.TemporaryDirectory(prefix="rotato-bench-") as tmpdir:
+        results = run_benchmarks(Path(tmpdir), args)
+
+    report = {"meta": meta, "results": results}
+
+    print(f"\n{'case':40} {'median':>10} {'min':>10}")
+    for name, result in results.items():
+        print(f"{name:40} {result['median_s']:10.4f} {result['min_s']:10.4f}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\nResults written to {args.output}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline["results"], args.tolerance, args.min_delta)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
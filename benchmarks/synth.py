@@ -0,0 +1,65 @@
+"""Synthetic image library generator for benchmarks."""
+
+import random
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+from PIL import Image, ImageDraw
+
+DEFAULT_RESOLUTIONS = ((1920, 1080), (2560, 1440), (3840, 2160), (1080, 1920), (1280, 720))
+DEFAULT_FORMATS = (".jpg", ".png", ".webp")
+LOSSY_FORMATS = (".jpg", ".jpeg", ".webp")
+
+
+def _directories(root: Path, depth: int, fanout: int) -> List[Path]:
+    """All leaf directories of a tree with the given depth and fan-out"""
+    level = [root]
+    for _ in range(depth):
+        level = [parent / f"d{i:02d}" for parent in level for i in range(fanout)]
+    return level
+
+
+def _render(rng: random.Random, size: Tuple[int, int]) -> Image.Image:
+    """A cheap image with some structure so encoders and filters do real work"""
+    image = Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    width, height = size
+    for _ in range(6):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        x1, y1 = x0 + rng.randrange(width // 2 + 1), y0 + rng.randrange(height // 2 + 1)
+        draw.rectangle((x0, y0, x1, y1), fill=tuple(rng.randrange(256) for _ in range(3)))
+    return image
+
+
+def generate_library(
+    root: Path,
+    count: int,
+    resolutions: Sequence[Tuple[int, int]] = DEFAULT_RESOLUTIONS,
+    formats: Sequence[str] = DEFAULT_FORMATS,
+    depth: int = 2,
+    fanout: int = 4,
+    seed: int = 0,
+) -> List[str]:
+    """Generate ``count`` images under ``root`` and return their paths
+
+    Images are spread round-robin over a directory tree ``depth`` levels deep
+    with ``fanout`` subdirectories per level. The same arguments always produce
+    the same library.
+    """
+    rng = random.Random(seed)
+    directories = _directories(Path(root), depth, fanout)
+    for directory in directories:
+        directory.mkdir(parents=True, exist_ok=True)
+
+    paths = []
+    for i in range(count):
+        size = resolutions[rng.randrange(len(resolutions))]
+        fmt = formats[rng.randrange(len(formats))]
+        path = directories[i % len(directories)] / f"img_{i:06d}{fmt}"
+        image = _render(rng, size)
+        if fmt in LOSSY_FORMATS:
+            image.save(path, quality=85)
+        else:
+            image.save(path)
+        paths.append(str(path))
+    return paths
@@ -6,6 +6,14 @@ A lightweight wallpaper rotation program with multi-monitor support and filterin
 __version__ = "0.1.0"
 __author__ = "Your Name"
 
-from .core import DesktopBackgroundManager
-
 __all__ = ["DesktopBackgroundManager", "__version__"]
+
+
+def __getattr__(name):
+    # Imported lazily so command-line tools that don't need the desktop
+    # (indexing, stats) don't pull in the tray and hotkey modules
+    if name == "DesktopBackgroundManager":
+        from .core import DesktopBackgroundManager
+
+        return DesktopBackgroundManager
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
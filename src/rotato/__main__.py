@@ -1,8 +1,11 @@
 """Entry point for Rotato."""
 
+import argparse
+import os
 import sys
+import time
+from collections import Counter
 
-from .core import DesktopBackgroundManager
 from .platform import check_platform_support
 
 
@@ -60,6 +63,360 @@ def remove_autostart():
         print(f"Error removing autostart: {e}")
 
 
+def compact_cache(config_path: str = "config.yaml"):
+    """Prune and compact the image cache"""
+    from .cache import ImageCache
+
+    config = load_cli_config(config_path)
+    global_config = config["global"]
+    cache = ImageCache(global_config["cache_file"])
+    report = cache.prune(
+        max_age_days=global_config.get("cache_max_age_days"),
+        max_entries=global_config.get("cache_max_entries"),
+        max_size_mb=global_config.get("cache_max_size_mb"),
+    )
+    cache.save_cache()
+    print(report.summary())
+
+
+def show_stats(prometheus: bool = False, config_path: str = "config.yaml"):
+    """Print performance stats written by the running application"""
+    from .metrics import format_prometheus, format_summary, load_snapshot
+
+    config = load_cli_config(config_path)
+    stats_file = config["global"].get("stats_file", "rotato_stats.json")
+    try:
+        snapshot = load_snapshot(stats_file)
+    except FileNotFoundError:
+        print(f"No stats found at {stats_file}. Run Rotato first.")
+        return
+    except Exception as e:
+        print(f"Error reading stats: {e}")
+        return
+
+    print(format_prometheus(snapshot) if prometheus else format_summary(snapshot))
+
+
+def load_cli_config(config_path: str):
+    """Load the config file without creating a default one"""
+    from .config import ConfigError, ConfigManager
+
+    manager = ConfigManager(config_path)
+    if not manager.config_path.exists():
+        return manager.default_config
+    try:
+        return manager.load_config()
+    except ConfigError as e:
+        print(f"Error loading config: {e}")
+        sys.exit(1)
+
+
+class ProgressReporter:
+    """Prints throughput and ETA for long-running batch work"""
+
+    def __init__(self, label: str, interval: float = 0.5):
+        self.label = label
+        self.interval = interval
+        self.start = time.monotonic()
+        self.last_print = 0.0
+
+    def __call__(self, done: int, total: int):
+        now = time.monotonic()
+        if done < total and now - self.last_print < self.interval:
+            return
+        self.last_print = now
+        elapsed = now - self.start
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = (total - done) / rate if rate > 0 else 0.0
+        percent = 100 * done / total if total else 100.0
+        print(
+            f"\r  {self.label}: {done}/{total} ({percent:.1f}%)  {rate:.1f}/s  "
+            f"ETA {time.strftime('%H:%M:%S', time.gmtime(eta))}",
+            end="\n" if done >= total else "",
+            flush=True,
+        )
+
+
+def index_command(argv):
+    """Discover and analyze images into the cache without starting the desktop app"""
+    from .cache import ImageCache
+    from .config import MonitorConfig, monitor_sources
+    from .decode import DecodePolicy
+    from .images import ImageManager
+    from .thumbs import THUMBNAIL_SIZE
+
+    parser = argparse.ArgumentParser(
+        prog="rotato index", description="Pre-warm the image cache for the given sources"
+    )
+    parser.add_argument("sources", nargs="*", help="folders or images (default: from config)")
+    parser.add_argument("--config", default="config.yaml", help="config file to read")
+    parser.add_argument("--cache-file", help="cache file to update (default: from config)")
+    parser.add_argument("--workers", type=int, help="decoder processes (default: all cores)")
+    parser.add_argument("--no-recursive", action="store_true", help="don't scan subfolders")
+    parser.add_argument(
+        "--background",
+        action="store_true",
+        help="run at idle priority within the background_indexing budget",
+    )
+    parser.add_argument("--max-images-per-sec", type=float, help="analysis budget (images/s)")
+    parser.add_argument("--max-mb-per-sec", type=float, help="analysis budget (MB/s read)")
+    args = parser.parse_args(argv)
+
+    config = load_cli_config(args.config)
+    global_config = config["global"]
+    if args.sources:
+        sources = [(source, not args.no_recursive) for source in args.sources]
+    else:
+        # Scan like the app: each monitor's sources with its own recursive setting
+        sources = sorted(
+            {
+                (source, recursive and not args.no_recursive)
+                for monitor in config["monitors"]
+                for source, recursive in monitor_sources(MonitorConfig(**monitor))
+            }
+        )
+    cache = ImageCache(args.cache_file or global_config["cache_file"])
+    cache.decode_policy = DecodePolicy.from_config(global_config.get("decode"))
+    cache.isolate_decodes = True
+    cache.thumbnail_size = global_config.get("thumbnail_size", THUMBNAIL_SIZE)
+    image_manager = ImageManager(
+        cache, global_config["supported_formats"], global_config["max_recursion_depth"]
+    )
+
+    workers = args.workers
+    if args.background or args.max_images_per_sec or args.max_mb_per_sec:
+        from .throttle import Throttle, lower_process_priority
+
+        budget = dict(global_config.get("background_indexing") or {})
+        budget["enabled"] = True
+        if args.max_images_per_sec:
+            budget["max_images_per_sec"] = args.max_images_per_sec
+        if args.max_mb_per_sec:
+            budget["max_mb_per_sec"] = args.max_mb_per_sec
+        if args.background:
+            budget.setdefault("max_load_per_cpu", 0.75)
+            lower_process_priority()
+            workers = workers or 1
+        cache.throttle = Throttle.from_config(budget)
+
+    start = time.monotonic()
+    print(f"Scanning {len(sources)} source(s)...", flush=True)
+    images = []
+    for source, recursive in sources:
+        images.extend(image_manager.discover_images([source], recursive))
+    images = list(dict.fromkeys(images))
+    print(f"  Discovered {len(images)} images in {time.monotonic() - start:.1f}s", flush=True)
+
+    report = cache.analyze_many(images, workers, ProgressReporter("Analyzing"))
+    # Entries analyzed before thumbnails were on, or whose pack was lost
+    made = cache.backfill_thumbnails(
+        images, workers or os.cpu_count() or 1, ProgressReporter("Thumbnails")
+    )
+    if made:
+        print(f"  Made {made} missing thumbnails", flush=True)
+    cache.save_cache()
+
+    print(
+        f"Indexed {report.total} images in {time.monotonic() - start:.1f}s: "
+        f"{report.analyzed} analyzed, {report.moved} reused after move, "
+        f"{report.cached} already cached, {report.failed} failed, "
+        f"{report.quarantined} quarantined"
+    )
+    print(f"Cache written to {cache.cache_file}")
+
+
+def verify_command(argv) -> int:
+    """Check cache entries against the files on disk"""
+    from .archives import container_reachable, stat_source
+    from .cache import ImageCache, compute_content_id
+    from .decode import DecodePolicy
+    from .thumbs import THUMBNAIL_SIZE
+
+    parser = argparse.ArgumentParser(
+        prog="rotato verify", description="Check the image cache against the files on disk"
+    )
+    parser.add_argument("--config", default="config.yaml", help="config file to read")
+    parser.add_argument("--cache-file", help="cache file to check (default: from config)")
+    parser.add_argument("--deep", action="store_true", help="also re-hash file contents")
+    parser.add_argument("--fix", action="store_true", help="drop missing, re-analyze stale")
+    parser.add_argument("--workers", type=int, help="decoder processes for --fix")
+    parser.add_argument(
+        "--retry-quarantined",
+        action="store_true",
+        help="analyze images quarantined after failed or refused decodes again",
+    )
+    args = parser.parse_args(argv)
+
+    config = load_cli_config(args.config)
+    cache = ImageCache(args.cache_file or config["global"]["cache_file"])
+    cache.decode_policy = DecodePolicy.from_config(config["global"].get("decode"))
+    cache.isolate_decodes = True
+    cache.thumbnail_size = config["global"].get("thumbnail_size", THUMBNAIL_SIZE)
+
+    missing, stale, unreachable = [], [], []
+    progress = ProgressReporter("Verifying")
+    total = len(cache.cache)
+    for done, (path, info) in enumerate(list(cache.cache.items()), 1):
+        try:
+            file_stat = stat_source(path)
+        except OSError:
+            # An unmounted share isn't the same as deleted images
+            (missing if container_reachable(path) else unreachable).append(path)
+        else:
+            if file_stat.st_mtime != info.last_modified or file_stat.st_size != info.file_size:
+                stale.append(path)
+            elif args.deep and info.content_id != compute_content_id(path, file_stat):
+                stale.append(path)
+        progress(done, total)
+
+    ok = total - len(missing) - len(stale) - len(unreachable)
+    print(f"{total} entries: {ok} ok, {len(missing)} missing, {len(stale)} stale")
+    if unreachable:
+        print(f"{len(unreachable)} entries on unreachable paths were not checked")
+    if cache.quarantine:
+        reasons = Counter(entry["reason"] for entry in cache.quarantine.values())
+        summary = ", ".join(f"{count} {reason}" for reason, count in sorted(reasons.items()))
+        print(f"{len(cache.quarantine)} quarantined images ({summary})")
+    if cache.thumbnail_size:
+        without = sum(1 for info in cache.cache.values() if info.content_id not in cache.thumbnails)
+        print(
+            f"{len(cache.thumbnails)} thumbnails "
+            f"({cache.thumbnails.pack_bytes / (1024 * 1024):.1f} MiB pack), "
+            f"{without} entries without one (`rotato index` makes them)"
+        )
+
+    if args.retry_quarantined and cache.quarantine:
+        retry = list(cache.quarantine)
+        cache.release_quarantine()
+        report = cache.analyze_many(retry, args.workers, ProgressReporter("Retrying"))
+        cache.save_cache()
+        print(f"Retried {len(retry)} quarantined images: {report.analyzed} analyzed")
+
+    if args.fix and (missing or stale):
+        for path in missing + stale:
+            cache.remove_entry(path)
+        report = cache.analyze_many(stale, args.workers, ProgressReporter("Re-analyzing"))
+        cache.save_cache()
+        print(
+            f"Removed {len(missing)} missing entries, re-analyzed {report.analyzed} "
+            f"({report.failed} failed)"
+        )
+        return 0
+
+    return 1 if missing or stale else 0
+
+
+def simulate_command(argv):
+    """Run rotation against a virtual clock and report fairness, cost and jitter"""
+    import json
+
+    from .simulate import simulate
+
+    parser = argparse.ArgumentParser(
+        prog="rotato simulate",
+        description="Simulate days of wallpaper rotation in seconds, without a desktop",
+    )
+    parser.add_argument("--config", default="config.yaml", help="config file to read")
+    parser.add_argument("--days", type=float, default=7, help="virtual days to simulate")
+    parser.add_argument(
+        "--monitors", default="1920x1080", help="fake monitors, e.g. 1920x1080,1080x1920"
+    )
+    parser.add_argument(
+        "--images", type=int, help="use this many synthetic images instead of the sources"
+    )
+    parser.add_argument("--interval", type=float, help="rotation interval in minutes")
+    parser.add_argument("--strategy", help="selection strategy for every monitor")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for selection")
+    parser.add_argument(
+        "--charge-cpu",
+        action="store_true",
+        help="let virtual time pass while ticks run, to measure drift",
+    )
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = simulate(
+        config=load_cli_config(args.config),
+        monitors=args.monitors,
+        images=args.images,
+        days=args.days,
+        interval_minutes=args.interval,
+        strategy=args.strategy,
+        seed=args.seed,
+        charge_cpu=args.charge_cpu,
+    )
+    print(json.dumps(report.to_dict(), indent=2) if args.json else report.summary())
+
+
+def ctl_command(argv) -> int:
+    """Send a command to the running instance over the control socket
+
+    Only imports the standard library, so it returns in milliseconds.
+    """
+    import json
+
+    from .ipc import ControlError, send_command
+
+    parser = argparse.ArgumentParser(
+        prog="rotato ctl", description="Control the running Rotato instance"
+    )
+    parser.add_argument("--json", action="store_true", help="print the raw reply as JSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+    next_parser = commands.add_parser("next", help="show the next wallpaper now")
+    next_parser.add_argument("--monitor", help="only this monitor (default: all)")
+    set_parser = commands.add_parser("set", help="show a specific image")
+    set_parser.add_argument("path", help="image file or archive member")
+    set_parser.add_argument("--monitor", help="only this monitor (default: all)")
+    commands.add_parser("reload", help="reload the configuration")
+    commands.add_parser("pause", help="stop rotating on timers")
+    commands.add_parser("resume", help="start rotating on timers again")
+    commands.add_parser("status", help="show current wallpapers and pools")
+    commands.add_parser("stats", help="show performance stats")
+    preview_parser = commands.add_parser("preview", help="show current and upcoming images")
+    preview_parser.add_argument("--count", type=int, default=3, help="upcoming images per monitor")
+    args = parser.parse_args(argv)
+
+    request = {}
+    if args.command == "set":
+        # Relative to where ctl runs, not where the app was started
+        request["path"] = os.path.abspath(args.path)
+    if getattr(args, "monitor", None):
+        request["monitor"] = args.monitor
+    if args.command == "preview":
+        # Thumbnails are base64 JPEGs; only worth sending to scripts reading JSON
+        request.update(count=args.count, thumbnails=args.json)
+
+    try:
+        result = send_command(args.command, **request)
+    except ControlError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    elif args.command == "stats":
+        from .metrics import format_summary
+
+        print(format_summary(result))
+    elif args.command in ("status", "next"):
+        monitors = result["monitors"] if args.command == "status" else result
+        if args.command == "status":
+            print("Paused" if result["paused"] else "Rotating")
+        for name, monitor in monitors.items():
+            print(f"{name}: {monitor['current'] or '-'} ({monitor['pool']} images)")
+    elif args.command == "set":
+        print(f"Updated {', '.join(result) or 'no monitors'}")
+    elif args.command == "preview":
+        for name, monitor in result.items():
+            current = monitor["current"]
+            print(f"{name}: {current['path'] if current else '-'}")
+            for upcoming in monitor["upcoming"]:
+                print(f"  next: {upcoming['path']}")
+    else:
+        print("OK")
+    return 0
+
+
 def main():
     """Main entry point"""
     # Check for command-line arguments
@@ -72,12 +429,35 @@ def main():
         elif command == "--remove-autostart":
             remove_autostart()
             return
+        elif command == "--compact-cache":
+            compact_cache()
+            return
+        elif command == "--stats":
+            show_stats(prometheus="--prometheus" in sys.argv[2:])
+            return
+        elif command == "index":
+            index_command(sys.argv[2:])
+            return
+        elif command == "verify":
+            sys.exit(verify_command(sys.argv[2:]))
+        elif command == "ctl":
+            sys.exit(ctl_command(sys.argv[2:]))
+        elif command == "simulate":
+            simulate_command(sys.argv[2:])
+            return
         elif command == "--help":
             print("Rotato - Desktop Background Manager")
             print("\nUsage:")
             print("  rotato                    Run the application")
             print("  rotato --setup-autostart  Add to Windows startup")
             print("  rotato --remove-autostart Remove from Windows startup")
+            print("  rotato --compact-cache    Prune stale entries from the image cache")
+            print("  rotato --stats [--prometheus]  Show performance stats")
+            print("  rotato index [sources...]  Build the image cache without the desktop app")
+            print("  rotato verify [--fix]     Check the image cache against the files on disk")
+            print("  rotato simulate [--days N] Simulate rotation against a virtual clock")
+            print("  rotato ctl COMMAND        Control the running instance (next, set PATH,")
+            print("                            reload, pause, resume, status, stats, preview)")
             print("  rotato --help            Show this help message")
             return
         else:
@@ -92,7 +472,15 @@ def main():
         sys.exit(1)
 
     # Run the application
-    app = DesktopBackgroundManager()
+    from .config import ConfigError
+    from .core import DesktopBackgroundManager
+
+    try:
+        app = DesktopBackgroundManager()
+    except ConfigError as e:
+        print(f"Error loading config: {e}")
+        print("Fix the file, or move it away to start over with the default configuration.")
+        sys.exit(1)
     app.run()
 
 
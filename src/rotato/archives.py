@@ -0,0 +1,372 @@
+"""Images inside zip and tar archives.
+
+An image inside an archive is addressed by a virtual path made of the archive path,
+``!/`` and the member name, e.g. ``D:/Packs/nature.zip!/forest/01.jpg``. Members
+are listed from the zip central directory or the tar headers without extracting
+anything. Members stored without compression are read straight out of a memory
+map of the archive; only the image chosen for the desktop is written to disk.
+Compressed tars can't be read at an offset. Indexing one decompresses the whole
+archive once into a plain tar in the temp directory and maps its members from
+that copy like those of an uncompressed tar; copies are kept within a size
+budget. Setting a wallpaper from one only decompresses up to the chosen member.
+"""
+
+import bz2
+import gzip
+import hashlib
+import io
+import lzma
+import mmap
+import os
+import shutil
+import stat
+import struct
+import tarfile
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+from .fileutil import file_lock, lock_path_for, prune_directory
+
+MEMBER_SEPARATOR = "!/"
+
+ZIP_SUFFIXES = (".zip", ".cbz")
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+# Local file header: signature, then name and extra field lengths at offset 26
+_ZIP_LOCAL_HEADER = struct.Struct("<4s22xHH")
+
+# Archives whose member tables are kept in memory
+INDEX_CACHE_SIZE = 32
+
+# Extracted wallpapers kept in the temp directory
+MATERIALIZED_KEEP = 8
+
+# Total size of the decompressed copies of compressed tars kept in the temp directory
+UNPACKED_BUDGET_MB = 2048
+
+_DECOMPRESSORS = {
+    ".gz": gzip.open,
+    ".tgz": gzip.open,
+    ".bz2": bz2.open,
+    ".tbz2": bz2.open,
+    ".xz": lzma.open,
+    ".txz": lzma.open,
+}
+
+
+@dataclass(frozen=True)
+class MemberInfo:
+    """Where a member lives inside its archive"""
+
+    name: str
+    size: int
+    crc: Optional[int]  # zip only
+    header_offset: int  # zip: local header, tar: start of data (after decompression)
+    stored: bool  # Uncompressed and directly addressable in the archive file
+    unpacked: bool = False  # Directly addressable in the decompressed copy of a tar
+
+
+def is_archive(path) -> bool:
+    """Whether ``path`` names a supported archive type"""
+    name = str(path).lower()
+    return name.endswith(ZIP_SUFFIXES) or name.endswith(TAR_SUFFIXES)
+
+
+def split_member(path: str) -> Optional[Tuple[str, str]]:
+    """Split a virtual path into (archive path, member name), or None for plain files"""
+    archive, separator, member = path.partition(MEMBER_SEPARATOR)
+    if not separator or not member or not is_archive(archive):
+        return None
+    return archive, member
+
+
+def member_path(archive: str, member: str) -> str:
+    """Virtual path of ``member`` inside ``archive``"""
+    return f"{archive}{MEMBER_SEPARATOR}{member}"
+
+
+def _read_index(archive: str) -> Dict[str, MemberInfo]:
+    members = {}
+    if archive.lower().endswith(ZIP_SUFFIXES):
+        with zipfile.ZipFile(archive) as zf:
+            for info in zf.infolist():
+                if info.is_dir():
+                    continue
+                members[info.filename] = MemberInfo(
+                    name=info.filename,
+                    size=info.file_size,
+                    crc=info.CRC,
+                    header_offset=info.header_offset,
+                    stored=info.compress_type == zipfile.ZIP_STORED and not info.flag_bits & 1,
+                )
+    else:
+        plain = archive.lower().endswith(".tar")
+        with tarfile.open(archive) as tf:
+            for info in tf:
+                if not info.isfile():
+                    continue
+                members[info.name] = MemberInfo(
+                    name=info.name,
+                    size=info.size,
+                    crc=None,
+                    header_offset=info.offset_data,
+                    stored=plain and not info.sparse,
+                    unpacked=not plain and not info.sparse,
+                )
+    return members
+
+
+class _IndexCache:
+    """Member tables of recently used archives, invalidated when an archive changes"""
+
+    def __init__(self, capacity: int = INDEX_CACHE_SIZE):
+        self.capacity = capacity
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int], Dict[str, MemberInfo]]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, archive: str) -> Dict[str, MemberInfo]:
+        archive_stat = os.stat(archive)
+        stamp = (archive_stat.st_mtime_ns, archive_stat.st_size)
+        with self._lock:
+            entry = self._entries.get(archive)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(archive)
+                return entry[1]
+        members = _read_index(archive)
+        with self._lock:
+            self._entries[archive] = (stamp, members)
+            self._entries.move_to_end(archive)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+        return members
+
+
+_indexes = _IndexCache()
+
+
+def list_members(archive: str, supported_formats: Iterable[str]) -> List[str]:
+    """Virtual paths of the images in ``archive``"""
+    formats = tuple(fmt.lower() for fmt in supported_formats)
+    try:
+        members = _indexes.get(archive)
+    except (OSError, zipfile.BadZipFile, tarfile.TarError) as e:
+        print(f"Error reading archive {archive}: {e}")
+        return []
+    return [
+        member_path(archive, name)
+        for name in members
+        if name.lower().endswith(formats) and not name.startswith("__MACOSX/")
+    ]
+
+
+def _member_info(path: str) -> Tuple[str, MemberInfo]:
+    parts = split_member(path)
+    if parts is None:
+        raise FileNotFoundError(path)
+    archive, member = parts
+    try:
+        return archive, _indexes.get(archive)[member]
+    except KeyError:
+        raise FileNotFoundError(path) from None
+    except (zipfile.BadZipFile, tarfile.TarError) as e:
+        raise OSError(f"Cannot read archive {archive}: {e}") from None
+
+
+def stat_member(path: str) -> os.stat_result:
+    """A stat result for a member: its size and the archive's modification time"""
+    archive, info = _member_info(path)
+    archive_stat = os.stat(archive)
+    mtime = archive_stat.st_mtime
+    return os.stat_result((stat.S_IFREG | 0o444, 0, 0, 1, 0, 0, info.size, mtime, mtime, mtime))
+
+
+def stat_source(path: str) -> os.stat_result:
+    """os.stat for plain files and archive members alike"""
+    if split_member(path):
+        return stat_member(path)
+    return os.stat(path)
+
+
+def source_exists(path: str) -> bool:
+    """os.path.exists for plain files and archive members alike"""
+    try:
+        stat_source(path)
+    except OSError:
+        return False
+    return True
+
+
+def container_reachable(path: str) -> bool:
+    """Whether the directory holding ``path``, or its archive, can be reached
+
+    Tells a deleted file apart from one on an unmounted share.
+    """
+    parts = split_member(path)
+    if parts and os.path.isfile(parts[0]):
+        return True
+    return os.path.isdir(os.path.dirname(parts[0] if parts else path))
+
+
+class _MappedSlice(io.RawIOBase):
+    """Read-only file object over part of a memory map, without copying"""
+
+    def __init__(self, mapping: mmap.mmap, start: int, size: int):
+        self._mapping = mapping
+        self._view = memoryview(mapping)[start : start + size]
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        count = max(0, min(len(buffer), len(self._view) - self._position))
+        buffer[:count] = self._view[self._position : self._position + count]
+        self._position += count
+        return count
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self._view)}[whence]
+        self._position = max(0, base + offset)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def close(self):
+        if not self.closed:
+            self._view.release()
+            self._mapping.close()
+        super().close()
+
+
+def open_member(path: str, unpack: bool = True) -> BinaryIO:
+    """Open an archive member for reading
+
+    Stored zip members and members of uncompressed tars are served from a memory
+    map of the archive, members of compressed tars from a memory map of its
+    decompressed copy; compressed zip members are decompressed into memory.
+    Without ``unpack`` a compressed tar that has no decompressed copy yet is
+    decompressed only up to the member, which is read into memory.
+    """
+    archive, info = _member_info(path)
+    if info.stored and info.size:
+        with open(archive, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        start = info.header_offset
+        if info.crc is not None:
+            # Zip: skip the local header, whose extra field may differ from the central one
+            signature, name_length, extra_length = _ZIP_LOCAL_HEADER.unpack_from(mapping, start)
+            if signature != b"PK\x03\x04":
+                mapping.close()
+                raise OSError(f"Bad zip local header for {path}")
+            start += _ZIP_LOCAL_HEADER.size + name_length + extra_length
+        return io.BufferedReader(_MappedSlice(mapping, start, info.size))
+    if info.unpacked and info.size:
+        unpacked = _unpacked_tar(archive, create=unpack)
+        if unpacked is None:
+            decompress = _DECOMPRESSORS[Path(archive).suffix.lower()]
+            with decompress(archive, "rb") as src:
+                src.seek(info.header_offset)
+                return io.BytesIO(src.read(info.size))
+        with open(unpacked, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return io.BufferedReader(_MappedSlice(mapping, info.header_offset, info.size))
+
+    if info.crc is not None:
+        with zipfile.ZipFile(archive) as zf:
+            return io.BytesIO(zf.read(info.name))
+    with tarfile.open(archive) as tf:
+        extracted = tf.extractfile(info.name)
+        return io.BytesIO(extracted.read())
+
+
+def _unpacked_tar(archive: str, create: bool = True) -> Optional[str]:
+    """Path of the decompressed copy of a compressed tar, made on first use
+
+    Copies are named after the archive and its size and modification time, so
+    processes share them and a changed archive is unpacked again. The least
+    recently used copies go once they exceed ``UNPACKED_BUDGET_MB``. Without
+    ``create`` returns None if there is no copy yet.
+    """
+    archive_stat = os.stat(archive)
+    key = f"{archive}:{archive_stat.st_mtime_ns}:{archive_stat.st_size}"
+    directory = Path(tempfile.gettempdir()) / "rotato-unpacked"
+    target = directory / f"{hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()}.tar"
+    directory.mkdir(parents=True, exist_ok=True)
+    with file_lock(lock_path_for(directory)):
+        if target.exists():
+            os.utime(target)
+            return str(target)
+        if not create:
+            return None
+        decompress = _DECOMPRESSORS[Path(archive).suffix.lower()]
+        tmp = target.with_name(target.name + ".tmp")
+        with decompress(archive, "rb") as src, open(tmp, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(tmp, target)
+        prune_directory(directory, None, UNPACKED_BUDGET_MB * 1024 * 1024)
+    return str(target)
+
+
+def open_source(path: str, unpack: bool = True) -> BinaryIO:
+    """Open a plain file or an archive member for reading; see ``open_member``"""
+    if split_member(path):
+        return open_member(path, unpack)
+    return open(path, "rb")
+
+
+def member_content_id(path: str, block_size: int = 64 * 1024) -> str:
+    """Content identity of a member: the zip CRC, or a hash of a tar member's ends
+
+    Hashing the members of a compressed tar decompresses it once, not once per
+    member.
+    """
+    _archive, info = _member_info(path)
+    if info.crc is not None:
+        return f"zip:{info.crc:08x}:{info.size}"
+    digest = hashlib.blake2b(digest_size=16)
+    with open_member(path) as f:
+        digest.update(f.read(block_size))
+        if info.size > block_size:
+            f.seek(max(block_size, info.size - block_size))
+            digest.update(f.read(block_size))
+    return f"tar:{info.size}:{digest.hexdigest()}"
+
+
+def materialize(path: str, directory: Optional[str] = None) -> str:
+    """Write a member to a temp file for the desktop to read and return its path
+
+    Files are named after the virtual path, so showing the same image again reuses
+    its copy; only the last ``MATERIALIZED_KEEP`` copies are kept. A compressed
+    tar is not unpacked for this, only read up to the member.
+    """
+    directory = Path(directory or Path(tempfile.gettempdir()) / "rotato-archive")
+    directory.mkdir(parents=True, exist_ok=True)
+    _archive, info = _member_info(path)
+    digest = hashlib.blake2b(path.encode("utf-8"), digest_size=8).hexdigest()
+    target = directory / f"{digest}{Path(info.name).suffix.lower()}"
+
+    if not (target.exists() and target.stat().st_size == info.size):
+        tmp = target.with_name(target.name + ".tmp")
+        with open_member(path, unpack=False) as src, open(tmp, "wb") as dst:
+            while True:
+                chunk = src.read(1024 * 1024)
+                if not chunk:
+                    break
+                dst.write(chunk)
+        os.replace(tmp, target)
+    os.utime(target)
+
+    # Drop copies of images shown a while ago
+    prune_directory(directory, MATERIALIZED_KEEP)
+    return str(target)
@@ -1,25 +1,158 @@
 """Image caching for Rotato."""
 
+import hashlib
 import json
 import os
-from dataclasses import asdict, dataclass
+import random
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, fields, replace
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
 
-from PIL import Image, ImageStat
+from PIL import Image, ImageFilter
 
+from . import archives
+from .decode import (
+    CORRUPT,
+    TOO_LARGE,
+    DecodePolicy,
+    DecodePool,
+    DecodeRejected,
+    call_with_timeout,
+    decode_for_analysis,
+)
+from .fileutil import atomic_write_json, file_lock, lock_path_for
+from .metrics import metrics
+from .throttle import Throttle, lower_process_priority
+from .thumbs import ThumbnailPack, encode_thumbnail
 
-@dataclass
+
+def _slotted(cls):
+    """Give a dataclass __slots__, like ``dataclass(slots=True)`` on Python 3.10+
+
+    Per-instance dicts dominate memory for large catalogs.
+    """
+    if sys.version_info >= (3, 10):
+        return dataclass(slots=True)(cls)
+    cls = dataclass(cls)
+    names = tuple(field.name for field in fields(cls))
+    body = {key: value for key, value in cls.__dict__.items() if key not in names}
+    body.pop("__dict__", None)
+    body.pop("__weakref__", None)
+    body["__slots__"] = names
+    return type(cls)(cls.__name__, cls.__bases__, body)
+
+
+@_slotted
 class ImageInfo:
-    """Cached information about an image"""
+    """Cached information about an image; the cache is keyed by its path"""
 
-    path: str
     width: int
     height: int
     aspect_ratio: float
     brightness: float  # 0-255, average brightness
     file_size: int
     last_modified: float
+    content_id: Optional[str] = None  # Location-independent identity, see compute_content_id
+    last_seen: float = 0.0  # When the image was last found in a configured source
+    focal_x: float = 0.5  # Center of interest as a fraction of width, see find_focal_point
+    focal_y: float = 0.5  # ... and of height
+    analysis_version: int = 0  # ANALYSIS_VERSION the entry was computed with
+
+
+# Bump when analyze_image computes something new; older entries are re-analyzed.
+# 1: EXIF orientation applied to width/height, focal point added
+ANALYSIS_VERSION = 1
+
+# Longest side of the downscaled proxy used for the focal point
+PROXY_SIZE = 64
+
+# EXIF orientation -> transpose that shows the image upright
+EXIF_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+@dataclass
+class PruneReport:
+    """Outcome of a cache maintenance pass"""
+
+    entries_before: int = 0
+    removed_missing: int = 0
+    removed_stale: int = 0
+    removed_evicted: int = 0
+    bytes_reclaimed: int = 0  # Estimated size of removed entries in the cache file
+    unreachable: int = 0  # Entries kept because their directory can't be reached
+
+    @property
+    def removed(self) -> int:
+        return self.removed_missing + self.removed_stale + self.removed_evicted
+
+    def summary(self) -> str:
+        summary = (
+            f"Removed {self.removed} of {self.entries_before} cache entries "
+            f"({self.removed_missing} missing, {self.removed_stale} stale, "
+            f"{self.removed_evicted} evicted), reclaimed ~{self.bytes_reclaimed / 1024:.1f} KiB"
+        )
+        if self.unreachable:
+            summary += f"; kept {self.unreachable} on unreachable paths"
+        return summary
+
+
+# Size of the head and tail blocks hashed into a content identity
+CONTENT_BLOCK_SIZE = 64 * 1024
+
+
+def compute_content_id(path: str, file_stat: os.stat_result) -> str:
+    """Compute a location-independent identity for a file.
+
+    The identity combines size, whole-second mtime (so filesystems with different
+    timestamp precision agree) and a hash of the first and last blocks of the file.
+    It stays the same when a file is renamed, moved or seen through another mount point.
+    Archive members are identified by their CRC instead (see archives.member_content_id).
+    """
+    if archives.split_member(path):
+        return archives.member_content_id(path, CONTENT_BLOCK_SIZE)
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        digest.update(f.read(CONTENT_BLOCK_SIZE))
+        if file_stat.st_size > CONTENT_BLOCK_SIZE:
+            f.seek(max(CONTENT_BLOCK_SIZE, file_stat.st_size - CONTENT_BLOCK_SIZE))
+            digest.update(f.read(CONTENT_BLOCK_SIZE))
+    return f"{file_stat.st_size}:{int(file_stat.st_mtime)}:{digest.hexdigest()}"
+
+
+@dataclass
+class AnalysisReport:
+    """Outcome of a batch analysis"""
+
+    total: int = 0
+    cached: int = 0  # Already up to date
+    moved: int = 0  # Reused analysis of the same content under another path
+    analyzed: int = 0  # Newly decoded
+    failed: int = 0
+    quarantined: int = 0  # Skipped because an earlier decode failed, see ImageCache.quarantine
+
+
+# Version of the on-disk cache layout; version 1 was a bare path -> entry mapping,
+# version 2 repeated the path inside each entry
+CACHE_FORMAT_VERSION = 3
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+def _entry_size(path: str, info: ImageInfo) -> int:
+    """Approximate number of bytes an entry takes in the cache file"""
+    return len(path) + len(json.dumps(asdict(info), indent=2)) + 8
 
 
 class ImageCache:
@@ -28,68 +161,835 @@ class ImageCache:
     def __init__(self, cache_file: str = "image_cache.json"):
         self.cache_file = Path(cache_file)
         self.cache: Dict[str, ImageInfo] = {}
+        self.content_index: Dict[str, str] = {}  # content_id -> path of an entry
+        self.last_prune: float = 0.0
+        self.throttle: Optional[Throttle] = None  # Rate limit for analysis, if any
+        # Decode single images in a worker process that is killed if it overruns
+        # decode_policy.timeout_seconds; batches always use worker processes
+        self.isolate_decodes = False
+        # Decode in worker processes at idle CPU and I/O priority
+        self.low_priority = False
+        self._decoder: Optional[DecodePool] = None
+        self._decoder_settings: Optional[Tuple] = None
+        self._decoder_lock = threading.Lock()
+        self.decode_policy = DecodePolicy()
+        # Longest side of thumbnails made during analysis; 0 makes none
+        self.thumbnail_size = 0
+        self.thumbnails = ThumbnailPack.for_cache(self.cache_file)
+        self._thumbnail_failed: Set[str] = set()  # Backfills not retried in this process
+        # path -> {"reason", "error", "file_size", "last_modified", "when"} for images
+        # whose decode failed or was refused; they are skipped until the file changes
+        self.quarantine: Dict[str, Dict] = {}
+
+        # Changes since the file was last read, replayed onto entries written
+        # by other processes when saving
+        self._dirty: Set[str] = set()
+        self._removed: Set[str] = set()
+        self._quarantine_changed: Set[str] = set()
+        self._disk_stamp: Optional[Tuple[int, int]] = None
+
         self.load_cache()
 
+    def _read_cache_file(self) -> Tuple[Dict[str, ImageInfo], float, Dict[str, Dict]]:
+        """Read entries, last prune time and quarantine from the cache file"""
+        with open(self.cache_file, "r", encoding="utf-8") as f:
+            cache_data = json.load(f)
+        if "version" in cache_data:
+            entries = cache_data.get("entries", {})
+            last_prune = cache_data.get("last_prune", 0.0)
+            quarantine = cache_data.get("quarantine", {})
+        else:
+            entries = cache_data
+            last_prune = 0.0
+            quarantine = {}
+        for info in entries.values():
+            info.pop("path", None)
+        entries = {path: ImageInfo(**info) for path, info in entries.items()}
+        return entries, last_prune, quarantine
+
+    def _current_disk_stamp(self) -> Optional[Tuple[int, int]]:
+        """Identify the cache file version on disk by modification time and size"""
+        try:
+            file_stat = os.stat(self.cache_file)
+        except OSError:
+            return None
+        return file_stat.st_mtime_ns, file_stat.st_size
+
     def load_cache(self):
         """Load cache from JSON file"""
-        if self.cache_file.exists():
+        self._dirty.clear()
+        self._removed.clear()
+        self._quarantine_changed.clear()
+        self._disk_stamp = self._current_disk_stamp()
+        if self._disk_stamp is not None:
             try:
-                with open(self.cache_file, "r", encoding="utf-8") as f:
-                    cache_data = json.load(f)
-                self.cache = {path: ImageInfo(**info) for path, info in cache_data.items()}
+                self.cache, self.last_prune, self.quarantine = self._read_cache_file()
             except Exception as e:
                 print(f"Error loading cache: {e}")
                 self.cache = {}
+                self.quarantine = {}
+
+        # Entries from older caches have no last-seen time; start their clock now
+        now = time.time()
+        for info in self.cache.values():
+            if not info.last_seen:
+                info.last_seen = now
+        self._rebuild_content_index()
+
+    def _rebuild_content_index(self):
+        """Index cache entries by content identity"""
+        self.content_index = {
+            info.content_id: path for path, info in self.cache.items() if info.content_id
+        }
+
+    def _find_by_content(self, content_id: str) -> Optional[ImageInfo]:
+        """Find an entry analyzed under a different path with the same content"""
+        indexed_path = self.content_index.get(content_id)
+        if indexed_path is None:
+            return None
+        info = self.cache.get(indexed_path)
+        if info is None or info.content_id != content_id:
+            return None
+        if info.analysis_version < ANALYSIS_VERSION:
+            return None
+        return info
+
+    def _merge_from_disk(self):
+        """Replay local changes onto the entries another process saved
+
+        Entries only we touched keep our version, entries we pruned stay removed,
+        and when both sides analyzed a file the newer analysis wins. Quarantine
+        entries we added or released override theirs.
+        """
+        entries, last_prune, quarantine = self._read_cache_file()
+
+        for path in self._removed:
+            entries.pop(path, None)
+
+        for path in self._dirty:
+            ours = self.cache.get(path)
+            if ours is None:
+                continue
+            theirs = entries.get(path)
+            if theirs is not None:
+                last_seen = max(ours.last_seen, theirs.last_seen)
+                if theirs.last_modified > ours.last_modified:
+                    theirs.last_seen = last_seen
+                    continue
+                ours.last_seen = last_seen
+            entries[path] = ours
+
+        for path in self._quarantine_changed:
+            if path in self.quarantine:
+                quarantine[path] = self.quarantine[path]
+            else:
+                quarantine.pop(path, None)
+
+        self.cache = entries
+        self.quarantine = quarantine
+        self.last_prune = max(self.last_prune, last_prune)
+        self._rebuild_content_index()
 
     def save_cache(self):
-        """Save cache to JSON file"""
+        """Save cache to JSON file
+
+        The file is replaced atomically under an inter-process lock, so a crash
+        mid-write keeps the previous cache and concurrent writers merge their
+        updates instead of overwriting each other.
+        """
         try:
-            cache_data = {path: asdict(info) for path, info in self.cache.items()}
-            with open(self.cache_file, "w", encoding="utf-8") as f:
-                json.dump(cache_data, f, indent=2)
+            with metrics.timer("cache_save_seconds"), file_lock(lock_path_for(self.cache_file)):
+                disk_stamp = self._current_disk_stamp()
+                if disk_stamp is not None and disk_stamp != self._disk_stamp:
+                    try:
+                        self._merge_from_disk()
+                    except Exception as e:
+                        print(f"Error merging cache changes from disk: {e}")
+
+                cache_data = {
+                    "version": CACHE_FORMAT_VERSION,
+                    "last_prune": self.last_prune,
+                    "entries": {path: asdict(info) for path, info in self.cache.items()},
+                    "quarantine": self.quarantine,
+                }
+                atomic_write_json(self.cache_file, cache_data, indent=2)
+
+                self._disk_stamp = self._current_disk_stamp()
+                self._dirty.clear()
+                self._removed.clear()
+                self._quarantine_changed.clear()
         except Exception as e:
             print(f"Error saving cache: {e}")
+        self.thumbnails.save()
+
+    def prune(
+        self,
+        max_age_days: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        max_size_mb: Optional[float] = None,
+        check_missing: bool = True,
+        sample_size: Optional[int] = None,
+    ) -> PruneReport:
+        """Compact the cache.
+
+        Drops entries whose files no longer exist (but not those whose directory is
+        unreachable, such as on an unmounted share), entries not seen in any source for
+        ``max_age_days``, and then evicts least-recently-seen entries until the cache
+        fits ``max_entries`` and ``max_size_mb``. With ``sample_size`` only that many
+        randomly chosen entries are checked for existence, which bounds the disk I/O
+        of an opportunistic pass.
+        """
+        report = PruneReport(entries_before=len(self.cache))
+        removed: List[str] = []
+
+        if check_missing:
+            paths = list(self.cache)
+            if sample_size is not None and sample_size < len(paths):
+                paths = random.sample(paths, sample_size)
+            for path in paths:
+                if archives.source_exists(path):
+                    continue
+                if archives.container_reachable(path):
+                    removed.append(path)
+                else:
+                    report.unreachable += 1
+            report.removed_missing = len(removed)
+            for path in removed:
+                report.bytes_reclaimed += self.remove_entry(path)
+            removed.clear()
+            for path in list(self.quarantine):
+                if not archives.source_exists(path) and archives.container_reachable(path):
+                    self.release_quarantine(path)
+
+        if max_age_days is not None:
+            cutoff = time.time() - max_age_days * SECONDS_PER_DAY
+            removed = [path for path, info in self.cache.items() if info.last_seen < cutoff]
+            report.removed_stale = len(removed)
+            for path in removed:
+                report.bytes_reclaimed += self.remove_entry(path)
+            removed.clear()
+
+        if max_entries is not None or max_size_mb is not None:
+            # Least recently seen first
+            by_age = sorted(self.cache.items(), key=lambda item: item[1].last_seen)
+            sizes = [_entry_size(path, info) for path, info in by_age]
+            total_size = sum(sizes)
+            max_bytes = max_size_mb * 1024 * 1024 if max_size_mb is not None else None
+            count = len(by_age)
+            for (path, _info), size in zip(by_age, sizes):
+                over_count = max_entries is not None and count > max_entries
+                over_size = max_bytes is not None and total_size > max_bytes
+                if not (over_count or over_size):
+                    break
+                self.remove_entry(path)
+                count -= 1
+                total_size -= size
+                report.removed_evicted += 1
+                report.bytes_reclaimed += size
+
+        if report.removed:
+            self._rebuild_content_index()
+            self.thumbnails.retain(set(self.content_index))
+        self.last_prune = time.time()
+        return report
+
+    def remove_entry(self, path: str) -> int:
+        """Remove an entry, returning its approximate size in the cache file"""
+        info = self.cache.pop(path)
+        self._dirty.discard(path)
+        self._removed.add(path)
+        return _entry_size(path, info)
+
+    def add_quarantine(self, path: str, file_stat: os.stat_result, reason: str, error: str):
+        """Stop analyzing ``path`` until the file changes"""
+        self.quarantine[path] = {
+            "reason": reason,
+            "error": error,
+            "file_size": file_stat.st_size,
+            "last_modified": file_stat.st_mtime,
+            "when": time.time(),
+        }
+        self._quarantine_changed.add(path)
+        metrics.inc("image_quarantined_total", labels={"reason": reason})
+
+    def release_quarantine(self, path: Optional[str] = None) -> int:
+        """Allow quarantined images to be analyzed again; all of them if ``path`` is None"""
+        paths = list(self.quarantine) if path is None else [path]
+        released = 0
+        for quarantined in paths:
+            if self.quarantine.pop(quarantined, None) is not None:
+                self._quarantine_changed.add(quarantined)
+                released += 1
+        return released
+
+    def _quarantined(self, path: str, file_stat: os.stat_result) -> bool:
+        """Whether ``path`` is quarantined; entries for changed files are released"""
+        entry = self.quarantine.get(path)
+        if entry is None:
+            return False
+        if entry["file_size"] == file_stat.st_size and entry["last_modified"] == file_stat.st_mtime:
+            metrics.inc("image_quarantine_skips_total")
+            return True
+        self.release_quarantine(path)
+        return False
+
+    def maybe_prune(
+        self,
+        interval_hours: float = 24,
+        sample_size: int = 1000,
+        **limits,
+    ) -> Optional[PruneReport]:
+        """Opportunistic maintenance: prune with a bounded existence check if due
+
+        Returns None when the last pass was less than ``interval_hours`` ago.
+        """
+        if time.time() - self.last_prune < interval_hours * 60 * 60:
+            return None
+        return self.prune(sample_size=sample_size, **limits)
 
     def get_image_info(self, image_path: str) -> Optional[ImageInfo]:
         """Get cached image info or analyze and cache new image"""
-        path = str(Path(image_path).resolve())
+        probe = self._probe(image_path)
+        if probe is None:
+            return None
 
-        if not Path(path).exists():
+        path, file_stat, cached = probe
+        if cached is not None:
+            return self._touch(path, cached, file_stat)
+        if self._quarantined(path, file_stat):
             return None
 
-        # Check if we have fresh cached data
-        file_stat = os.stat(path)
-        if path in self.cache:
-            cached = self.cache[path]
-            if cached.last_modified == file_stat.st_mtime:
-                return cached
+        content_id = self._identify(path, file_stat)
+        if content_id is None:
+            return None
+
+        # Reuse analysis of the same file seen under another path (moved,
+        # renamed or on a different mount point)
+        known = self._find_by_content(content_id)
+        if known is not None:
+            return self._store_moved(path, file_stat, known)
 
         # Analyze image and cache result
-        try:
-            with Image.open(path) as img:
-                # Calculate average brightness
-                if img.mode == "RGBA":
-                    # Convert to RGB for brightness calculation
-                    rgb_img = Image.new("RGB", img.size, (255, 255, 255))
-                    rgb_img.paste(img, mask=img.split()[-1])
-                    stat = ImageStat.Stat(rgb_img)
+        metrics.inc("cache_misses_total")
+        if self.throttle:
+            self.throttle.acquire(nbytes=file_stat.st_size)
+        job = (path, file_stat, content_id, self.decode_policy, self.thumbnail_size)
+        result = self._run_decode(_analyze_job, job, _failed_analysis)
+        return self._store_analyzed(path, file_stat, *result)
+
+    def analyze_many(
+        self,
+        image_paths: Iterable[str],
+        workers: Optional[int] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> AnalysisReport:
+        """Bring the cache up to date for many images using all cores
+
+        Cache checks and content hashing run on a thread pool (they are I/O bound),
+        decoding of new images on a process pool of ``workers`` processes.
+        ``progress(done, total)`` is called as images complete. When the cache has
+        a throttle, hashing runs serially and decodes are released one at a time
+        within its budget.
+        """
+        image_paths = list(image_paths)
+        workers = workers or os.cpu_count() or 1
+        report = AnalysisReport(total=len(image_paths))
+        done = 0
+
+        def advance(count: int = 1):
+            nonlocal done
+            done += count
+            if progress:
+                progress(done, report.total)
+
+        # Stage 1: stat, freshness check and content identity (threads)
+        pending: Dict[str, Tuple[str, os.stat_result]] = {}  # content_id -> first new path
+        duplicates: List[Tuple[str, os.stat_result, str]] = []
+        with ThreadPoolExecutor(max_workers=min(32, workers * 4)) as pool:
+            if self.throttle:
+                probes = map(self._probe_and_identify_throttled, image_paths)
+            else:
+                probes = pool.map(self._probe_and_identify, image_paths)
+            for result in probes:
+                if result is None:
+                    report.failed += 1
+                    advance()
+                    continue
+                path, file_stat, cached, content_id = result
+                if cached is not None:
+                    self._touch(path, cached, file_stat)
+                    report.cached += 1
+                    advance()
+                    continue
+                if self._quarantined(path, file_stat):
+                    report.quarantined += 1
+                    advance()
+                    continue
+                if content_id is None:
+                    report.failed += 1
+                    advance()
+                    continue
+                known = self._find_by_content(content_id)
+                if known is not None:
+                    self._store_moved(path, file_stat, known)
+                    report.moved += 1
+                    advance()
+                elif content_id in pending:
+                    duplicates.append((path, file_stat, content_id))
                 else:
-                    stat = ImageStat.Stat(img.convert("RGB"))
-
-                brightness = sum(stat.mean) / len(stat.mean)
-
-                info = ImageInfo(
-                    path=path,
-                    width=img.width,
-                    height=img.height,
-                    aspect_ratio=img.width / img.height,
-                    brightness=brightness,
-                    file_size=file_stat.st_size,
-                    last_modified=file_stat.st_mtime,
-                )
+                    pending[content_id] = (path, file_stat)
 
-                self.cache[path] = info
-                return info
-        except Exception as e:
-            print(f"Error analyzing image {path}: {e}")
+        # Stage 2: decode new images (processes)
+        metrics.inc("cache_misses_total", len(pending))
+        jobs = [
+            (path, file_stat, content_id, self.decode_policy, self.thumbnail_size)
+            for content_id, (path, file_stat) in pending.items()
+        ]
+        if workers == 1 or len(jobs) <= 1:
+            for job in jobs:
+                if self.throttle:
+                    self.throttle.acquire(nbytes=job[1].st_size)
+                result = self._run_decode(_analyze_job, job, _failed_analysis)
+                self._record_analysis(report, job, *result)
+                advance()
+        else:
+            # Keep a bounded number of jobs in flight so the throttle, if any,
+            # controls the actual decode rate
+            max_in_flight = workers * 2
+            with self._decode_pool(workers) as pool:
+                futures: Dict = {}
+                remaining = iter(jobs)
+                while True:
+                    while len(futures) < max_in_flight:
+                        job = next(remaining, None)
+                        if job is None:
+                            break
+                        if self.throttle:
+                            self.throttle.acquire(nbytes=job[1].st_size)
+                        futures[pool.submit(_analyze_job, *job)] = job
+                    if not futures:
+                        break
+                    finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        job = futures.pop(future)
+                        result = _decode_result(future, job, _failed_analysis)
+                        self._record_analysis(report, job, *result)
+                        advance()
+
+        # Copies of a new image found more than once in this batch
+        for path, file_stat, content_id in duplicates:
+            known = self._find_by_content(content_id)
+            if known is not None:
+                self._store_moved(path, file_stat, known)
+                report.moved += 1
+            else:
+                report.failed += 1
+            advance()
+
+        return report
+
+    def _record_analysis(
+        self,
+        report: AnalysisReport,
+        job: Tuple,
+        info: Optional[ImageInfo],
+        elapsed: float,
+        error: Optional[str],
+        reason: Optional[str],
+        thumbnail: Optional[bytes],
+    ):
+        """Store one result of analyze_many and count it in the report"""
+        path, file_stat = job[:2]
+        stored = self._store_analyzed(path, file_stat, info, elapsed, error, reason, thumbnail)
+        if stored is None:
+            report.failed += 1
+        else:
+            report.analyzed += 1
+
+    def _probe(self, image_path: str) -> Optional[Tuple[str, os.stat_result, Optional[ImageInfo]]]:
+        """Resolve and stat a path, returning a fresh cache entry if there is one"""
+        with metrics.timer("image_stat_seconds"):
+            member = archives.split_member(image_path)
+            if member:
+                path = archives.member_path(str(Path(member[0]).resolve()), member[1])
+            else:
+                path = str(Path(image_path).resolve())
+            try:
+                file_stat = archives.stat_source(path)
+            except OSError:
+                metrics.inc("image_missing_total")
+                return None
+
+        # Check if we have fresh cached data
+        cached = self.cache.get(path)
+        if (
+            cached is not None
+            and cached.last_modified == file_stat.st_mtime
+            and cached.analysis_version >= ANALYSIS_VERSION
+        ):
+            return path, file_stat, cached
+        return path, file_stat, None
+
+    def _identify(self, path: str, file_stat: os.stat_result) -> Optional[str]:
+        """Content identity of a file, or None if it cannot be read"""
+        try:
+            with metrics.timer("content_id_seconds"):
+                return compute_content_id(path, file_stat)
+        except OSError as e:
+            print(f"Error reading image {path}: {e}")
+            metrics.inc("image_errors_total")
+            return None
+
+    def _probe_and_identify(self, image_path: str):
+        """Probe a path and, if it needs analysis, compute its content identity
+
+        Does not modify the cache, so it can run on worker threads.
+        """
+        probe = self._probe(image_path)
+        if probe is None:
+            return None
+        path, file_stat, cached = probe
+        if cached is not None:
+            return path, file_stat, cached, cached.content_id
+        return path, file_stat, None, self._identify(path, file_stat)
+
+    def _probe_and_identify_throttled(self, image_path: str):
+        """_probe_and_identify, charging the bytes read for hashing to the throttle"""
+        result = self._probe_and_identify(image_path)
+        if result is not None and result[2] is None:
+            self.throttle.acquire(images=0, nbytes=min(result[1].st_size, 2 * CONTENT_BLOCK_SIZE))
+        return result
+
+    def _touch(self, path: str, cached: ImageInfo, file_stat: os.stat_result) -> ImageInfo:
+        """Mark a fresh cache entry as seen"""
+        if cached.content_id is None:
+            # Entry predates content identities; backfill it once
+            try:
+                cached.content_id = compute_content_id(path, file_stat)
+                self.content_index[cached.content_id] = path
+            except OSError:
+                pass
+        cached.last_seen = time.time()
+        self._dirty.add(path)
+        metrics.inc("cache_hits_total")
+        return cached
+
+    def _store_moved(self, path: str, file_stat: os.stat_result, known: ImageInfo) -> ImageInfo:
+        """Cache the analysis of ``known`` under a new path"""
+        info = replace(
+            known,
+            file_size=file_stat.st_size,
+            last_modified=file_stat.st_mtime,
+            last_seen=time.time(),
+        )
+        self.cache[path] = info
+        self._dirty.add(path)
+        metrics.inc("cache_moved_hits_total")
+        return info
+
+    def _store_analyzed(
+        self,
+        path: str,
+        file_stat: os.stat_result,
+        info: Optional[ImageInfo],
+        elapsed: float,
+        error: Optional[str],
+        reason: Optional[str] = None,
+        thumbnail: Optional[bytes] = None,
+    ) -> Optional[ImageInfo]:
+        """Cache a freshly analyzed image, or quarantine it if the decode was refused"""
+        metrics.observe("image_decode_seconds", elapsed)
+        if info is None:
+            print(f"Error analyzing image {path}: {error}")
+            metrics.inc("image_errors_total")
+            if reason is not None:
+                self.add_quarantine(path, file_stat, reason, error)
+            return None
+
+        self.cache[path] = info
+        self.content_index[info.content_id] = path
+        self._dirty.add(path)
+        if thumbnail is not None:
+            self.thumbnails.add(info.content_id, thumbnail)
+        return info
+
+    def missing_thumbnails(self, image_paths: Iterable[str]) -> List[str]:
+        """Cached images among ``image_paths`` that have no thumbnail yet"""
+        if not self.thumbnail_size:
+            return []
+        missing = []
+        for image_path in image_paths:
+            path, info = self._lookup(image_path)
+            if (
+                info is not None
+                and info.content_id
+                and info.content_id not in self.thumbnails
+                and path not in self._thumbnail_failed
+            ):
+                missing.append(path)
+        return missing
+
+    def backfill_thumbnails(
+        self,
+        image_paths: Iterable[str],
+        workers: int = 1,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> int:
+        """Make missing thumbnails for already analyzed images, best effort
+
+        A missing thumbnail never makes an entry stale; this decodes the images
+        once more just for their thumbnails (e.g. for caches built before
+        thumbnails existed, or copied without their pack). Images that fail are
+        skipped until the next process. Returns the number of thumbnails made.
+        """
+        # One decode per content, also when it was found under several paths
+        missing = {
+            self.cache[path].content_id: path for path in self.missing_thumbnails(image_paths)
+        }
+        jobs = [
+            (path, content_id, self.decode_policy, self.thumbnail_size)
+            for content_id, path in missing.items()
+        ]
+        made = 0
+        for done, (job, thumbnail) in enumerate(self._thumbnail_results(jobs, workers), 1):
+            path, content_id = job[:2]
+            if thumbnail is None:
+                self._thumbnail_failed.add(path)
+            elif self.thumbnails.add(content_id, thumbnail):
+                made += 1
+            else:
+                self._thumbnail_failed.add(path)
+            if progress:
+                progress(done, len(jobs))
+        return made
+
+    def _thumbnail_results(self, jobs: List[Tuple], workers: int):
+        """(job, thumbnail or None) for each job, decoding on ``workers`` processes
+
+        Throttled backfills decode one image at a time within the budget.
+        """
+        if workers == 1 or len(jobs) <= 1 or self.throttle:
+            for job in jobs:
+                if self.throttle:
+                    self.throttle.acquire(nbytes=self.cache[job[0]].file_size)
+                yield job, self._run_decode(_thumbnail_job, job, _no_thumbnail)
+            return
+        with self._decode_pool(workers) as pool:
+            futures = [pool.submit(_thumbnail_job, *job) for job in jobs]
+            for job, future in zip(jobs, futures):
+                yield job, _decode_result(future, job, _no_thumbnail)
+
+    def _decode_pool(self, workers: int) -> DecodePool:
+        """Worker processes for decodes, at idle priority if low_priority is set"""
+        initializer = lower_process_priority if self.low_priority else None
+        return DecodePool(workers, self.decode_policy.kill_after, initializer)
+
+    def _run_decode(self, job_function: Callable, job: Tuple, failure: Callable):
+        """Run one decode job here, or in the decode worker process
+
+        The worker is used with isolate_decodes or low_priority; there a decode
+        that hangs is killed, and only the worker runs at idle priority, so the
+        daemon keeps reacting promptly while it indexes. ``failure(message,
+        reason)`` gives the result of a job that was killed or whose worker died.
+        """
+        if not (self.isolate_decodes or self.low_priority):
+            return job_function(*job)
+        settings = (self.decode_policy.kill_after, self.low_priority)
+        with self._decoder_lock:
+            if self._decoder is None or self._decoder_settings != settings:
+                if self._decoder is not None:
+                    self._decoder.shutdown()
+                self._decoder = self._decode_pool(1)
+                self._decoder_settings = settings
+            decoder = self._decoder
+        return _decode_result(decoder.submit(job_function, *job), job, failure)
+
+    def close(self):
+        """Stop the decode worker process, if one was started"""
+        with self._decoder_lock:
+            decoder, self._decoder = self._decoder, None
+        if decoder is not None:
+            decoder.shutdown()
+
+    def _lookup(self, image_path: str) -> Tuple[str, Optional[ImageInfo]]:
+        """Cache key and entry of a path as given or resolved, without touching the file"""
+        info = self.cache.get(image_path)
+        if info is None and not archives.split_member(image_path):
+            resolved = str(Path(image_path).resolve())
+            return resolved, self.cache.get(resolved)
+        return image_path, info
+
+    def thumbnail(self, image_path: str) -> Optional[bytes]:
+        """JPEG thumbnail of a cached image from the thumbnail pack, without decoding it"""
+        _path, info = self._lookup(image_path)
+        if info is None or not info.content_id:
             return None
+        return self.thumbnails.get(info.content_id)
+
+
+def exif_orientation(img: Image.Image) -> int:
+    """EXIF orientation tag of an image (1 = upright)"""
+    try:
+        return int(img.getexif().get(0x0112, 1))
+    except Exception:
+        return 1
+
+
+def find_focal_point(proxy: Image.Image) -> Tuple[float, float]:
+    """Center of interest of an upright image as fractions of width and height
+
+    Uses the centroid of above-average edge strength in a small grayscale proxy:
+    detail and contrast attract the eye, flat sky and backgrounds don't.
+    """
+    gray = proxy.convert("L")
+    gray.thumbnail((PROXY_SIZE, PROXY_SIZE))
+    width, height = gray.size
+    if width < 3 or height < 3:
+        return 0.5, 0.5
+    edges = gray.filter(ImageFilter.FIND_EDGES)
+    values = edges.tobytes()
+    mean = sum(values) / len(values)
+
+    total = sum_x = sum_y = 0.0
+    # Skip the outermost pixels, where the edge filter sees the border
+    for y in range(1, height - 1):
+        row = y * width
+        for x in range(1, width - 1):
+            weight = values[row + x] - mean
+            if weight > 0:
+                total += weight
+                sum_x += weight * x
+                sum_y += weight * y
+    if not total:
+        return 0.5, 0.5
+    return (sum_x / total + 0.5) / width, (sum_y / total + 0.5) / height
+
+
+def analyze_image(
+    path: str,
+    file_stat: os.stat_result,
+    content_id: str,
+    policy: Optional[DecodePolicy] = None,
+    thumbnail_size: int = 0,
+) -> Tuple[ImageInfo, Optional[bytes]]:
+    """Decode an image within ``policy`` and compute its cached information
+
+    Width, height and the focal point are in display orientation, i.e. after
+    applying the EXIF orientation tag. With a ``thumbnail_size`` a JPEG thumbnail
+    is made from the same decode and returned alongside. Raises DecodeRejected for
+    images that are corrupt or over budget, and OSError if the file can't be read.
+    """
+    with archives.open_source(path) as f:
+        try:
+            with Image.open(f) as img:
+                return _analyze_open_image(
+                    img, path, file_stat, content_id, policy, thumbnail_size
+                )
+        except Image.DecompressionBombError as e:
+            raise DecodeRejected(TOO_LARGE, str(e)) from None
+        except OSError as e:
+            if e.errno is not None:
+                raise  # Reading failed (e.g. a share went away); worth retrying
+            raise DecodeRejected(CORRUPT, str(e)) from None
+        except (SyntaxError, ValueError, EOFError) as e:
+            raise DecodeRejected(CORRUPT, str(e)) from None
+
+
+def _analyze_open_image(
+    img: Image.Image,
+    path: str,
+    file_stat: os.stat_result,
+    content_id: str,
+    policy: Optional[DecodePolicy],
+    thumbnail_size: int,
+) -> Tuple[ImageInfo, Optional[bytes]]:
+    width, height = img.size
+    orientation = exif_orientation(img)
+    brightness, proxy = decode_for_analysis(img, policy or DecodePolicy(), PROXY_SIZE)
+
+    if orientation in EXIF_TRANSPOSE:
+        proxy = proxy.transpose(EXIF_TRANSPOSE[orientation])
+    focal_x, focal_y = find_focal_point(proxy)
+    thumbnail = encode_thumbnail(proxy, thumbnail_size) if thumbnail_size else None
+
+    if orientation in (5, 6, 7, 8):
+        width, height = height, width
+
+    info = ImageInfo(
+        width=width,
+        height=height,
+        aspect_ratio=width / height,
+        brightness=brightness,
+        file_size=file_stat.st_size,
+        last_modified=file_stat.st_mtime,
+        content_id=content_id,
+        last_seen=time.time(),
+        focal_x=focal_x,
+        focal_y=focal_y,
+        analysis_version=ANALYSIS_VERSION,
+    )
+    return info, thumbnail
+
+
+def _analyze_job(
+    path: str,
+    file_stat: os.stat_result,
+    content_id: str,
+    policy: Optional[DecodePolicy] = None,
+    thumbnail_size: int = 0,
+) -> Tuple[Optional[ImageInfo], float, Optional[str], Optional[str], Optional[bytes]]:
+    """Run analyze_image, returning (info, seconds taken, error message, quarantine
+    reason, thumbnail)
+
+    Module-level and exception-free so it can run in worker processes.
+    """
+    policy = policy or DecodePolicy()
+    start = time.perf_counter()
+    try:
+        info, thumbnail = call_with_timeout(
+            analyze_image,
+            (path, file_stat, content_id, policy, thumbnail_size),
+            policy.timeout_seconds,
+        )
+        return info, time.perf_counter() - start, None, None, thumbnail
+    except DecodeRejected as e:
+        return None, time.perf_counter() - start, str(e), e.reason, None
+    except Exception as e:
+        return None, time.perf_counter() - start, str(e), None, None
+
+
+def _failed_analysis(message: str, reason: Optional[str]) -> Tuple:
+    """_analyze_job result for a job that was killed or whose worker died"""
+    return None, 0.0, message, reason, None
+
+
+def _no_thumbnail(message: str, reason: Optional[str]) -> None:
+    return None
+
+
+def _decode_result(future: Future, job: Tuple, failure: Callable):
+    """Result of a decode job run on a DecodePool"""
+    try:
+        return future.result()
+    except DecodeRejected as e:
+        print(f"Error decoding {job[0]}: {e}")
+        return failure(str(e), e.reason)
+    except OSError as e:
+        print(f"Error decoding {job[0]}: {e}")
+        return failure(str(e), None)
+
+
+def _thumbnail_job(
+    path: str, content_id: str, policy: DecodePolicy, thumbnail_size: int
+) -> Optional[bytes]:
+    """Thumbnail of an analyzed image, or None if it can't be made; for backfills"""
+    try:
+        file_stat = archives.stat_source(path)
+    except OSError:
+        return None
+    info, _elapsed, error, _reason, thumbnail = _analyze_job(
+        path, file_stat, content_id, policy, thumbnail_size
+    )
+    if info is None:
+        print(f"Error making thumbnail for {path}: {error}")
+    return thumbnail
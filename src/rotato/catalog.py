@@ -0,0 +1,121 @@
+"""Compact, interned catalog of image paths."""
+
+import os
+from array import array
+from types import MappingProxyType
+from typing import Dict, Hashable, Iterable, List, Mapping, Optional, Sequence
+
+
+def split_path(path: str):
+    """Split a path into its directory prefix (with trailing separator) and basename
+
+    Joining the two parts with ``+`` gives back the original string exactly.
+    """
+    name = os.path.basename(path)
+    return path[: len(path) - len(name)], name
+
+
+class ImageCatalog:
+    """Interned table of image paths addressed by integer id
+
+    Each path is stored once as a (directory id, basename) pair against a shared
+    directory table, so thousands of images in one folder share a single directory
+    string. Monitor pools reference images by id in compact ``array('I')`` buffers
+    instead of holding their own copies of the path strings.
+
+    The catalog is append-only: ids stay valid for its lifetime and never change.
+    """
+
+    def __init__(self):
+        self._dirs: List[str] = []
+        self._dir_ids: Dict[str, int] = {}
+        self._dir_entries: List[Dict[str, int]] = []  # dir id -> basename -> image id
+        self._entry_dirs = array("I")
+        self._entry_names: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._entry_names)
+
+    def intern(self, path: str) -> int:
+        """Return the id for ``path``, adding it to the catalog if needed"""
+        directory, name = split_path(path)
+
+        dir_id = self._dir_ids.get(directory)
+        if dir_id is None:
+            dir_id = len(self._dirs)
+            self._dirs.append(directory)
+            self._dir_ids[directory] = dir_id
+            self._dir_entries.append({})
+
+        entries = self._dir_entries[dir_id]
+        image_id = entries.get(name)
+        if image_id is None:
+            image_id = len(self._entry_names)
+            entries[name] = image_id
+            self._entry_dirs.append(dir_id)
+            self._entry_names.append(name)
+        return image_id
+
+    def intern_many(self, paths: Iterable[str]) -> array:
+        """Intern ``paths`` and return their ids as a pool"""
+        return array("I", (self.intern(path) for path in paths))
+
+    def path(self, image_id: int) -> str:
+        """Full path of an image id"""
+        return self._dirs[self._entry_dirs[image_id]] + self._entry_names[image_id]
+
+    def paths(self, image_ids: Iterable[int]) -> List[str]:
+        """Full paths of several image ids"""
+        return [self.path(image_id) for image_id in image_ids]
+
+    def find(self, path: str) -> int:
+        """Return the id for ``path`` or -1 if it is not in the catalog"""
+        directory, name = split_path(path)
+        dir_id = self._dir_ids.get(directory)
+        if dir_id is None:
+            return -1
+        return self._dir_entries[dir_id].get(name, -1)
+
+
+class CatalogSnapshot:
+    """Immutable set of per-monitor image pools published for rotation
+
+    A snapshot is built completely before it is published and is never modified
+    afterwards, so rotation threads can keep using the snapshot they read while a
+    reload builds and swaps in the next one. Pools are read-only views of
+    ``array('I')`` catalog ids. ``sources`` keeps the unfiltered images found in
+    each discovery source, so a later build can reuse them instead of rescanning.
+    """
+
+    __slots__ = ("catalog", "pools", "sources")
+
+    def __init__(
+        self,
+        catalog: ImageCatalog,
+        pools: Optional[Dict[str, array]] = None,
+        sources: Optional[Dict[Hashable, array]] = None,
+    ):
+        self.catalog = catalog
+        self.pools: Mapping[str, Sequence[int]] = _frozen(pools)
+        self.sources: Mapping[Hashable, Sequence[int]] = _frozen(sources)
+
+    def __bool__(self) -> bool:
+        return bool(self.pools)
+
+    def pool(self, monitor_name: str) -> Sequence[int]:
+        """Catalog ids of the images filtered for a monitor"""
+        return self.pools.get(monitor_name, ())
+
+    def path(self, image_id: int) -> str:
+        """Full path of an image id"""
+        return self.catalog.path(image_id)
+
+
+def _frozen(pools: Optional[Dict[Hashable, array]]) -> Mapping[Hashable, Sequence[int]]:
+    """Read-only mapping of read-only pools"""
+    return MappingProxyType(
+        {
+            key: pool if isinstance(pool, memoryview) else memoryview(pool).toreadonly()
+            for key, pool in (pools or {}).items()
+        }
+    )
@@ -1,11 +1,20 @@
 """Configuration management for Rotato."""
 
-from dataclasses import dataclass
+import os
+import threading
+from dataclasses import dataclass, field, fields
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
 
 import yaml
 
+from .decode import DecodePolicy
+from .throttle import Throttle
+
+
+class ConfigError(Exception):
+    """The config file can't be used and there is no earlier one to fall back on"""
+
 
 @dataclass
 class FilterConfig:
@@ -30,6 +39,9 @@ class MonitorConfig:
     recursive: bool = True
     filters: FilterConfig = None
     rotation_interval_minutes: int = 10
+    selection: str = "shuffle"  # random, shuffle, lru or weighted
+    selection_weights: Optional[Dict[str, float]] = None  # Path prefix -> weight
+    smart_crop: bool = False  # Crop around each image's focal point to the monitor's shape
 
     def __post_init__(self):
         if self.filters is None:
@@ -39,15 +51,174 @@ class MonitorConfig:
             self.filters = FilterConfig(**self.filters)
 
 
+@dataclass
+class GlobalConfig:
+    """Settings of the 'global' section
+
+    The app reads them straight from the config dict; this is built when a
+    config is loaded so unknown keys and missing sections are caught up front.
+    """
+
+    rotation_interval_minutes: int = 10
+    cache_file: str = "image_cache.json"
+    stats_file: str = "rotato_stats.json"
+    selection_state_file: str = "selection_state.json"
+    history_file: str = "rotation_history.jsonl"
+    history_max_entries: int = 1000
+    monitor_poll_seconds: float = 5
+    max_recursion_depth: int = 10
+    supported_formats: List[str] = field(
+        default_factory=lambda: [".jpg", ".jpeg", ".png", ".webp"]
+    )
+    hotkeys: Dict[str, str] = field(default_factory=dict)
+    watch_config: bool = True
+    config_poll_seconds: float = 2.0
+    prometheus_textfile: Optional[str] = None
+    background_indexing: Optional[Dict] = None
+    decode: Optional[Dict] = None
+    thumbnail_size: int = 128
+    local_mirror: Optional[Dict] = None
+    cache_max_age_days: Optional[float] = None
+    cache_max_entries: Optional[int] = None
+    cache_max_size_mb: Optional[float] = None
+    control_socket: bool = True
+
+    def __post_init__(self):
+        if not isinstance(self.supported_formats, list):
+            raise ValueError("supported_formats must be a list")
+        if not isinstance(self.hotkeys, dict):
+            raise ValueError("hotkeys must be a mapping")
+        # Sections turned into objects when the app starts
+        DecodePolicy.from_config(self.decode)
+        Throttle.from_config(self.background_indexing)
+
+
+# A discovery source: (path, recursive)
+SourceKey = Tuple[str, bool]
+
+# Global settings that change what discovery finds or where results are stored
+DISCOVERY_SETTINGS = ("supported_formats", "max_recursion_depth", "cache_file")
+
+
+def compile_monitor_configs(config: Dict, monitor_names: Iterable[str]) -> Dict[str, MonitorConfig]:
+    """Resolve the effective MonitorConfig for each connected monitor
+
+    'auto' entries apply to every monitor; when several entries match a monitor
+    the last one wins.
+    """
+    monitor_names = list(monitor_names)
+    compiled: Dict[str, MonitorConfig] = {}
+    for monitor_config_data in config["monitors"]:
+        monitor_config = MonitorConfig(**monitor_config_data)
+        if monitor_config.monitor_name == "auto":
+            targets = monitor_names
+        elif monitor_config.monitor_name in monitor_names:
+            targets = [monitor_config.monitor_name]
+        else:
+            targets = []
+        for name in targets:
+            compiled[name] = monitor_config
+    return compiled
+
+
+def monitor_sources(monitor_config: MonitorConfig) -> List[SourceKey]:
+    """Discovery sources of a monitor config"""
+    return [(source, monitor_config.recursive) for source in monitor_config.image_sources]
+
+
+@dataclass
+class ConfigDiff:
+    """What has to be redone to go from one config to another"""
+
+    full_rescan: bool = False  # Discovery settings changed; rebuild everything
+    rescan_all: bool = False  # Rescan every source for added or deleted images
+    rescan_sources: Set[SourceKey] = field(default_factory=set)
+    refilter_monitors: Set[str] = field(default_factory=set)
+    reschedule_monitors: Set[str] = field(default_factory=set)
+    reselect_monitors: Set[str] = field(default_factory=set)  # Selection or cropping changed
+    hotkeys_changed: bool = False
+    global_changed: bool = False  # Any other global setting changed
+
+    @property
+    def catalog_changed(self) -> bool:
+        return (
+            self.full_rescan
+            or self.rescan_all
+            or bool(self.rescan_sources or self.refilter_monitors)
+        )
+
+    @property
+    def unchanged(self) -> bool:
+        return not (
+            self.catalog_changed
+            or self.reschedule_monitors
+            or self.reselect_monitors
+            or self.hotkeys_changed
+            or self.global_changed
+        )
+
+
+def diff_configs(old: Dict, new: Dict, monitor_names: Iterable[str]) -> ConfigDiff:
+    """Compare two configs for the given monitors"""
+    monitor_names = list(monitor_names)
+    diff = ConfigDiff()
+    old_global, new_global = old.get("global", {}), new.get("global", {})
+
+    diff.hotkeys_changed = old_global.get("hotkeys") != new_global.get("hotkeys")
+    diff.full_rescan = any(old_global.get(key) != new_global.get(key) for key in DISCOVERY_SETTINGS)
+    diff.global_changed = any(
+        old_global.get(key) != new_global.get(key)
+        for key in set(old_global) | set(new_global)
+        if key not in DISCOVERY_SETTINGS and key != "hotkeys"
+    )
+
+    old_monitors = compile_monitor_configs(old, monitor_names)
+    new_monitors = compile_monitor_configs(new, monitor_names)
+
+    old_sources = {key for mc in old_monitors.values() for key in monitor_sources(mc)}
+    new_sources = {key for mc in new_monitors.values() for key in monitor_sources(mc)}
+    diff.rescan_sources = new_sources if diff.full_rescan else new_sources - old_sources
+
+    for name in monitor_names:
+        before, after = old_monitors.get(name), new_monitors.get(name)
+        if before is None or after is None:
+            if before is not after:
+                diff.refilter_monitors.add(name)
+                diff.reschedule_monitors.add(name)
+            continue
+        if (
+            diff.full_rescan
+            or before.filters != after.filters
+            or monitor_sources(before) != monitor_sources(after)
+        ):
+            diff.refilter_monitors.add(name)
+        if before.rotation_interval_minutes != after.rotation_interval_minutes:
+            diff.reschedule_monitors.add(name)
+        if (before.selection, before.selection_weights, before.smart_crop) != (
+            after.selection,
+            after.selection_weights,
+            after.smart_crop,
+        ):
+            diff.reselect_monitors.add(name)
+
+    return diff
+
+
 class ConfigManager:
     """Manages YAML configuration file"""
 
     def __init__(self, config_path: str = "config.yaml"):
         self.config_path = Path(config_path)
+        self.last_good_config: Optional[Dict] = None  # Last config that loaded cleanly
         self.default_config = {
             "global": {
                 "rotation_interval_minutes": 10,
                 "cache_file": "image_cache.json",
+                "stats_file": "rotato_stats.json",
+                "selection_state_file": "selection_state.json",
+                "history_file": "rotation_history.jsonl",
+                "history_max_entries": 1000,
+                "monitor_poll_seconds": 5,
                 "max_recursion_depth": 10,
                 "supported_formats": [".jpg", ".jpeg", ".png", ".webp"],
                 "hotkeys": {
@@ -76,15 +247,30 @@ class ConfigManager:
         """Load configuration from YAML file"""
         if not self.config_path.exists():
             self.save_config(self.default_config)
+            self.last_good_config = self.default_config
             return self.default_config
 
         try:
             with open(self.config_path, "r", encoding="utf-8") as f:
                 config = yaml.safe_load(f)
+            _validate_config(config)
+            self.last_good_config = config
             return config
         except Exception as e:
+            if self.last_good_config is None:
+                # Falling back to the defaults would quietly rotate the wrong folders
+                raise ConfigError(f"{self.config_path}: {e}") from e
             print(f"Error loading config: {e}")
-            return self.default_config
+            print("Keeping the last valid configuration")
+            return self.last_good_config
+
+    def watch(
+        self, callback: Callable[[], None], poll_interval: float = 2.0, debounce: float = 1.0
+    ) -> "ConfigWatcher":
+        """Call ``callback`` whenever the config file changes; returns the running watcher"""
+        watcher = ConfigWatcher(self.config_path, callback, poll_interval, debounce)
+        watcher.start()
+        return watcher
 
     def save_config(self, config: Dict):
         """Save configuration to YAML file"""
@@ -93,3 +279,95 @@ class ConfigManager:
                 yaml.dump(config, f, default_flow_style=False, indent=2)
         except Exception as e:
             print(f"Error saving config: {e}")
+
+
+def _validate_config(config) -> None:
+    """Reject files that parse as YAML but are not a usable Rotato config
+
+    Builds the GlobalConfig and every MonitorConfig the app will build later,
+    so a misspelled monitor or filter key fails here instead of on a later
+    reload. Unknown global keys are only warned about, as the app reads the
+    global section key by key and ignores the rest.
+    """
+    if not isinstance(config, dict):
+        raise ValueError("config must be a mapping")
+    if not isinstance(config.get("global"), dict):
+        raise ValueError("config needs a 'global' section")
+    if not isinstance(config.get("monitors"), list):
+        raise ValueError("config needs a 'monitors' list")
+    known = {global_field.name for global_field in fields(GlobalConfig)}
+    for key in config["global"]:
+        if key not in known:
+            print(f"Warning: unknown key '{key}' in the 'global' section is ignored")
+    try:
+        GlobalConfig(**{key: value for key, value in config["global"].items() if key in known})
+    except (TypeError, ValueError, AttributeError) as e:
+        raise ValueError(f"invalid 'global' section: {e}") from e
+    for i, monitor_config_data in enumerate(config["monitors"]):
+        if not isinstance(monitor_config_data, dict):
+            raise ValueError(f"monitors[{i}] must be a mapping")
+        try:
+            MonitorConfig(**monitor_config_data)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"invalid monitors[{i}]: {e}") from e
+
+
+class ConfigWatcher:
+    """Polls a config file and reports changes once it stops changing
+
+    Editors often save in several steps (truncate, write, rename); the callback
+    only fires after the file has been stable for ``debounce`` seconds.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        callback: Callable[[], None],
+        poll_interval: float = 2.0,
+        debounce: float = 1.0,
+    ):
+        self.path = Path(path)
+        self.callback = callback
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            file_stat = os.stat(self.path)
+        except OSError:
+            return None
+        return file_stat.st_mtime_ns, file_stat.st_size
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="rotato-config-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        last = self._stamp()
+        while not self._stop.wait(self.poll_interval):
+            current = self._stamp()
+            if current == last:
+                continue
+
+            # Wait for the file to settle
+            while not self._stop.wait(self.debounce):
+                newer = self._stamp()
+                if newer == current:
+                    break
+                current = newer
+            if self._stop.is_set():
+                return
+
+            last = current
+            if current is None:
+                continue  # Deleted or mid-rename; keep the running config
+            print("Config file changed.", flush=True)
+            try:
+                self.callback()
+            except Exception as e:
+                print(f"Error applying config change: {e}")
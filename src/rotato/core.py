@@ -1,9 +1,15 @@
 """Main application logic for Rotato."""
 
+import base64
+import io
+import json
+import os
 import random
+import sys
 import threading
+import time
 from pathlib import Path
-from typing import Dict, List
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
 try:
     import keyboard
@@ -19,21 +25,55 @@ try:
     from pystray import MenuItem as item
 
     TRAY_AVAILABLE = True
-except ImportError:
+except Exception:  # ImportError, or no display for pystray's X11 backend
     TRAY_AVAILABLE = False
     print("Warning: pystray not available. System tray icon will not work.")
 
+from . import archives
 from .cache import ImageCache
-from .config import ConfigManager, MonitorConfig
+from .catalog import CatalogSnapshot, ImageCatalog
+from .config import (
+    ConfigDiff,
+    ConfigManager,
+    compile_monitor_configs,
+    diff_configs,
+    monitor_sources,
+)
+from .crop import render_crop
+from .decode import DecodePolicy
+from .fileutil import atomic_write_json
+from .history import RotationHistory
 from .images import ImageManager
-from .monitors import MonitorManager
+from .ipc import ControlServer
+from .metrics import metrics
+from .mirror import LocalMirror
+from .monitors import MonitorChanges, MonitorInfo, MonitorManager
+from .selection import SelectionStrategy, create_strategy
+from .throttle import Throttle
+from .thumbs import THUMBNAIL_SIZE
 from .wallpaper import WallpaperManager
 
+# Seconds between saving selection state during rotation
+SELECTION_SAVE_INTERVAL = 600
+
 
 class DesktopBackgroundManager:
     """Main application class"""
 
-    def __init__(self, config_path: str = "config.yaml"):
+    def __init__(
+        self,
+        config_path: str = "config.yaml",
+        monitor_manager=None,
+        wallpaper_manager: Optional[WallpaperManager] = None,
+        clock: Callable[[], float] = time.time,
+        timer_factory: Callable[..., threading.Timer] = threading.Timer,
+        seed: Optional[int] = None,
+    ):
+        # Time source and timers; the simulator replaces them with virtual ones
+        self.clock = clock
+        self.timer_factory = timer_factory
+        self.seed = seed  # Makes selection reproducible when set
+
         # Load configuration
         self.config_manager = ConfigManager(config_path)
         self.config = self.config_manager.load_config()
@@ -42,204 +82,678 @@ class DesktopBackgroundManager:
         cache_file = self.config["global"]["cache_file"]
         self.image_cache = ImageCache(cache_file)
 
+        # Scan in the background without hurting desktop responsiveness
+        self.configure_indexing(self.config["global"].get("background_indexing"))
+        self.image_cache.decode_policy = DecodePolicy.from_config(
+            self.config["global"].get("decode")
+        )
+        self.image_cache.thumbnail_size = self.config["global"].get(
+            "thumbnail_size", THUMBNAIL_SIZE
+        )
+
         supported_formats = self.config["global"]["supported_formats"]
         max_depth = self.config["global"]["max_recursion_depth"]
         self.image_manager = ImageManager(self.image_cache, supported_formats, max_depth)
 
-        self.monitor_manager = MonitorManager()
-        self.wallpaper_manager = WallpaperManager()
+        self.monitor_manager = monitor_manager or MonitorManager()
+        self.wallpaper_manager = wallpaper_manager or WallpaperManager()
+
+        # Local copies of images on network shares, if configured
+        self.mirror = LocalMirror.from_config(self.config["global"].get("local_mirror"))
+
+        # What was shown where, kept across restarts
+        self.history = RotationHistory(
+            self.config["global"].get("history_file", "rotation_history.jsonl"),
+            self.config["global"].get("history_max_entries", 1000),
+        )
+        self.history.load()
+        for monitor in self.monitor_manager.monitors:
+            current = self.history.current(monitor.name)
+            if current:
+                self.wallpaper_manager.current_wallpapers[monitor.name] = current
 
         # Runtime state
-        self.monitor_images: Dict[str, List[str]] = {}  # monitor_name -> filtered images
+        self.snapshot = CatalogSnapshot(ImageCatalog())  # Published per-monitor image pools
+        self.monitor_configs = compile_monitor_configs(
+            self.config, [m.name for m in self.monitor_manager.monitors]
+        )
         self.rotation_timers: Dict[str, threading.Timer] = {}
+        # Timers are rescheduled from timer threads, reloads, hotkeys and the control socket
+        self._timers_lock = threading.Lock()
         self.is_running = False
+        self.paused = False  # Timers stopped; manual rotation still works
+
+        # Per-monitor selection strategies, rebound whenever a snapshot is published
+        self.selectors: Dict[str, SelectionStrategy] = {}
+        self._selection_specs: Dict[str, tuple] = {}
+        self._selection_lock = threading.Lock()
+        self._saved_selection = self.load_selection_state()
+        self._selection_saved_at = time.monotonic()
+
+        # Background reload
+        self._reload_lock = threading.Lock()
+        self._reload_thread: Optional[threading.Thread] = None
+        self._reload_pending = False
+        self._reload_rescan = False  # The pending reload rescans all sources
+        self._monitors_pending = set()  # Monitors to refilter on the next reload
 
         # System tray
         self.tray_icon = None
+        self.config_watcher = None
+        self.monitor_watcher = None
+        self.control_server: Optional[ControlServer] = None
+        self._backfill_thread: Optional[threading.Thread] = None
 
         # Setup
+        self._hotkey_handles = []
         self.setup_hotkeys()
 
-    def setup_hotkeys(self):
-        """Setup global hotkeys"""
+    def configure_indexing(self, background: Optional[Dict]):
+        """Apply the ``background_indexing`` section to the image cache
+
+        Images are decoded in worker processes. Low priority applies only to
+        them; the daemon itself (tray, hotkeys, rotation timers) keeps its
+        priority.
+        """
+        # One image that hangs its decoder must not stall the daemon
+        self.image_cache.isolate_decodes = True
+        self.image_cache.throttle = Throttle.from_config(background)
+        self.image_cache.low_priority = bool(
+            self.image_cache.throttle and background.get("low_priority", True)
+        )
+
+    def setup_hotkeys(self, config: Optional[Dict] = None):
+        """Setup global hotkeys, replacing any registered earlier"""
         if not KEYBOARD_AVAILABLE:
             print("Skipping hotkey setup (keyboard module not available)")
             return
 
-        hotkeys = self.config["global"]["hotkeys"]
+        for handle in self._hotkey_handles:
+            try:
+                keyboard.remove_hotkey(handle)
+            except Exception as e:
+                print(f"Error removing hotkey: {e}")
+        self._hotkey_handles = []
+
+        hotkeys = (config or self.config)["global"]["hotkeys"]
 
         try:
-            keyboard.add_hotkey(hotkeys["trigger_rotation"], self.trigger_rotation)
-            keyboard.add_hotkey(hotkeys["open_current_image"], self.open_current_image)
+            self._hotkey_handles.append(
+                keyboard.add_hotkey(hotkeys["trigger_rotation"], self.trigger_rotation)
+            )
+            self._hotkey_handles.append(
+                keyboard.add_hotkey(hotkeys["open_current_image"], self.open_current_image)
+            )
             print(f"Hotkeys registered: {hotkeys}")
         except Exception as e:
             print(f"Error setting up hotkeys: {e}")
 
     def discover_and_filter_images(self, show_startup_progress: bool = False):
         """Discover and filter images for all monitors"""
+        self.monitor_configs = compile_monitor_configs(
+            self.config, [m.name for m in self.monitor_manager.monitors]
+        )
+        self.snapshot = self.build_snapshot(self.config, show_startup_progress)
+        self.sync_selection()
+
+    def build_snapshot(
+        self,
+        config: Dict,
+        show_startup_progress: bool = False,
+        previous: Optional[CatalogSnapshot] = None,
+        diff: Optional[ConfigDiff] = None,
+    ) -> CatalogSnapshot:
+        """Build a complete catalog of filtered images for ``config``
+
+        Reads only ``config``, ``previous`` and the image cache, so it can run in the
+        background while rotation keeps using the currently published snapshot.
+        Given the ``previous`` snapshot and a ``diff`` against its config, only
+        changed sources are rescanned and only changed monitors refiltered.
+        """
         if show_startup_progress:
             print("  [1/3] Cataloging images...", flush=True)
         else:
             print("Discovering and filtering images...", flush=True)
 
-        monitor_configs = self.config["monitors"]
-
-        total_targets = 0
-        for monitor_config_data in monitor_configs:
-            monitor_config = MonitorConfig(**monitor_config_data)
-
-            if monitor_config.monitor_name == "auto":
-                total_targets += len(self.monitor_manager.monitors)
-            else:
-                monitor = self.monitor_manager.get_monitor_by_name(
-                    monitor_config.monitor_name
-                )
-                if monitor:
-                    total_targets += 1
+        incremental = (
+            previous is not None
+            and diff is not None
+            and not diff.full_rescan
+            and not diff.rescan_all
+        )
 
-        if total_targets == 0:
+        monitors = self.monitor_manager.monitors
+        monitor_configs = compile_monitor_configs(config, [m.name for m in monitors])
+        if not monitor_configs:
             print("    No monitors found in configuration. Skipping discovery.", flush=True)
-            return
-
-        processed = 0
-        for monitor_config_data in monitor_configs:
-            monitor_config = MonitorConfig(**monitor_config_data)
-
-            # Find matching monitor(s)
-            if monitor_config.monitor_name == "auto":
-                target_monitors = self.monitor_manager.monitors
-            else:
-                monitor = self.monitor_manager.get_monitor_by_name(
-                    monitor_config.monitor_name
-                )
-                target_monitors = [monitor] if monitor else []
+            return CatalogSnapshot(ImageCatalog())
 
-            for monitor in target_monitors:
-                processed += 1
+        keys = list(
+            dict.fromkeys(
+                key
+                for monitor_config in monitor_configs.values()
+                for key in monitor_sources(monitor_config)
+            )
+        )
+        reused = {
+            key
+            for key in keys
+            if incremental and key not in diff.rescan_sources and key in previous.sources
+        }
+        # A share that is offline would scan as empty; keep what it held last time
+        offline = set()
+        if previous is not None:
+            offline = {
+                key
+                for key in keys
+                if key not in reused and key in previous.sources and not os.path.exists(key[0])
+            }
+        # The published catalog is never modified. Refiltering only looks up paths
+        # it already holds; new discoveries go into a fresh catalog holding just
+        # the current sources, into which reused sources and pools are remapped.
+        remap = not incremental or len(reused | offline) < len(keys)
+        catalog = ImageCatalog() if remap else previous.catalog
+
+        def reuse(ids: Sequence[int]) -> Sequence[int]:
+            return catalog.intern_many(previous.catalog.paths(ids)) if remap else ids
+
+        # Discover each source once, even if several monitors use it
+        sources = {}
+        for key in keys:
+            if key in reused:
+                sources[key] = reuse(previous.sources[key])
+                continue
+            source, recursive = key
+            if key in offline:
+                sources[key] = reuse(previous.sources[key])
                 print(
-                    f"    [{processed}/{total_targets}] {monitor.name}: "
-                    f"Scanning {len(monitor_config.image_sources)} source(s)...",
+                    f"    {source} is unreachable; keeping its "
+                    f"{len(sources[key])} images from the last scan.",
                     flush=True,
                 )
-
-                # Discover images
-                images = self.image_manager.discover_images(
-                    monitor_config.image_sources, monitor_config.recursive
-                )
-                print(
-                    f"      Discovered {len(images)} candidate images. Applying filters...",
-                    flush=True,
+                continue
+            print(f"    Scanning {source}...", flush=True)
+            images = self.image_manager.discover_images([source], recursive)
+            sources[key] = catalog.intern_many(images)
+            print(f"      Discovered {len(images)} candidate images.", flush=True)
+
+        pools = {}
+        targets = [monitor for monitor in monitors if monitor.name in monitor_configs]
+        for processed, monitor in enumerate(targets, 1):
+            if (
+                incremental
+                and monitor.name not in diff.refilter_monitors
+                and monitor.name in previous.pools
+            ):
+                pools[monitor.name] = reuse(previous.pools[monitor.name])
+                continue
+
+            monitor_config = monitor_configs[monitor.name]
+            # Images on unreachable sources can't be read to refilter them, so
+            # the monitor keeps the ones it had
+            kept = []
+            unreachable = {
+                image_id
+                for key in monitor_sources(monitor_config)
+                if key in offline
+                for image_id in sources[key]
+            }
+            if unreachable and monitor.name in previous.pools:
+                kept = [
+                    image_id
+                    for image_id in reuse(previous.pools[monitor.name])
+                    if image_id in unreachable
+                ]
+            candidates = list(
+                dict.fromkeys(
+                    image_id
+                    for key in monitor_sources(monitor_config)
+                    for image_id in sources[key]
+                    if image_id not in unreachable
                 )
+            )
+            print(
+                f"    [{processed}/{len(targets)}] {monitor.name}: "
+                f"Filtering {len(candidates)} images from "
+                f"{len(monitor_config.image_sources)} source(s)...",
+                flush=True,
+            )
 
-                # Filter images
-                filtered_images = self.image_manager.filter_images(
-                    images, monitor_config.filters, monitor
-                )
+            # Filter images
+            filtered_images = self.image_manager.filter_images(
+                catalog.paths(candidates), monitor_config.filters, monitor
+            )
 
-                self.monitor_images[monitor.name] = filtered_images
-                print(
-                    f"      Ready {len(filtered_images)} images for {monitor.name}.",
-                    flush=True,
-                )
+            pools[monitor.name] = catalog.intern_many(catalog.paths(kept) + filtered_images)
+            print(
+                f"      Ready {len(pools[monitor.name])} images for {monitor.name}.",
+                flush=True,
+            )
+
+        # Compact the cache now and then so vanished files don't pile up
+        report = self.image_cache.maybe_prune(**self.cache_limits(config))
+        if report and report.removed:
+            print(f"    {report.summary()}", flush=True)
 
         # Save cache
         self.image_cache.save_cache()
+        self.export_stats()
         print("    Image catalog complete.", flush=True)
+        return CatalogSnapshot(catalog, pools, sources)
+
+    def cache_limits(self, config: Optional[Dict] = None) -> Dict:
+        """Cache size and age limits from the global configuration"""
+        global_config = (config or self.config)["global"]
+        return {
+            "max_age_days": global_config.get("cache_max_age_days"),
+            "max_entries": global_config.get("cache_max_entries"),
+            "max_size_mb": global_config.get("cache_max_size_mb"),
+        }
+
+    def selection_state_path(self) -> Optional[Path]:
+        """Path of the file holding selection state, or None if disabled"""
+        state_file = self.config["global"].get("selection_state_file", "selection_state.json")
+        return Path(state_file) if state_file else None
+
+    def load_selection_state(self) -> Dict:
+        """Load selection state saved by a previous run"""
+        path = self.selection_state_path()
+        if not path or not path.exists():
+            return {}
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error loading selection state: {e}")
+            return {}
+
+    def save_selection_state(self):
+        """Persist shuffle bags and show times so a restart carries on"""
+        path = self.selection_state_path()
+        if not path:
+            return
+        with self._selection_lock:
+            state = {
+                name: {"strategy": selector.name, "state": selector.to_state()}
+                for name, selector in self.selectors.items()
+            }
+        try:
+            atomic_write_json(path, state)
+            self._selection_saved_at = time.monotonic()
+        except Exception as e:
+            print(f"Error saving selection state: {e}")
+
+    def sync_selection(self):
+        """Point every monitor's selection strategy at the published pools
+
+        Strategies carry over when only the pool changed, so a reload doesn't
+        restart shuffle cycles. A changed strategy or weights starts over.
+        """
+        snapshot = self.snapshot
+        with self._selection_lock:
+            for monitor_name, monitor_config in self.monitor_configs.items():
+                selector = self.selectors.get(monitor_name)
+                weights = monitor_config.selection_weights
+                spec = (monitor_config.selection, weights)
+                if selector is None or self._selection_specs.get(monitor_name) != spec:
+                    selector = create_strategy(
+                        monitor_config.selection,
+                        snapshot.catalog,
+                        weights,
+                        self._selection_rng(monitor_name),
+                    )
+                    # Seed show times from the history, then restore saved state
+                    selector.seed_history(self.history.last_shown_times(monitor_name))
+                    saved = self._saved_selection.pop(monitor_name, None)
+                    if saved and saved.get("strategy") == selector.name:
+                        selector.load_state(saved.get("state") or {})
+                elif selector.catalog is not snapshot.catalog:
+                    # Ids differ between catalogs; carry state over by path
+                    selector.set_catalog(snapshot.catalog)
+                selector.set_pool(snapshot.pool(monitor_name))
+                self.selectors[monitor_name] = selector
+                self._selection_specs[monitor_name] = spec
+        self.prefetch(fill=True)
+
+    def _selection_rng(self, monitor_name: str) -> Optional[random.Random]:
+        """Random source for a monitor's strategy; seeded per monitor if ``seed`` is set"""
+        if self.seed is None:
+            return None
+        return random.Random(f"{self.seed}:{monitor_name}")
+
+    def prefetch(self, fill: bool = False):
+        """Copy upcoming images into the local mirror, and with ``fill`` the pools"""
+        if not self.mirror:
+            return
+        count = self.config["global"].get("local_mirror", {}).get("prefetch", 3)
+        with self._selection_lock:
+            upcoming = [
+                selector.catalog.path(image_id)
+                for selector in self.selectors.values()
+                for image_id in selector.upcoming(count)
+            ]
+            pools = [
+                selector.catalog.paths(selector.pool) for selector in self.selectors.values()
+            ] if fill else []
+        self.mirror.prefetch(upcoming, urgent=True)
+        for paths in pools:
+            self.mirror.prefetch(paths)
+
+    def export_stats(self):
+        """Write performance metrics to the configured stats files"""
+        global_config = self.config["global"]
+        stats_file = global_config.get("stats_file", "rotato_stats.json")
+        textfile = global_config.get("prometheus_textfile")
+        try:
+            if stats_file:
+                metrics.write_json(stats_file)
+            if textfile:
+                metrics.write_prometheus(textfile)
+        except Exception as e:
+            print(f"Error exporting stats: {e}")
 
     def start_rotation(self):
         """Start wallpaper rotation for all monitors"""
         self.is_running = True
 
         # Set initial wallpapers and start timers
-        for monitor in self.monitor_manager.monitors:
-            self.rotate_wallpaper(monitor.name)
+        self.rotate_wallpapers([monitor.name for monitor in self.monitor_manager.monitors])
 
     def stop_rotation(self):
         """Stop wallpaper rotation"""
-        self.is_running = False
-
-        # Cancel all timers
-        for timer in self.rotation_timers.values():
-            if timer.is_alive():
+        with self._timers_lock:
+            self.is_running = False
+
+            # Cancel all timers
+            for timer in self.rotation_timers.values():
+                if timer.is_alive():
+                    timer.cancel()
+            self.rotation_timers.clear()
+
+    def pause_rotation(self):
+        """Stop rotating on timers until resume_rotation()"""
+        with self._timers_lock:
+            self.paused = True
+            for timer in self.rotation_timers.values():
                 timer.cancel()
-        self.rotation_timers.clear()
+            self.rotation_timers.clear()
+        print("Rotation paused")
+
+    def resume_rotation(self):
+        """Restart rotation timers; the next change comes one interval from now"""
+        if not self.paused:
+            return
+        self.paused = False
+        for monitor in self.monitor_manager.monitors:
+            self.schedule_next_rotation(monitor.name)
+        print("Rotation resumed")
 
     def rotate_wallpaper(self, monitor_name: str):
         """Rotate wallpaper for specific monitor"""
-        if not self.is_running:
-            return
+        self.rotate_wallpapers([monitor_name])
 
-        images = self.monitor_images.get(monitor_name, [])
-        if not images:
-            print(f"No images available for monitor {monitor_name}")
+    def rotate_wallpapers(self, monitor_names: Iterable[str]):
+        """Rotate wallpapers for several monitors with one platform call"""
+        if not self.is_running:
             return
 
-        # Select random image
-        image_path = random.choice(images)
-
-        # Get monitor
-        monitor = None
-        for m in self.monitor_manager.monitors:
-            if m.name == monitor_name:
-                monitor = m
-                break
-
-        if monitor:
-            self.wallpaper_manager.set_wallpaper(monitor, image_path)
+        assignments = []
+        for monitor_name in monitor_names:
+            # A disconnected monitor stops rotating until it comes back
+            monitor = self.monitor_manager.get_monitor_by_name(monitor_name)
+            if monitor is None:
+                continue
+            image_path = self._pick_wallpaper(monitor_name)
+            if image_path is None:
+                print(f"No images available for monitor {monitor_name}")
+                continue
+            assignments.append((monitor, image_path))
+        self._show(assignments)
+
+    def show_image(
+        self, image_path: str, monitor_names: Optional[Iterable[str]] = None
+    ) -> List[str]:
+        """Show a specific image on some monitors (all by default) and restart their timers
+
+        Returns the names of the monitors that were updated.
+        """
+        if not archives.split_member(image_path):
+            image_path = str(Path(image_path).resolve())
+        if not archives.source_exists(image_path):
+            raise FileNotFoundError(f"No such image: {image_path}")
+        if monitor_names is None:
+            monitors = list(self.monitor_manager.monitors)
+        else:
+            monitors = [self._monitor(name) for name in monitor_names]
+
+        # Count it as shown, so the selection doesn't bring it up again right away
+        now = self.clock()
+        with self._selection_lock:
+            for monitor in monitors:
+                selector = self.selectors.get(monitor.name)
+                image_id = selector.catalog.find(image_path) if selector else -1
+                if image_id >= 0:
+                    selector.mark_shown(image_id, now)
+        return self._show([(monitor, image_path) for monitor in monitors])
+
+    def _monitor(self, name: str) -> MonitorInfo:
+        monitor = self.monitor_manager.get_monitor_by_name(name)
+        if monitor is None:
+            raise ValueError(f"Unknown monitor: {name}")
+        return monitor
+
+    def _show(self, assignments: List[Tuple[MonitorInfo, str]]) -> List[str]:
+        """Put chosen images on the desktop, record them and schedule the next rotation"""
+        if not assignments:
+            return []
+
+        if self.mirror:
+            # Serve from local copies so a slow or offline share doesn't stall
+            for monitor, image_path in assignments:
+                self.mirror.pin(monitor.name, image_path)
+            desktop = [(monitor, self.mirror.resolve(path)) for monitor, path in assignments]
+        else:
+            desktop = assignments
+        desktop = [
+            (monitor, self._render(monitor, image_path, desktop_path))
+            for (monitor, image_path), (_monitor, desktop_path) in zip(assignments, desktop)
+        ]
+        updated = self.wallpaper_manager.set_wallpapers(desktop)
+        now = self.clock()
+        for monitor, image_path in assignments:
+            if monitor.name in updated:
+                self.history.record(monitor.name, image_path, now)
+        self.prefetch()
+        self.update_tray_icon()
+        self.backfill_previews()
+        self.export_stats()
+        if time.monotonic() - self._selection_saved_at > SELECTION_SAVE_INTERVAL:
+            self.save_selection_state()
+            if self.mirror:
+                self.mirror.save_index()
 
         # Schedule next rotation
-        self.schedule_next_rotation(monitor_name)
+        for monitor, _image_path in assignments:
+            self.schedule_next_rotation(monitor.name)
+        return updated
+
+    def _render(self, monitor: MonitorInfo, image_path: str, source_path: str) -> str:
+        """Path to hand to the desktop, cropped to the monitor's shape if configured"""
+        monitor_config = self.monitor_configs.get(monitor.name)
+        if not monitor_config or not monitor_config.smart_crop:
+            return source_path
+        info = self.image_cache.get_image_info(image_path)
+        if info is None:
+            return source_path
+        try:
+            return render_crop(source_path, info, monitor)
+        except Exception as e:
+            print(f"Error cropping {image_path}: {e}")
+            return source_path
+
+    def _pick_wallpaper(self, monitor_name: str) -> Optional[str]:
+        """Choose the next image for a monitor and mark it shown"""
+        with self._selection_lock:
+            selector = self.selectors.get(monitor_name)
+            image_id = selector.pick() if selector else None
+            if image_id is None:
+                return None
+            selector.mark_shown(image_id, self.clock())
+            # The selector may still be bound to the previous catalog mid-reload
+            return selector.catalog.path(image_id)
 
     def schedule_next_rotation(self, monitor_name: str):
         """Schedule next wallpaper rotation"""
-        if not self.is_running:
-            return
-
         # Find interval for this monitor
-        interval_minutes = self.config["global"]["rotation_interval_minutes"]
+        monitor_config = self.monitor_configs.get(monitor_name)
+        if monitor_config:
+            interval_minutes = monitor_config.rotation_interval_minutes
+        else:
+            interval_minutes = self.config["global"]["rotation_interval_minutes"]
 
-        # Check for monitor-specific interval
-        for monitor_config_data in self.config["monitors"]:
-            monitor_config = MonitorConfig(**monitor_config_data)
-            if (
-                monitor_config.monitor_name == monitor_name
-                or monitor_config.monitor_name == "auto"
-            ):
-                interval_minutes = monitor_config.rotation_interval_minutes
-                break
+        with self._timers_lock:
+            if not self.is_running or self.paused:
+                return
 
-        # Cancel existing timer
-        if monitor_name in self.rotation_timers:
-            self.rotation_timers[monitor_name].cancel()
+            # Cancel existing timer
+            if monitor_name in self.rotation_timers:
+                self.rotation_timers[monitor_name].cancel()
 
-        # Schedule new timer
-        timer = threading.Timer(
-            interval_minutes * 60, lambda: self.rotate_wallpaper(monitor_name)
-        )
-        timer.start()
-        self.rotation_timers[monitor_name] = timer
+            # Schedule new timer
+            timer = self.timer_factory(
+                interval_minutes * 60, lambda: self.rotate_wallpaper(monitor_name)
+            )
+            timer.start()
+            self.rotation_timers[monitor_name] = timer
 
     def trigger_rotation(self):
         """Manually trigger wallpaper rotation for all monitors"""
         print("Triggering manual rotation...")
-        for monitor in self.monitor_manager.monitors:
-            self.rotate_wallpaper(monitor.name)
+        self.rotate_wallpapers([monitor.name for monitor in self.monitor_manager.monitors])
 
     def open_current_image(self):
-        """Open current wallpaper image in Explorer"""
+        """Open current wallpaper image in Explorer (or the file manager on Linux)"""
         import subprocess
 
-        # For simplicity, get the first monitor's current wallpaper
-        if self.monitor_manager.monitors:
-            monitor_name = self.monitor_manager.monitors[0].name
-            current_path = self.wallpaper_manager.get_current_wallpaper(monitor_name)
+        # The most recently changed wallpaper on any monitor
+        latest = self.history.latest()
+        current_path = latest.path if latest else None
+        member = archives.split_member(current_path) if current_path else None
+        if member:
+            # Show the archive the image came from
+            current_path = member[0]
 
-            if current_path and Path(current_path).exists():
+        if current_path and Path(current_path).exists():
+            if sys.platform == "win32":
                 # Open file in Explorer and select it
                 subprocess.run(["explorer", "/select,", current_path])
-                print(f"Opened in Explorer: {Path(current_path).name}")
             else:
-                print("No current wallpaper found")
+                subprocess.Popen(["xdg-open", str(Path(current_path).parent)])
+            print(f"Opened in file manager: {Path(current_path).name}")
+        else:
+            print("No current wallpaper found")
+
+    def control_handlers(self) -> Dict[str, Callable]:
+        """Commands served to `rotato ctl` over the control socket"""
+
+        def next_(monitor: Optional[str] = None):
+            names = [self._monitor(monitor).name] if monitor else None
+            self.rotate_wallpapers(names or [m.name for m in self.monitor_manager.monitors])
+            return self.status()["monitors"]
+
+        def set_(path: str, monitor: Optional[str] = None):
+            return self.show_image(path, [monitor] if monitor else None)
+
+        def reload():
+            self.reload_config()
+            return "reloading"
+
+        def preview(count: int = 3, thumbnails: bool = False):
+            encode = self.image_cache.thumbnail if thumbnails else None
+
+            def describe(path: Optional[str]) -> Optional[Dict]:
+                if path is None:
+                    return None
+                data = encode(path) if encode else None
+                thumbnail = base64.b64encode(data).decode("ascii") if data else None
+                return {"path": path, "thumbnail": thumbnail}
+
+            return {
+                name: {
+                    "current": describe(monitor["current"]),
+                    "upcoming": [describe(path) for path in monitor["upcoming"]],
+                }
+                for name, monitor in self.preview(count).items()
+            }
+
+        return {
+            "next": next_,
+            "set": set_,
+            "reload": reload,
+            "pause": self.pause_rotation,
+            "resume": self.resume_rotation,
+            "status": self.status,
+            "stats": metrics.snapshot,
+            "preview": preview,
+        }
+
+    def preview(self, count: int = 3) -> Dict[str, Dict]:
+        """Current and next ``count`` images of each monitor
+
+        Thumbnails for them come from ``image_cache.thumbnail``, which reads the
+        thumbnail pack instead of decoding the originals.
+        """
+        previews = {}
+        with self._selection_lock:
+            for monitor in self.monitor_manager.monitors:
+                selector = self.selectors.get(monitor.name)
+                upcoming = selector.upcoming(count) if selector else []
+                previews[monitor.name] = {
+                    "current": self.history.current(monitor.name),
+                    "upcoming": selector.catalog.paths(upcoming) if selector else [],
+                }
+        return previews
+
+    def status(self) -> Dict:
+        """Running state and the current wallpaper and pool of each monitor"""
+        snapshot = self.snapshot
+        monitors = {}
+        for monitor in self.monitor_manager.monitors:
+            monitor_config = self.monitor_configs.get(monitor.name)
+            interval = monitor_config.rotation_interval_minutes if monitor_config else None
+            monitors[monitor.name] = {
+                "current": self.history.current(monitor.name),
+                "pool": len(snapshot.pool(monitor.name)),
+                "interval_minutes": interval,
+            }
+        return {"running": self.is_running, "paused": self.paused, "monitors": monitors}
+
+    def backfill_previews(self):
+        """Make missing thumbnails of current and upcoming images in the background
+
+        Images analyzed before thumbnails were turned on, or whose thumbnail was
+        lost, get one when they come up instead of being treated as stale.
+        """
+        if self._backfill_thread and self._backfill_thread.is_alive():
+            return
+        paths = [
+            path
+            for preview in self.preview().values()
+            for path in [preview["current"], *preview["upcoming"]]
+            if path
+        ]
+        missing = self.image_cache.missing_thumbnails(paths)
+        if not missing:
+            return
+
+        def backfill():
+            if self.image_cache.backfill_thumbnails(missing):
+                self.update_tray_icon()
+
+        self._backfill_thread = threading.Thread(
+            target=backfill, name="rotato-thumbnails", daemon=True
+        )
+        self._backfill_thread.start()
 
     def create_tray_icon(self):
         """Create system tray icon"""
@@ -248,13 +762,14 @@ class DesktopBackgroundManager:
             return
 
         try:
-            # Create a simple icon (you can replace with a proper .ico file)
-            icon_image = PILImage.new("RGB", (64, 64), color="blue")
+            # The current wallpaper's thumbnail once one is shown, a plain icon until then
+            icon_image = self._tray_image() or PILImage.new("RGB", (64, 64), color="blue")
 
             menu = pystray.Menu(
                 item("Rotate Now", self.trigger_rotation),
                 item("Open Current Image", self.open_current_image),
-                item("Reload Config", self.reload_config),
+                item("Up Next", pystray.Menu(self._up_next_items)),
+                item("Reload Config", lambda: self.reload_config()),
                 pystray.Menu.SEPARATOR,
                 item("Exit", self.quit_application),
             )
@@ -266,24 +781,173 @@ class DesktopBackgroundManager:
         except Exception as e:
             print(f"Error creating tray icon: {e}")
 
-    def reload_config(self):
-        """Reload configuration and restart rotation"""
-        print("Reloading configuration...")
-        self.stop_rotation()
+    def _tray_image(self):
+        """Thumbnail of the most recently shown wallpaper, from the thumbnail pack"""
+        latest = self.history.latest()
+        data = self.image_cache.thumbnail(latest.path) if latest else None
+        if data is None:
+            return None
+        image = PILImage.open(io.BytesIO(data))
+        image.load()
+        return image
+
+    def _up_next_items(self):
+        """Tray submenu of each monitor's upcoming images; clicking one shows it now"""
+
+        def show(path: str, monitor_name: str):
+            return lambda: self.show_image(path, [monitor_name])
+
+        items = []
+        for monitor_name, preview in self.preview().items():
+            for path in preview["upcoming"]:
+                items.append(item(f"{monitor_name}: {Path(path).name}", show(path, monitor_name)))
+        return items or [item("Nothing queued", None, enabled=False)]
+
+    def update_tray_icon(self):
+        """Show the current wallpaper in the tray and refresh the Up Next menu"""
+        if not self.tray_icon:
+            return
+        try:
+            image = self._tray_image()
+            if image is not None:
+                self.tray_icon.icon = image
+            self.tray_icon.update_menu()
+        except Exception as e:
+            print(f"Error updating tray icon: {e}")
+
+    def reload_config(self, rescan: bool = True):
+        """Reload configuration in the background and swap in the new catalog
+
+        Rotation keeps running on the current catalog until the new one is
+        complete. A reload requested while one is running is queued. With
+        ``rescan`` (manual reloads) every source is rescanned for added and
+        deleted images; otherwise only what the config change requires is redone.
+        """
+        with self._reload_lock:
+            self._reload_rescan |= rescan
+            if self._reload_thread and self._reload_thread.is_alive():
+                self._reload_pending = True
+                print("Reload already in progress; reloading again when it finishes")
+                return
+            self._reload_thread = threading.Thread(
+                target=self._reload_worker, name="rotato-reload", daemon=True
+            )
+            self._reload_thread.start()
+
+    def _reload_worker(self):
+        """Apply the latest config until no reload is pending"""
+        while True:
+            print("Reloading configuration...")
+            with self._reload_lock:
+                rescan, self._reload_rescan = self._reload_rescan, False
+            try:
+                self._apply_config(self.config_manager.load_config(), rescan)
+            except Exception as e:
+                print(f"Error reloading configuration: {e}")
+
+            with self._reload_lock:
+                if not self._reload_pending:
+                    return
+                self._reload_pending = False
+
+    def on_monitors_changed(self, changes: MonitorChanges):
+        """Refilter only the monitors that were connected or changed resolution"""
+        with self._timers_lock:
+            for monitor_name in changes.removed:
+                timer = self.rotation_timers.pop(monitor_name, None)
+                if timer:
+                    timer.cancel()
+        if not changes.refilter:
+            return
+        with self._reload_lock:
+            self._monitors_pending |= changes.refilter
+        self.reload_config(rescan=False)
+
+    def _apply_config(self, config: Dict, rescan: bool = False):
+        """Do the minimal work to move from the current config to ``config``
+
+        ``rescan`` also rescans every source, to pick up added or deleted images.
+        """
+        monitor_names = [m.name for m in self.monitor_manager.monitors]
+        diff = diff_configs(self.config, config, monitor_names)
+        diff.rescan_all = rescan
+        with self._reload_lock:
+            # Monitor changes reuse the catalog; only their pools are rebuilt
+            diff.refilter_monitors |= self._monitors_pending & set(monitor_names)
+            self._monitors_pending = set()
+        if diff.unchanged:
+            print("Configuration unchanged.", flush=True)
+            return
 
-        # Reload config
-        self.config = self.config_manager.load_config()
+        global_config = config["global"]
+        if diff.full_rescan:
+            if global_config["cache_file"] != self.config["global"]["cache_file"]:
+                self.image_cache.save_cache()
+                self.image_cache.close()
+                self.image_cache = ImageCache(global_config["cache_file"])
+                self.image_manager.cache = self.image_cache
+            self.image_manager.supported_formats = [
+                fmt.lower() for fmt in global_config["supported_formats"]
+            ]
+            self.image_manager.max_depth = global_config["max_recursion_depth"]
+        if diff.full_rescan or diff.global_changed:
+            self.configure_indexing(global_config.get("background_indexing"))
+            self.image_cache.decode_policy = DecodePolicy.from_config(global_config.get("decode"))
+            self.image_cache.thumbnail_size = global_config.get("thumbnail_size", THUMBNAIL_SIZE)
+        if global_config.get("local_mirror") != self.config["global"].get("local_mirror"):
+            if self.mirror:
+                self.mirror.stop()
+            self.mirror = LocalMirror.from_config(global_config.get("local_mirror"))
+
+        if diff.hotkeys_changed:
+            self.setup_hotkeys(config)
+
+        snapshot = self.snapshot
+        if diff.catalog_changed:
+            snapshot = self.build_snapshot(config, previous=snapshot, diff=diff)
+        self.publish(config, snapshot, diff)
+
+    def publish(self, config: Dict, snapshot: CatalogSnapshot, diff: Optional[ConfigDiff] = None):
+        """Switch rotation to a new config and catalog
+
+        Without a ``diff`` every monitor gets a new wallpaper and a fresh timer;
+        with one, only monitors whose pool or interval changed are touched.
+        """
+        self.config = config
+        self.monitor_configs = compile_monitor_configs(
+            config, [m.name for m in self.monitor_manager.monitors]
+        )
+        self.snapshot = snapshot
+        self.sync_selection()
+        print("Configuration reloaded.", flush=True)
 
-        # Re-discover images
-        self.discover_and_filter_images()
+        if not self.is_running:
+            return
+        if diff is None:
+            self.start_rotation()
+            return
 
-        # Restart rotation
-        self.start_rotation()
+        # Show images from new pools (or a new strategy) right away
+        self.rotate_wallpapers(sorted(diff.refilter_monitors | diff.reselect_monitors))
+        # Restart timers whose interval changed
+        for monitor_name in diff.reschedule_monitors - diff.refilter_monitors - diff.reselect_monitors:
+            self.schedule_next_rotation(monitor_name)
 
     def quit_application(self):
         """Quit the application"""
         print("Shutting down...")
         self.stop_rotation()
+        if self.config_watcher:
+            self.config_watcher.stop()
+        if self.monitor_watcher:
+            self.monitor_watcher.stop()
+        self.export_stats()
+        self.save_selection_state()
+        if self.mirror:
+            self.mirror.stop()
+        if self.control_server:
+            self.control_server.stop()
+        self.image_cache.close()
 
         if self.tray_icon:
             self.tray_icon.stop()
@@ -294,7 +958,7 @@ class DesktopBackgroundManager:
         """Run the application"""
         print("Starting Rotato - Desktop Background Manager...")
 
-        if not self.monitor_images:
+        if not self.snapshot:
             self.discover_and_filter_images(show_startup_progress=True)
         else:
             print("  [1/3] Cataloging images... (cached)", flush=True)
@@ -306,6 +970,24 @@ class DesktopBackgroundManager:
         # Start rotation
         print("  [3/3] Starting rotation timers...", flush=True)
         self.start_rotation()
+
+        # Apply edits to the config file automatically
+        global_config = self.config["global"]
+        if global_config.get("watch_config", True):
+            self.config_watcher = self.config_manager.watch(
+                lambda: self.reload_config(rescan=False),
+                global_config.get("config_poll_seconds", 2.0),
+            )
+        # Follow docking, undocking and resolution changes
+        monitor_poll = global_config.get("monitor_poll_seconds", 5.0)
+        if monitor_poll:
+            self.monitor_watcher = self.monitor_manager.watch(
+                self.on_monitors_changed, monitor_poll
+            )
+        # Accept commands from `rotato ctl`
+        if global_config.get("control_socket", True):
+            self.control_server = ControlServer(self.control_handlers())
+            self.control_server.start()
         print("Rotato is up and running. Check the tray icon for controls.", flush=True)
 
         # Run tray icon (this blocks)
@@ -313,8 +995,6 @@ class DesktopBackgroundManager:
             self.tray_icon.run()
         else:
             # Fallback: just keep running
-            import time
-
             try:
                 print("Running without tray icon. Press Ctrl+C to quit.")
                 while self.is_running:
@@ -0,0 +1,70 @@
+"""Focal-point cropping of wallpapers to a monitor's aspect ratio."""
+
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from . import archives
+from .cache import ImageInfo
+from .fileutil import prune_directory
+from .monitors import MonitorInfo
+
+# Cropped wallpapers kept in the temp directory
+RENDERED_KEEP = 8
+
+Box = Tuple[int, int, int, int]
+
+
+def crop_box(info: ImageInfo, target_width: int, target_height: int) -> Box:
+    """Largest box with the target aspect ratio, centered on the focal point
+
+    Works on the analysis stored in ``info`` alone, so it costs O(1). The box is
+    in display orientation and is shifted as needed to stay inside the image.
+    """
+    target_ratio = target_width / target_height
+    if info.aspect_ratio > target_ratio:
+        height = info.height
+        width = min(info.width, round(height * target_ratio))
+    else:
+        width = info.width
+        height = min(info.height, round(width / target_ratio))
+
+    left = _clamp(round(info.focal_x * info.width - width / 2), 0, info.width - width)
+    top = _clamp(round(info.focal_y * info.height - height / 2), 0, info.height - height)
+    return left, top, left + width, top + height
+
+
+def _clamp(value: int, low: int, high: int) -> int:
+    return max(low, min(value, high))
+
+
+def render_crop(
+    path: str, info: ImageInfo, monitor: MonitorInfo, directory: Optional[str] = None
+) -> str:
+    """Write ``path`` cropped around its focal point and scaled to fill ``monitor``
+
+    Returns the path of the rendered file. Renders are reused while the source
+    and monitor size stay the same.
+    """
+    directory = Path(directory or Path(tempfile.gettempdir()) / "rotato-crop")
+    directory.mkdir(parents=True, exist_ok=True)
+    key = f"{info.content_id or path}:{monitor.width}x{monitor.height}"
+    target = directory / (hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest() + ".jpg")
+
+    if not target.exists():
+        box = crop_box(info, monitor.width, monitor.height)
+        with archives.open_source(path, unpack=False) as f, Image.open(f) as img:
+            upright = ImageOps.exif_transpose(img).convert("RGB")
+            cropped = upright.crop(box)
+            if cropped.width > monitor.width:
+                cropped = cropped.resize((monitor.width, monitor.height), Image.Resampling.LANCZOS)
+            tmp = target.with_name(target.name + ".tmp")
+            cropped.save(tmp, "JPEG", quality=92)
+        tmp.replace(target)
+    target.touch()
+
+    prune_directory(directory, RENDERED_KEEP)
+    return str(target)
@@ -0,0 +1,369 @@
+"""Guarded decoding of images for analysis.
+
+Analysis only needs the average brightness and a small proxy of an image, so the
+decode strategy is chosen by format and size to keep one huge or pathological
+file from exhausting memory or stalling a scan:
+
+- JPEGs are decoded at 1/2 to 1/8 scale (``draft``), which the DCT does for free;
+- uncompressed images (BMP, raw TIFF, PPM) over the memory budget are read in strips;
+- animated images contribute their first frame only;
+- 16-bit and float images are scaled to 8 bits instead of being clipped.
+
+Other images over budget, and decodes over the time limit, raise DecodeRejected
+so the cache can quarantine them.
+
+The time limit is enforced in two steps. ``call_with_timeout`` interrupts a
+decode with SIGALRM, which only takes effect between Pillow's calls into C; a
+single long C call (a huge resize, a libtiff read) can't be interrupted that
+way. Decodes that must not hang run on a DecodePool instead, whose worker
+process is killed and replaced once a job overruns its deadline.
+"""
+
+import math
+import multiprocessing
+import queue
+import signal
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from PIL import Image, ImageStat
+
+# Quarantine reasons
+TOO_LARGE = "too_large"  # Over the pixel budget, or over the memory budget with no cheaper strategy
+TIMEOUT = "timeout"
+CORRUPT = "corrupt"  # Not decodable
+
+# Time a worker gets past the decode time limit before its process is killed,
+# so the in-process timeout can report it first
+KILL_GRACE_SECONDS = 5.0
+
+
+@dataclass
+class DecodePolicy:
+    """Limits on decoding one image for analysis"""
+
+    max_pixels: int = 100_000_000  # Larger images (after draft scaling) are never decoded
+    max_memory_mb: float = 256  # Estimated peak memory of decoding an image at once
+    timeout_seconds: float = 30  # 0 disables the time limit
+
+    @classmethod
+    def from_config(cls, settings: Optional[Dict]) -> "DecodePolicy":
+        """Build a policy from the ``decode`` config section"""
+        settings = settings or {}
+        default = cls()
+        return cls(
+            max_pixels=int(settings.get("max_pixels", default.max_pixels)),
+            max_memory_mb=float(settings.get("max_memory_mb", default.max_memory_mb)),
+            timeout_seconds=float(settings.get("timeout_seconds", default.timeout_seconds)),
+        )
+
+    @property
+    def max_bytes(self) -> int:
+        return int(self.max_memory_mb * 1024 * 1024)
+
+    @property
+    def kill_after(self) -> Optional[float]:
+        """Seconds after which a decode worker is killed, or None without a time limit"""
+        if self.timeout_seconds <= 0:
+            return None
+        return self.timeout_seconds + KILL_GRACE_SECONDS
+
+
+class DecodeRejected(Exception):
+    """An image the decode policy refuses; ``reason`` is a quarantine reason"""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+    def __reduce__(self):
+        # Raised in worker processes and re-raised here
+        return type(self), (self.reason, str(self))
+
+
+def pixel_bytes(mode: str) -> int:
+    """Bytes per pixel of an image mode in memory (multi-band modes are padded to 4)"""
+    if mode in ("1", "L", "P"):
+        return 1
+    if mode.startswith("I;16"):
+        return 2
+    return 4
+
+
+def decode_cost(size: Tuple[int, int], mode: str) -> int:
+    """Estimated peak bytes to decode an image and convert it to RGB"""
+    pixels = size[0] * size[1]
+    return pixels * (pixel_bytes(mode) + (0 if mode == "RGB" else 4))
+
+
+def to_rgb(img: Image.Image) -> Image.Image:
+    """8-bit RGB copy of an image, with transparency composited onto white"""
+    if img.mode.startswith("I;16") or img.mode in ("I", "F"):
+        img = _to_8bit(img)
+    if img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info):
+        img = img.convert("RGBA")
+        rgb = Image.new("RGB", img.size, (255, 255, 255))
+        rgb.paste(img, mask=img.getchannel("A"))
+        return rgb
+    return img.convert("RGB")
+
+
+def _to_8bit(img: Image.Image) -> Image.Image:
+    """Scale a 16-bit, 32-bit or float image into 0-255 (convert() would clip it)"""
+    if img.mode != "F":
+        img = img.convert("I")
+    high = img.getextrema()[1]
+    if img.mode == "F":
+        scale = 255 / high if high > 0 else 1
+    elif high > 65535:
+        scale = 255 / high
+    elif high > 255:
+        scale = 255 / 65535
+    else:
+        scale = 1
+    return img.point(lambda value: value * scale).convert("L")
+
+
+def decode_for_analysis(
+    img: Image.Image, policy: DecodePolicy, proxy_size: int
+) -> Tuple[float, Image.Image]:
+    """Average brightness (0-255) and a reduced RGB proxy of an opened image
+
+    Only the current (first) frame is decoded. The proxy's shorter side is about
+    ``2 * proxy_size`` pixels, or the full image if it is smaller.
+    """
+    width, height = img.size
+    scale = max(1, min(width, height) // (proxy_size * 2))
+    if img.format in ("JPEG", "MPO") and scale > 1:
+        # The decoder picks the smallest 1/2, 1/4 or 1/8 scale at least this big
+        img.draft("RGB", (width // scale, height // scale))
+
+    if img.width * img.height > policy.max_pixels:
+        raise DecodeRejected(TOO_LARGE, f"{width}x{height} exceeds the pixel budget")
+    if decode_cost(img.size, img.mode) > policy.max_bytes:
+        layout = _raw_layout(img)
+        if layout is None:
+            raise DecodeRejected(
+                TOO_LARGE, f"{width}x{height} {img.mode} {img.format} exceeds the memory budget"
+            )
+        return _decode_strips(img, layout, policy, proxy_size)
+
+    rgb = to_rgb(img)
+    brightness = sum(ImageStat.Stat(rgb).mean) / 3
+    return brightness, rgb.reduce(max(1, min(rgb.size) // (proxy_size * 2)))
+
+
+def _raw_layout(img: Image.Image) -> Optional[Tuple[int, str, int, int]]:
+    """(offset, raw mode, stride, row order) of an image stored as one uncompressed block"""
+    if len(img.tile) != 1 or not img.fp:
+        return None
+    codec, extents, offset, args = img.tile[0]
+    if codec != "raw" or tuple(extents) != (0, 0, img.width, img.height):
+        return None
+    if isinstance(args, str):
+        args = (args,)
+    rawmode, stride, ystep = (tuple(args) + (0, 1))[:3]
+    if not stride:
+        try:
+            stride = len(Image.new(img.mode, (img.width, 1)).tobytes("raw", rawmode))
+        except (ValueError, OSError):
+            return None
+    return offset, rawmode, stride, ystep
+
+
+def _decode_strips(
+    img: Image.Image, layout: Tuple[int, str, int, int], policy: DecodePolicy, proxy_size: int
+) -> Tuple[float, Image.Image]:
+    """decode_for_analysis for uncompressed images, reading a band of rows at a time"""
+    offset, rawmode, stride, ystep = layout
+    width, height = img.size
+    factor = max(1, min(width, height) // (proxy_size * 2))
+    # Half the budget per band leaves room for its RGB copy and reduction
+    rows = (policy.max_bytes // 2) // max(1, stride + width * 4)
+    rows = max(factor, rows - rows % factor)
+
+    proxy = Image.new("RGB", (math.ceil(width / factor), math.ceil(height / factor)))
+    sums = [0.0, 0.0, 0.0]
+    palette = img.getpalette() if img.mode == "P" else None
+    for top in range(0, height, rows):
+        count = min(rows, height - top)
+        # Bottom-up files (ystep -1) store the last image row first
+        first_row = top if ystep >= 0 else height - top - count
+        img.fp.seek(offset + first_row * stride)
+        data = img.fp.read(count * stride)
+        if len(data) < count * stride:
+            raise DecodeRejected(CORRUPT, "image file is truncated")
+        band = Image.frombytes(img.mode, (width, count), data, "raw", rawmode, stride, ystep)
+        if palette is not None:
+            band.putpalette(palette)
+            band.info = dict(img.info)
+        band = to_rgb(band)
+        for channel, value in enumerate(ImageStat.Stat(band).sum):
+            sums[channel] += value
+        proxy.paste(band.reduce(factor), (0, top // factor))
+    return sum(sums) / (3 * width * height), proxy
+
+
+def call_with_timeout(
+    func: Callable[..., Any], args: Sequence = (), seconds: Optional[float] = None
+) -> Any:
+    """Call ``func(*args)``, raising DecodeRejected(TIMEOUT) after ``seconds``
+
+    Best effort: in the main thread on POSIX (where worker processes run their
+    jobs) the call is interrupted with SIGALRM once control returns to Python.
+    Elsewhere it runs on a watchdog thread that is abandoned on timeout; it
+    finishes in the background and its result is dropped. Use a DecodePool to
+    stop a decode for certain.
+    """
+    if not seconds or seconds <= 0:
+        return func(*args)
+
+    if hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread():
+
+        def on_alarm(signum, frame):
+            raise DecodeRejected(TIMEOUT, f"decoding took longer than {seconds:g}s")
+
+        previous = signal.signal(signal.SIGALRM, on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, seconds)
+        try:
+            return func(*args)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+    outcome: Dict[str, Any] = {}
+
+    def run():
+        try:
+            outcome["result"] = func(*args)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run, name="rotato-decode", daemon=True)
+    thread.start()
+    thread.join(seconds)
+    if thread.is_alive():
+        raise DecodeRejected(TIMEOUT, f"decoding took longer than {seconds:g}s")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+class DecodeWorker:
+    """A child process that runs jobs one at a time and is killed if one overruns
+
+    The process is started on the first job and again after it was killed or
+    died. Processes are spawned rather than forked, as the daemon has threads.
+    """
+
+    def __init__(self, initializer: Optional[Callable[[], None]] = None):
+        self.initializer = initializer
+        self._process = None
+        self._conn = None
+
+    def run(
+        self, func: Callable[..., Any], args: Sequence = (), kill_after: Optional[float] = None
+    ):
+        """``func(*args)`` in the worker process
+
+        Raises DecodeRejected(TIMEOUT) if it takes longer than ``kill_after``
+        seconds, and OSError if the process died.
+        """
+        if self._process is None or not self._process.is_alive():
+            self._start()
+        self._conn.send((func, tuple(args)))
+        # poll() also returns when the process died, and recv() then fails
+        if not self._conn.poll(kill_after):
+            self.close()
+            raise DecodeRejected(TIMEOUT, f"decoding took longer than {kill_after:g}s, killed")
+        try:
+            ok, value = self._conn.recv()
+        except EOFError:
+            exitcode = self._process.exitcode
+            self.close()
+            raise OSError(f"decode worker exited with code {exitcode}") from None
+        if not ok:
+            raise value
+        return value
+
+    def close(self):
+        """Stop the worker process"""
+        if self._process is None:
+            return
+        self._process.kill()
+        self._process.join()
+        self._conn.close()
+        self._process = None
+        self._conn = None
+
+    def _start(self):
+        self.close()
+        context = multiprocessing.get_context("spawn")
+        self._conn, child = context.Pipe()
+        self._process = context.Process(
+            target=_worker_main, args=(child, self.initializer), name="rotato-decoder", daemon=True
+        )
+        self._process.start()
+        child.close()
+
+
+def _worker_main(conn, initializer: Optional[Callable[[], None]]):
+    """Job loop of a DecodeWorker process"""
+    if initializer is not None:
+        initializer()
+    while True:
+        try:
+            func, args = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            result = (True, func(*args))
+        except Exception as e:
+            result = (False, e)
+        conn.send(result)
+
+
+class DecodePool:
+    """Decode workers shared by up to ``workers`` concurrent jobs
+
+    Like a ProcessPoolExecutor, but a job running longer than ``kill_after``
+    seconds gets its process killed and replaced without affecting other
+    jobs; its future raises DecodeRejected(TIMEOUT).
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        kill_after: Optional[float] = None,
+        initializer: Optional[Callable[[], None]] = None,
+    ):
+        self.kill_after = kill_after
+        self._workers: List[DecodeWorker] = [DecodeWorker(initializer) for _ in range(workers)]
+        self._idle: "queue.Queue[DecodeWorker]" = queue.Queue()
+        for worker in self._workers:
+            self._idle.put(worker)
+        self._threads = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rotato-decode")
+
+    def submit(self, func: Callable[..., Any], *args) -> Future:
+        return self._threads.submit(self._run, func, args)
+
+    def _run(self, func: Callable[..., Any], args: Sequence):
+        worker = self._idle.get()
+        try:
+            return worker.run(func, args, self.kill_after)
+        finally:
+            self._idle.put(worker)
+
+    def shutdown(self):
+        """Wait for running jobs, then stop the worker processes"""
+        self._threads.shutdown()
+        for worker in self._workers:
+            worker.close()
+
+    def __enter__(self) -> "DecodePool":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
@@ -0,0 +1,120 @@
+"""Crash-safe file writing and inter-process locking."""
+
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Optional, Union
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+PathLike = Union[str, Path]
+
+
+@contextmanager
+def file_lock(path: PathLike) -> Iterator[None]:
+    """Hold an exclusive advisory lock on ``path`` (created if missing)
+
+    The lock is shared between processes, so a long-running indexer and the tray
+    app can take turns updating the same files.
+    """
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after ~10 seconds; keep waiting
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def lock_path_for(path: PathLike) -> Path:
+    """Path of the lock file guarding ``path``"""
+    path = Path(path)
+    return path.with_name(path.name + ".lock")
+
+
+def atomic_write_bytes(path: PathLike, data: bytes):
+    """Write ``data`` to ``path`` so readers see either the old or the new file
+
+    The data goes to a temporary file in the same directory, is flushed to disk
+    and then renamed over the destination.
+    """
+    path = Path(path)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        _replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_text(path: PathLike, text: str):
+    """Atomically write UTF-8 text to ``path``"""
+    atomic_write_bytes(path, text.encode("utf-8"))
+
+
+def atomic_write_json(path: PathLike, data: Any, indent: Union[int, None] = None):
+    """Atomically write ``data`` as JSON to ``path``"""
+    atomic_write_text(path, json.dumps(data, indent=indent))
+
+
+def prune_directory(directory: PathLike, keep: Optional[int], max_bytes: Optional[int] = None):
+    """Delete all but the ``keep`` most recently modified files in ``directory``
+
+    With ``max_bytes`` older files are also deleted once the newer ones add up to
+    more than that; the newest file is always kept.
+    """
+    entries = sorted(
+        ((path.stat(), path) for path in Path(directory).iterdir()),
+        key=lambda entry: entry[0].st_mtime,
+        reverse=True,
+    )
+    total = 0
+    for index, (file_stat, old) in enumerate(entries):
+        total += file_stat.st_size
+        over_count = keep is not None and index >= keep
+        over_size = max_bytes is not None and index > 0 and total > max_bytes
+        if not (over_count or over_size):
+            continue
+        try:
+            old.unlink()
+        except OSError:
+            pass  # Still in use, e.g. by the desktop on Windows
+
+
+def _replace(src: str, dst: Path, attempts: int = 5):
+    """os.replace, retrying while another process briefly holds ``dst`` open (Windows)"""
+    for attempt in range(attempts):
+        try:
+            os.replace(src, dst)
+            return
+        except PermissionError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.1 * (attempt + 1))
@@ -0,0 +1,211 @@
+"""Persistent rotation history."""
+
+import heapq
+import itertools
+import json
+import threading
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Union
+
+from .fileutil import atomic_write_text
+
+
+class HistoryEntry(NamedTuple):
+    """One wallpaper change"""
+
+    timestamp: float
+    monitor: str
+    path: str
+
+
+class _MonitorLog:
+    """Time-ordered entries for one monitor with a parallel array for bisecting"""
+
+    __slots__ = ("entries", "times")
+
+    def __init__(self):
+        self.entries: List[HistoryEntry] = []
+        self.times = array("d")
+
+    def append(self, entry: HistoryEntry):
+        if self.times and entry.timestamp < self.times[-1]:
+            # Clock went backwards; keep the log sorted
+            position = bisect_left(self.times, entry.timestamp)
+            self.entries.insert(position, entry)
+            self.times.insert(position, entry.timestamp)
+        else:
+            self.entries.append(entry)
+            self.times.append(entry.timestamp)
+
+    def trim(self, max_entries: int):
+        excess = len(self.entries) - max_entries
+        if excess > 0:
+            del self.entries[:excess]
+            del self.times[:excess]
+
+
+class RotationHistory:
+    """Append-only log of wallpaper changes, bounded per monitor
+
+    Every change is appended to a JSON-lines file as it happens, so nothing is
+    lost on a crash. Each monitor keeps at most ``max_entries_per_monitor``
+    entries; once the file holds noticeably more than that it is rewritten
+    atomically without the old ones. Queries work on in-memory indexes and never
+    scan the whole log.
+    """
+
+    def __init__(
+        self,
+        history_file: Optional[Union[str, Path]] = None,
+        max_entries_per_monitor: int = 1000,
+    ):
+        self.history_file = Path(history_file) if history_file else None
+        self.max_entries_per_monitor = max(1, max_entries_per_monitor)
+        self.logs: Dict[str, _MonitorLog] = {}
+        self.last_shown: Dict[str, float] = {}  # path -> latest timestamp on any monitor
+        self._lines_on_disk = 0
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Read the history file, skipping lines that are torn or malformed"""
+        if not self.history_file or not self.history_file.exists():
+            return
+        with self._lock:
+            self.logs.clear()
+            lines = 0
+            try:
+                with open(self.history_file, "r", encoding="utf-8") as f:
+                    for line in f:
+                        lines += 1
+                        try:
+                            record = json.loads(line)
+                            entry = HistoryEntry(float(record["t"]), record["m"], record["p"])
+                        except (ValueError, KeyError, TypeError):
+                            continue
+                        self._log(entry.monitor).append(entry)
+            except OSError as e:
+                print(f"Error loading rotation history: {e}")
+            for log in self.logs.values():
+                log.trim(self.max_entries_per_monitor)
+            self._reindex()
+            self._lines_on_disk = lines
+            if self._needs_compaction():
+                self._compact()
+
+    def record(self, monitor: str, path: str, timestamp: float) -> HistoryEntry:
+        """Append a wallpaper change"""
+        entry = HistoryEntry(timestamp, monitor, path)
+        with self._lock:
+            self._log(monitor).append(entry)
+            if timestamp >= self.last_shown.get(path, float("-inf")):
+                self.last_shown[path] = timestamp
+            if self.history_file:
+                try:
+                    with open(self.history_file, "a", encoding="utf-8") as f:
+                        f.write(_format_line(entry))
+                    self._lines_on_disk += 1
+                except OSError as e:
+                    print(f"Error writing rotation history: {e}")
+            if self._needs_compaction():
+                self._compact()
+        return entry
+
+    def current(self, monitor: str) -> Optional[str]:
+        """Path most recently shown on ``monitor``"""
+        log = self.logs.get(monitor)
+        return log.entries[-1].path if log and log.entries else None
+
+    def latest(self) -> Optional[HistoryEntry]:
+        """Most recent change on any monitor"""
+        tails = [log.entries[-1] for log in self.logs.values() if log.entries]
+        return max(tails, default=None)
+
+    def last_n(self, n: int, monitor: Optional[str] = None) -> List[HistoryEntry]:
+        """The ``n`` most recent changes, newest first"""
+        if n <= 0:
+            return []
+        with self._lock:
+            logs = self._select(monitor)
+            tails = [reversed(log.entries[-n:]) for log in logs]
+            return list(itertools.islice(heapq.merge(*tails, reverse=True), n))
+
+    def since(self, timestamp: float, monitor: Optional[str] = None) -> List[HistoryEntry]:
+        """Changes at or after ``timestamp``, oldest first"""
+        with self._lock:
+            parts = [
+                log.entries[bisect_left(log.times, timestamp) :] for log in self._select(monitor)
+            ]
+            return list(heapq.merge(*parts))
+
+    def shown_paths(self, monitor: Optional[str] = None) -> Set[str]:
+        """Paths that appear in the retained history"""
+        if monitor is None:
+            return set(self.last_shown)
+        log = self.logs.get(monitor)
+        return {entry.path for entry in log.entries} if log else set()
+
+    def never_shown(self, paths: Iterable[str], monitor: Optional[str] = None) -> List[str]:
+        """Paths from ``paths`` that are not in the retained history"""
+        if monitor is None:
+            shown = self.last_shown
+        else:
+            shown = self.shown_paths(monitor)
+        return [path for path in paths if path not in shown]
+
+    def last_shown_times(self, monitor: Optional[str] = None) -> Dict[str, float]:
+        """Latest timestamp for each path shown, optionally on one monitor"""
+        if monitor is None:
+            return dict(self.last_shown)
+        log = self.logs.get(monitor)
+        return {entry.path: entry.timestamp for entry in log.entries} if log else {}
+
+    def compact(self):
+        """Rewrite the history file with only the retained entries"""
+        with self._lock:
+            self._compact()
+
+    def __len__(self) -> int:
+        return sum(len(log.entries) for log in self.logs.values())
+
+    def _log(self, monitor: str) -> _MonitorLog:
+        log = self.logs.get(monitor)
+        if log is None:
+            log = self.logs[monitor] = _MonitorLog()
+        return log
+
+    def _select(self, monitor: Optional[str]) -> List[_MonitorLog]:
+        if monitor is None:
+            return list(self.logs.values())
+        log = self.logs.get(monitor)
+        return [log] if log else []
+
+    def _reindex(self):
+        self.last_shown = {}
+        for log in self.logs.values():
+            for entry in log.entries:
+                if entry.timestamp >= self.last_shown.get(entry.path, float("-inf")):
+                    self.last_shown[entry.path] = entry.timestamp
+
+    def _needs_compaction(self) -> bool:
+        # Allow the file to grow by half again before rewriting it
+        limit = self.max_entries_per_monitor * max(1, len(self.logs))
+        return self._lines_on_disk > limit + limit // 2
+
+    def _compact(self):
+        for log in self.logs.values():
+            log.trim(self.max_entries_per_monitor)
+        self._reindex()
+        entries = list(heapq.merge(*(log.entries for log in self.logs.values())))
+        if self.history_file:
+            try:
+                atomic_write_text(self.history_file, "".join(map(_format_line, entries)))
+            except OSError as e:
+                print(f"Error compacting rotation history: {e}")
+                return
+        self._lines_on_disk = len(entries)
+
+
+def _format_line(entry: HistoryEntry) -> str:
+    return json.dumps({"t": entry.timestamp, "m": entry.monitor, "p": entry.path}) + "\n"
@@ -1,10 +1,12 @@
 """Image discovery and filtering."""
 
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
-from .cache import ImageCache
+from . import archives
+from .cache import ImageCache, ImageInfo
 from .config import FilterConfig
+from .metrics import metrics
 from .monitors import MonitorInfo
 
 
@@ -22,26 +24,29 @@ class ImageManager:
         """Discover all images from given sources"""
         images = []
 
-        for source in sources:
-            source_path = Path(source)
+        with metrics.timer("discover_seconds"):
+            for source in sources:
+                source_path = Path(source)
 
-            if source_path.is_file() and self._is_supported_format(source_path):
-                images.append(str(source_path))
-            elif source_path.is_dir():
-                if recursive:
-                    images.extend(self._scan_directory_recursive(source_path, 0))
-                else:
-                    images.extend(self._scan_directory(source_path))
+                if source_path.is_file():
+                    images.extend(self._scan_file(source_path))
+                elif source_path.is_dir():
+                    if recursive:
+                        images.extend(self._scan_directory_recursive(source_path, 0))
+                    else:
+                        images.extend(self._scan_directory(source_path))
 
+        metrics.inc("discover_images_total", len(images))
         return images
 
     def _scan_directory(self, directory: Path) -> List[str]:
         """Scan single directory for images"""
         images = []
+        metrics.inc("discover_directories_total")
         try:
             for file_path in directory.iterdir():
-                if file_path.is_file() and self._is_supported_format(file_path):
-                    images.append(str(file_path))
+                if file_path.is_file():
+                    images.extend(self._scan_file(file_path))
         except PermissionError:
             print(f"Permission denied accessing {directory}")
         except Exception as e:
@@ -55,10 +60,11 @@ class ImageManager:
             return []
 
         images = []
+        metrics.inc("discover_directories_total")
         try:
             for item in directory.iterdir():
-                if item.is_file() and self._is_supported_format(item):
-                    images.append(str(item))
+                if item.is_file():
+                    images.extend(self._scan_file(item))
                 elif item.is_dir() and not item.is_symlink():
                     images.extend(self._scan_directory_recursive(item, depth + 1))
         except PermissionError:
@@ -68,6 +74,15 @@ class ImageManager:
 
         return images
 
+    def _scan_file(self, file_path: Path) -> List[str]:
+        """Images in a source or scanned file: the file itself or archive members"""
+        if archives.is_archive(file_path):
+            # Members are listed from the archive index, nothing is extracted
+            return archives.list_members(str(file_path), self.supported_formats)
+        if self._is_supported_format(file_path):
+            return [str(file_path)]
+        return []
+
     def _is_supported_format(self, file_path: Path) -> bool:
         """Check if file format is supported"""
         return file_path.suffix.lower() in self.supported_formats
@@ -77,51 +92,65 @@ class ImageManager:
     ) -> List[str]:
         """Filter images based on criteria"""
         filtered = []
+        rejections = {}
 
-        for path in image_paths:
-            info = self.cache.get_image_info(path)
-            if not info:
-                continue
-
-            # Size filters
-            if filters.min_width and info.width < filters.min_width:
-                continue
-            if filters.max_width and info.width > filters.max_width:
-                continue
-            if filters.min_height and info.height < filters.min_height:
-                continue
-            if filters.max_height and info.height > filters.max_height:
-                continue
-
-            # Aspect ratio filter
-            if filters.aspect_ratios:
-                aspect_match = False
-                for target_ratio in filters.aspect_ratios:
-                    if (
-                        abs(info.aspect_ratio - target_ratio)
-                        <= filters.aspect_ratio_tolerance
-                    ):
-                        aspect_match = True
-                        break
-                if not aspect_match:
-                    continue
-
-            # Brightness filter
-            if filters.brightness_range:
-                min_bright, max_bright = filters.brightness_range
-                if not (min_bright <= info.brightness <= max_bright):
-                    continue
-
-            # File size filter
-            if filters.max_file_size_mb:
-                max_bytes = filters.max_file_size_mb * 1024 * 1024
-                if info.file_size > max_bytes:
-                    continue
-
-            # Check if image resolution is suitable (don't upscale)
-            if info.width < monitor.width and info.height < monitor.height:
-                continue  # Image too small, would need upscaling
-
-            filtered.append(path)
+        with metrics.timer("filter_seconds"):
+            for path in image_paths:
+                info = self.cache.get_image_info(path)
+                if not info:
+                    reason = "unreadable"
+                else:
+                    reason = self._rejection_reason(info, filters, monitor)
+
+                if reason:
+                    rejections[reason] = rejections.get(reason, 0) + 1
+                else:
+                    filtered.append(path)
+
+        metrics.inc("filter_accepted_total", len(filtered))
+        for reason, count in rejections.items():
+            metrics.inc("filter_rejected_total", count, {"criterion": reason})
 
         return filtered
+
+    def _rejection_reason(
+        self, info: ImageInfo, filters: FilterConfig, monitor: MonitorInfo
+    ) -> Optional[str]:
+        """Name of the first filter criterion the image fails, or None if it passes"""
+        # Size filters
+        if filters.min_width and info.width < filters.min_width:
+            return "min_width"
+        if filters.max_width and info.width > filters.max_width:
+            return "max_width"
+        if filters.min_height and info.height < filters.min_height:
+            return "min_height"
+        if filters.max_height and info.height > filters.max_height:
+            return "max_height"
+
+        # Aspect ratio filter
+        if filters.aspect_ratios:
+            aspect_match = False
+            for target_ratio in filters.aspect_ratios:
+                if abs(info.aspect_ratio - target_ratio) <= filters.aspect_ratio_tolerance:
+                    aspect_match = True
+                    break
+            if not aspect_match:
+                return "aspect_ratio"
+
+        # Brightness filter
+        if filters.brightness_range:
+            min_bright, max_bright = filters.brightness_range
+            if not (min_bright <= info.brightness <= max_bright):
+                return "brightness"
+
+        # File size filter
+        if filters.max_file_size_mb:
+            max_bytes = filters.max_file_size_mb * 1024 * 1024
+            if info.file_size > max_bytes:
+                return "file_size"
+
+        # Check if image resolution is suitable (don't upscale)
+        if info.width < monitor.width and info.height < monitor.height:
+            return "upscale"  # Image too small, would need upscaling
+
+        return None
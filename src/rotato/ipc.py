@@ -0,0 +1,242 @@
+"""Local control API for a running instance.
+
+The running app listens on a Unix-domain socket (a named pipe on Windows) for
+JSON commands such as ``next`` or ``pause`` sent by ``rotato ctl``. Connections
+are authenticated with a random key that the server writes, on every start, to
+a file only the current user can read. This module only uses the standard
+library, so the client starts and returns in milliseconds.
+
+``ROTATO_CONTROL_ADDRESS`` overrides the socket path or pipe name for both sides.
+"""
+
+import getpass
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+AUTHKEY_FILE = "control.key"
+AUTHKEY_BYTES = 32
+
+# Largest request accepted from a client
+MAX_REQUEST_BYTES = 64 * 1024
+
+# Seconds the server waits for a connected client to send its request
+REQUEST_TIMEOUT = 5.0
+
+# Seconds a client waits for a reply; `set` and `next` may crop an image first
+REPLY_TIMEOUT = 30.0
+
+_PIPE_PREFIX = "\\\\.\\pipe\\"
+
+
+class ControlError(Exception):
+    """The running instance is unreachable or rejected a command"""
+
+
+def runtime_dir() -> Path:
+    """Per-user directory for the socket and key file"""
+    if sys.platform == "win32":
+        return Path(os.environ.get("LOCALAPPDATA") or Path.home()) / "rotato"
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        return Path(os.environ["XDG_RUNTIME_DIR"]) / "rotato"
+    return Path(tempfile.gettempdir()) / f"rotato-{os.getuid()}"
+
+
+def default_address() -> str:
+    """Socket path or pipe name of the control server"""
+    address = os.environ.get("ROTATO_CONTROL_ADDRESS")
+    if address:
+        return address
+    if sys.platform == "win32":
+        return f"{_PIPE_PREFIX}rotato-{getpass.getuser()}"
+    return str(runtime_dir() / "control.sock")
+
+
+def _family(address: str) -> str:
+    return "AF_PIPE" if address.startswith(_PIPE_PREFIX) else "AF_UNIX"
+
+
+def _private_dir(path: Path):
+    """Create ``path`` readable only by the current user, refusing one owned by others"""
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if hasattr(os, "getuid"):
+        if path.stat().st_uid != os.getuid():
+            raise ControlError(f"{path} belongs to another user")
+        os.chmod(path, 0o700)
+
+
+def _write_authkey(path: Path, key: bytes):
+    _private_dir(path.parent)
+    tmp = path.with_name(path.name + ".tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    os.replace(tmp, path)
+
+
+def _socket_alive(address: str) -> bool:
+    """Whether something accepts connections on a Unix socket path"""
+    with socket.socket(socket.AF_UNIX) as probe:
+        try:
+            probe.connect(address)
+        except OSError:
+            return False
+    return True
+
+
+class ControlServer:
+    """Answers control commands on a background thread
+
+    ``handlers`` maps command names to callables that take the request's
+    arguments as keyword arguments and return a JSON-serializable result.
+    Requests are handled one at a time, in arrival order.
+    """
+
+    def __init__(
+        self,
+        handlers: Dict[str, Callable[..., Any]],
+        address: Optional[str] = None,
+        authkey_file: Optional[Path] = None,
+    ):
+        self.handlers = handlers
+        self.address = address or default_address()
+        self.authkey_file = Path(authkey_file or runtime_dir() / AUTHKEY_FILE)
+        self._authkey = b""
+        self._listener: Optional[Listener] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    def start(self) -> bool:
+        """Start listening; False if another instance already serves the address"""
+        family = _family(self.address)
+        try:
+            if family == "AF_UNIX":
+                _private_dir(Path(self.address).parent)
+                if os.path.exists(self.address):
+                    if _socket_alive(self.address):
+                        print(f"Control socket {self.address} is in use by another instance")
+                        return False
+                    os.unlink(self.address)  # Left over from a crash
+            self._authkey = os.urandom(AUTHKEY_BYTES)
+            _write_authkey(self.authkey_file, self._authkey)
+            self._listener = Listener(self.address, family, authkey=self._authkey)
+        except (OSError, ControlError) as e:
+            print(f"Error starting control server: {e}")
+            return False
+        self._thread = threading.Thread(target=self._serve, name="rotato-control", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """Stop serving and remove the key file"""
+        if self._listener is None or self._stopped:
+            return
+        self._stopped = True
+        self._wake()
+        if self._thread:
+            self._thread.join(timeout=2)
+        self._listener.close()
+        try:
+            self.authkey_file.unlink()
+        except OSError:
+            pass
+
+    def _wake(self):
+        """Unblock accept(), which closing the listener doesn't interrupt"""
+        if _family(self.address) == "AF_UNIX":
+            _socket_alive(self.address)
+            return
+
+        # A pipe client waits for the handshake; don't let stop() hang on it
+        def connect():
+            try:
+                Client(self.address, "AF_PIPE", authkey=self._authkey).close()
+            except (OSError, EOFError, AuthenticationError):
+                pass
+
+        threading.Thread(target=connect, name="rotato-control-wake", daemon=True).start()
+
+    def _serve(self):
+        while not self._stopped:
+            try:
+                conn = self._listener.accept()
+            except AuthenticationError:
+                print("Rejected a control connection with a wrong key")
+                continue
+            except (OSError, EOFError):
+                if self._stopped:
+                    return
+                continue
+            if self._stopped:
+                conn.close()
+                return
+            self._handle(conn)
+
+    def _handle(self, conn: Connection):
+        with conn:
+            try:
+                if not conn.poll(REQUEST_TIMEOUT):
+                    return
+                request = json.loads(conn.recv_bytes(MAX_REQUEST_BYTES))
+            except (OSError, EOFError, ValueError):
+                return
+            reply = self.dispatch(request)
+            try:
+                conn.send_bytes(json.dumps(reply).encode("utf-8"))
+            except (OSError, TypeError, ValueError) as e:
+                print(f"Error answering control command: {e}")
+
+    def dispatch(self, request: Any) -> Dict:
+        """Run one request and build its reply"""
+        if not isinstance(request, dict):
+            return {"ok": False, "error": "malformed request"}
+        command = request.get("command")
+        handler = self.handlers.get(command)
+        if handler is None:
+            return {"ok": False, "error": f"unknown command: {command}"}
+        args = request.get("args") or {}
+        try:
+            return {"ok": True, "result": handler(**args)}
+        except Exception as e:
+            return {"ok": False, "error": str(e) or type(e).__name__}
+
+
+def send_command(
+    command: str,
+    address: Optional[str] = None,
+    authkey_file: Optional[Path] = None,
+    timeout: float = REPLY_TIMEOUT,
+    **args,
+) -> Any:
+    """Run ``command`` on the running instance and return its result"""
+    address = address or default_address()
+    authkey_file = Path(authkey_file or runtime_dir() / AUTHKEY_FILE)
+    try:
+        authkey = authkey_file.read_bytes()
+    except OSError:
+        raise ControlError("Rotato is not running (no control key found)") from None
+    try:
+        conn = Client(address, _family(address), authkey=authkey)
+    except (FileNotFoundError, ConnectionRefusedError):
+        raise ControlError("Rotato is not running") from None
+    except AuthenticationError:
+        raise ControlError("Control key was rejected; is Rotato restarting?") from None
+
+    with conn:
+        conn.send_bytes(json.dumps({"command": command, "args": args}).encode("utf-8"))
+        if not conn.poll(timeout):
+            raise ControlError(f"No reply to '{command}' within {timeout:g}s")
+        try:
+            reply = json.loads(conn.recv_bytes())
+        except EOFError:
+            raise ControlError(f"Connection closed while running '{command}'") from None
+    if not reply.get("ok"):
+        raise ControlError(reply.get("error") or "command failed")
+    return reply.get("result")
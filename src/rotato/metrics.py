@@ -0,0 +1,175 @@
+"""Lightweight performance counters and timing histograms."""
+
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+from .fileutil import atomic_write_json, atomic_write_text
+
+# Upper bounds (seconds) of the timing histogram buckets
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+Labels = Optional[Dict[str, str]]
+
+
+def _key(name: str, labels: Labels) -> str:
+    """Metric key in Prometheus notation, e.g. ``name{criterion="min_width"}``"""
+    if not labels:
+        return name
+    rendered = ",".join(f'{k}="{v}"' for k, v in sorted(labels.items()))
+    return f"{name}{{{rendered}}}"
+
+
+def _split_key(key: str) -> Tuple[str, str]:
+    """Split a metric key into its name and label block (with braces)"""
+    brace = key.find("{")
+    if brace == -1:
+        return key, ""
+    return key[:brace], key[brace:]
+
+
+class Histogram:
+    """Cumulative timing histogram with fixed buckets"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)  # Last bucket is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.bucket_counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "max": self.max,
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.bucket_counts)),
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe collection of counters and timing histograms"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, float] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self.started = time.time()
+
+    def inc(self, name: str, value: float = 1, labels: Labels = None):
+        """Increment a counter"""
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, labels: Labels = None):
+        """Record a duration in a timing histogram"""
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str, labels: Labels = None) -> Iterator[None]:
+        """Time the enclosed block into the ``name`` histogram"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, labels)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.started = time.time()
+
+    def snapshot(self) -> Dict:
+        """All metrics as plain data"""
+        with self._lock:
+            return {
+                "started": self.started,
+                "updated": time.time(),
+                "counters": dict(self.counters),
+                "histograms": {key: h.to_dict() for key, h in self.histograms.items()},
+            }
+
+    def write_json(self, path: str):
+        """Export metrics as a JSON stats file"""
+        atomic_write_json(path, self.snapshot(), indent=2)
+
+    def write_prometheus(self, path: str):
+        """Export metrics in the Prometheus textfile collector format"""
+        atomic_write_text(path, format_prometheus(self.snapshot()))
+
+
+def format_prometheus(snapshot: Dict) -> str:
+    """Render a metrics snapshot in Prometheus exposition format"""
+    lines = []
+    typed = set()
+
+    for key, value in sorted(snapshot["counters"].items()):
+        name, labels = _split_key(key)
+        if name not in typed:
+            lines.append(f"# TYPE rotato_{name} counter")
+            typed.add(name)
+        lines.append(f"rotato_{name}{labels} {value}")
+
+    for key, histogram in sorted(snapshot["histograms"].items()):
+        name, labels = _split_key(key)
+        if name not in typed:
+            lines.append(f"# TYPE rotato_{name} histogram")
+            typed.add(name)
+        inner = labels[1:-1]
+        cumulative = 0
+        for bound, count in histogram["buckets"].items():
+            cumulative += count
+            le = f'le="{bound}"'
+            lines.append(f"rotato_{name}_bucket{{{inner + ',' if inner else ''}{le}}} {cumulative}")
+        lines.append(f"rotato_{name}_sum{labels} {histogram['sum']}")
+        lines.append(f"rotato_{name}_count{labels} {histogram['count']}")
+
+    return "\n".join(lines) + "\n"
+
+
+def format_summary(snapshot: Dict) -> str:
+    """Render a metrics snapshot as a human-readable report"""
+    started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(snapshot["started"]))
+    lines = [f"Stats since {started}"]
+    if snapshot["counters"]:
+        lines.append("Counters:")
+        for key, value in sorted(snapshot["counters"].items()):
+            lines.append(f"  {key:50} {value:g}")
+    if snapshot["histograms"]:
+        lines.append("Timings:")
+        for key, histogram in sorted(snapshot["histograms"].items()):
+            count = histogram["count"]
+            mean = histogram["sum"] / count if count else 0.0
+            lines.append(
+                f"  {key:50} n={count:<8} total={histogram['sum']:.3f}s "
+                f"mean={mean * 1000:.2f}ms max={histogram['max'] * 1000:.2f}ms"
+            )
+    return "\n".join(lines)
+
+
+def load_snapshot(path: str) -> Dict:
+    """Read a JSON stats file written by MetricsRegistry.write_json"""
+    with open(Path(path), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# Process-wide registry used by the instrumented components
+metrics = MetricsRegistry()
@@ -0,0 +1,250 @@
+"""Local mirror of images on slow or unreliable network shares."""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from . import archives
+from .fileutil import atomic_write_json
+from .metrics import metrics
+
+INDEX_FILE = "index.json"
+
+# Mirror copies are named by a hash of the source path; nothing else is ever deleted
+_COPY_NAME = re.compile(r"^[0-9a-f]{24}(\.[^.]*)?(\.\d+\.part)?$")
+
+
+class LocalMirror:
+    """Size-bounded, least-recently-used local copies of source images
+
+    ``resolve`` returns the local copy of an image when there is one, so rotation
+    doesn't touch the network and keeps working while a share is offline. Copies
+    are made in the background by ``workers`` threads: ``prefetch(..., urgent=True)``
+    is for images about to be shown and may evict older copies, while ordinary
+    prefetches only fill free space.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_size_mb: float = 1024,
+        workers: int = 2,
+        sources: Optional[Sequence[str]] = None,
+    ):
+        self.directory = Path(directory)
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.workers = max(1, workers)
+        # Only paths under these prefixes are mirrored; all paths if None
+        self.sources = [os.path.normpath(source) for source in sources] if sources else None
+
+        # path -> {"file", "size", "mtime"}; ordered from least to most recently used
+        self.entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self.total_bytes = 0
+        self.pinned: Dict[str, str] = {}  # monitor name -> path on the desktop
+        self._queue: deque = deque()
+        self._queued: Counter = Counter()  # path -> queued or in-flight copies
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._threads: List[threading.Thread] = []
+        self._stopped = False
+        self._dirty = False
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    @classmethod
+    def from_config(cls, settings: Optional[Dict]) -> Optional["LocalMirror"]:
+        """Build a mirror from the ``local_mirror`` config section, or None if unset"""
+        if not settings or not settings.get("enabled", True):
+            return None
+        return cls(
+            settings.get("directory", "rotato_mirror"),
+            settings.get("max_size_mb", 1024),
+            settings.get("workers", 2),
+            settings.get("sources"),
+        )
+
+    def mirrors(self, path: str) -> bool:
+        """Whether ``path`` is covered by the mirror"""
+        if archives.split_member(path):
+            return False  # Members are extracted from the archive when shown
+        if self.sources is None:
+            return True
+        path = os.path.normpath(path)
+        return any(path.startswith(source) for source in self.sources)
+
+    def resolve(self, path: str) -> str:
+        """Local copy of ``path`` if mirrored, else ``path`` itself"""
+        if not self.mirrors(path):
+            return path
+        with self._lock:
+            entry = self.entries.get(path)
+            if entry is not None:
+                self.entries.move_to_end(path)
+                self._dirty = True
+                local = str(self.directory / entry["file"])
+        if entry is not None and os.path.exists(local):
+            metrics.inc("mirror_hits_total")
+            return local
+        metrics.inc("mirror_misses_total")
+        self.prefetch([path], urgent=True)
+        return path
+
+    def pin(self, monitor_name: str, path: str):
+        """Keep the copy shown on a monitor from being evicted"""
+        with self._lock:
+            self.pinned[monitor_name] = path
+
+    def prefetch(self, paths: Iterable[str], urgent: bool = False):
+        """Queue copies of ``paths``; urgent ones go first and may evict others"""
+        paths = [path for path in paths if self.mirrors(path)]
+        with self._lock:
+            if self._stopped:
+                return
+            if urgent:
+                for path in reversed(paths):
+                    self._queue.appendleft((path, True))
+                    self._queued[path] += 1
+            else:
+                for path in paths:
+                    if path not in self._queued and path not in self.entries:
+                        self._queue.append((path, False))
+                        self._queued[path] += 1
+            self._ensure_workers()
+            self._wakeup.notify_all()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until the queue is empty (for tests and the index command)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self._queued:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._wakeup.wait(remaining)
+        return True
+
+    def stop(self):
+        """Stop copying and save the index"""
+        with self._lock:
+            self._stopped = True
+            self._queue.clear()
+            self._queued.clear()
+            self._wakeup.notify_all()
+        self.save_index()
+
+    def save_index(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"entries": [[path, entry] for path, entry in self.entries.items()]}
+            self._dirty = False
+        try:
+            atomic_write_json(self.directory / INDEX_FILE, data)
+        except OSError as e:
+            print(f"Error saving mirror index: {e}")
+
+    def _load_index(self):
+        index_path = self.directory / INDEX_FILE
+        if index_path.exists():
+            try:
+                with open(index_path, "r") as f:
+                    for path, entry in json.load(f).get("entries", []):
+                        if (self.directory / entry["file"]).exists():
+                            self.entries[path] = entry
+                            self.total_bytes += entry["size"]
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"Error loading mirror index: {e}")
+
+        # Remove copies the index doesn't know about (e.g. after a crash)
+        known = {entry["file"] for entry in self.entries.values()}
+        for item in self.directory.iterdir():
+            if item.name not in known and _COPY_NAME.match(item.name):
+                try:
+                    item.unlink()
+                except OSError:
+                    pass
+
+    def _ensure_workers(self):
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._worker, name="rotato-mirror", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _worker(self):
+        while True:
+            with self._lock:
+                while not self._queue and not self._stopped:
+                    if not self._wakeup.wait(30) and not self._queue:
+                        return  # Idle; a new prefetch starts workers again
+                if self._stopped:
+                    return
+                path, urgent = self._queue.popleft()
+            try:
+                self._copy(path, urgent)
+            except Exception as e:
+                metrics.inc("mirror_errors_total")
+                print(f"Error mirroring {path}: {e}")
+            finally:
+                with self._lock:
+                    self._queued[path] -= 1
+                    if self._queued[path] <= 0:
+                        del self._queued[path]
+                    self._wakeup.notify_all()
+
+    def _copy(self, path: str, urgent: bool):
+        try:
+            source_stat = os.stat(path)
+        except OSError:
+            return  # Share unreachable; keep any copy we have
+        size = source_stat.st_size
+
+        with self._lock:
+            entry = self.entries.get(path)
+            if entry and entry["size"] == size and entry["mtime"] == source_stat.st_mtime:
+                return
+            if size > self.max_bytes:
+                return
+            if not urgent and self.total_bytes + size > self.max_bytes:
+                return  # Background fill only uses free space
+
+        name = hashlib.blake2b(path.encode("utf-8"), digest_size=12).hexdigest()
+        local = self.directory / (name + Path(path).suffix.lower())
+        tmp = local.with_name(f"{local.name}.{threading.get_ident()}.part")
+        with metrics.timer("mirror_copy_seconds"):
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, local)
+        metrics.inc("mirror_bytes_copied_total", size)
+
+        with self._lock:
+            old = self.entries.pop(path, None)
+            if old:
+                self.total_bytes -= old["size"]
+            self.entries[path] = {"file": local.name, "size": size, "mtime": source_stat.st_mtime}
+            self.total_bytes += size
+            self._dirty = True
+            self._evict()
+
+    def _evict(self):
+        """Drop least recently used copies until within budget; caller holds the lock"""
+        pinned = set(self.pinned.values())
+        for path in list(self.entries):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if path in pinned:
+                continue
+            entry = self.entries.pop(path)
+            self.total_bytes -= entry["size"]
+            try:
+                (self.directory / entry["file"]).unlink()
+            except OSError:
+                pass
+            metrics.inc("mirror_evictions_total")
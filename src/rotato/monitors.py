@@ -1,7 +1,8 @@
 """Monitor detection and management."""
 
-from dataclasses import dataclass
-from typing import List, Optional
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Set
 
 
 @dataclass
@@ -21,28 +22,128 @@ class MonitorInfo:
         return self.width / self.height
 
 
+@dataclass
+class MonitorChanges:
+    """Difference between two monitor detections, by monitor name"""
+
+    added: Set[str] = field(default_factory=set)
+    removed: Set[str] = field(default_factory=set)
+    resized: Set[str] = field(default_factory=set)  # Resolution changed
+    moved: Set[str] = field(default_factory=set)  # Only position or primary flag changed
+
+    @property
+    def refilter(self) -> Set[str]:
+        """Monitors whose image pools depend on the change"""
+        return self.added | self.resized
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.resized or self.moved)
+
+
+def compare_monitors(old: List[MonitorInfo], new: List[MonitorInfo]) -> MonitorChanges:
+    """Work out which monitors appeared, disappeared or changed"""
+    before = {monitor.name: monitor for monitor in old}
+    after = {monitor.name: monitor for monitor in new}
+    changes = MonitorChanges(
+        added=set(after) - set(before),
+        removed=set(before) - set(after),
+    )
+    for name in set(before) & set(after):
+        a, b = before[name], after[name]
+        if (a.width, a.height) != (b.width, b.height):
+            changes.resized.add(name)
+        elif a != b:
+            changes.moved.add(name)
+    return changes
+
+
 class MonitorManager:
     """Manages monitor detection and information"""
 
-    def __init__(self):
+    def __init__(self, detector=None):
+        self.detector = detector
         self.monitors: List[MonitorInfo] = []
         self.detect_monitors()
 
     def detect_monitors(self):
         """Detect all connected monitors - platform-specific implementation"""
-        from .platform import get_platform_detector
+        if self.detector is None:
+            from .platform import get_platform_detector
 
-        detector = get_platform_detector()
-        self.monitors = detector.detect_monitors()
+            self.detector = get_platform_detector()
+        self.monitors = self.detector.detect_monitors()
 
         print(f"Detected {len(self.monitors)} monitors")
         for i, monitor in enumerate(self.monitors):
             primary = "(Primary)" if monitor.is_primary else ""
             print(f"  Monitor {i+1}: {monitor.width}x{monitor.height} {primary}")
 
+    def refresh(self) -> MonitorChanges:
+        """Detect monitors again and report what changed since the last detection"""
+        monitors = self.detector.detect_monitors()
+        changes = compare_monitors(self.monitors, monitors)
+        if changes:
+            self.monitors = monitors
+            for name in sorted(changes.added):
+                print(f"Monitor connected: {name}")
+            for name in sorted(changes.removed):
+                print(f"Monitor disconnected: {name}")
+            for name in sorted(changes.resized | changes.moved):
+                monitor = self.get_monitor_by_name(name)
+                print(f"Monitor changed: {name} {monitor.width}x{monitor.height}")
+        return changes
+
+    def watch(self, callback: Callable[[MonitorChanges], None], poll_interval: float = 5.0):
+        """Start a ``MonitorWatcher`` reporting changes to ``callback``"""
+        watcher = MonitorWatcher(self, callback, poll_interval)
+        watcher.start()
+        return watcher
+
     def get_monitor_by_name(self, name: str) -> Optional[MonitorInfo]:
         """Get monitor by device name"""
         for monitor in self.monitors:
             if monitor.name == name:
                 return monitor
         return None
+
+
+class MonitorWatcher:
+    """Polls for docked, undocked and reconfigured monitors
+
+    Detection is cheap, so a short poll catches hotplug events on every platform
+    without hooking display-change messages. The callback runs on the watcher
+    thread and only when something changed.
+    """
+
+    def __init__(
+        self,
+        manager: MonitorManager,
+        callback: Callable[[MonitorChanges], None],
+        poll_interval: float = 5.0,
+    ):
+        self.manager = manager
+        self.callback = callback
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="rotato-monitor-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                changes = self.manager.refresh()
+            except Exception as e:
+                print(f"Error detecting monitors: {e}")
+                continue
+            if not changes:
+                continue
+            try:
+                self.callback(changes)
+            except Exception as e:
+                print(f"Error applying monitor change: {e}")
@@ -1,44 +1,61 @@
 """Platform-specific implementations."""
 
+import os
 import platform
-import sys
+
+SUPPORTED_PLATFORMS = ["Windows", "Linux"]
+
+
+def get_platform_name() -> str:
+    """Name of the backend to use; ``ROTATO_PLATFORM=fake`` selects the in-memory one"""
+    return os.environ.get("ROTATO_PLATFORM") or platform.system()
 
 
 def get_platform_detector():
     """Get platform-specific monitor detector"""
-    system = platform.system()
+    system = get_platform_name()
 
     if system == "Windows":
         from .windows import WindowsMonitorDetector
 
         return WindowsMonitorDetector()
     elif system == "Linux":
-        # Future Linux support
-        raise NotImplementedError("Linux support not yet implemented")
+        from .linux import LinuxMonitorDetector
+
+        return LinuxMonitorDetector()
+    elif system == "fake":
+        from .fake import FakeMonitorDetector
+
+        return FakeMonitorDetector()
     else:
         raise NotImplementedError(f"Platform {system} not supported")
 
 
 def get_platform_wallpaper_setter():
     """Get platform-specific wallpaper setter"""
-    system = platform.system()
+    system = get_platform_name()
 
     if system == "Windows":
         from .windows import WindowsWallpaperSetter
 
         return WindowsWallpaperSetter()
     elif system == "Linux":
-        # Future Linux support
-        raise NotImplementedError("Linux support not yet implemented")
+        from .linux import LinuxWallpaperSetter
+
+        return LinuxWallpaperSetter()
+    elif system == "fake":
+        from .fake import FakeWallpaperSetter
+
+        return FakeWallpaperSetter()
     else:
         raise NotImplementedError(f"Platform {system} not supported")
 
 
 def check_platform_support():
     """Check if current platform is supported"""
-    system = platform.system()
-    if system not in ["Windows"]:
+    system = get_platform_name()
+    if system not in SUPPORTED_PLATFORMS + ["fake"]:
         print(f"Warning: Platform {system} is not fully supported yet.")
-        print("Currently supported platforms: Windows")
+        print(f"Currently supported platforms: {', '.join(SUPPORTED_PLATFORMS)}")
         return False
     return True
@@ -0,0 +1,73 @@
+"""In-memory platform backend for tests, benchmarks and headless runs.
+
+Select it with ``ROTATO_PLATFORM=fake``. Monitors can be given as
+``ROTATO_FAKE_MONITORS=1920x1080,1080x1920`` (laid out left to right).
+"""
+
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ..monitors import MonitorInfo
+
+
+def parse_monitor_spec(spec: str) -> List[MonitorInfo]:
+    """Build monitors from a spec like ``"1920x1080,1080x1920"``"""
+    monitors = []
+    x = 0
+    for index, size in enumerate(part.strip() for part in spec.split(",") if part.strip()):
+        width, _, height = size.partition("x")
+        monitors.append(
+            MonitorInfo(
+                handle=index,
+                width=int(width),
+                height=int(height),
+                x=x,
+                y=0,
+                is_primary=index == 0,
+                name=f"FAKE{index + 1}",
+            )
+        )
+        x += int(width)
+    return monitors
+
+
+class FakeMonitorDetector:
+    """Reports a configurable set of monitors; change ``monitors`` to simulate hotplug"""
+
+    def __init__(self, monitors: Optional[List[MonitorInfo]] = None):
+        if monitors is None:
+            monitors = parse_monitor_spec(os.environ.get("ROTATO_FAKE_MONITORS", "1920x1080"))
+        self.monitors = monitors
+        self.calls = 0
+
+    def detect_monitors(self) -> List[MonitorInfo]:
+        self.calls += 1
+        return list(self.monitors)
+
+
+class FakeWallpaperSetter:
+    """Records wallpaper changes instead of touching a desktop"""
+
+    def __init__(self, fail_paths: Sequence[str] = ()):
+        self.fail_paths = set(fail_paths)
+        self.current: Dict[str, str] = {}  # monitor name -> image path
+        self.history: List[Tuple[str, str]] = []  # (monitor name, image path)
+        self.batches = 0
+        self._lock = threading.Lock()
+
+    def set_wallpaper(self, monitor: MonitorInfo, image_path: str) -> bool:
+        return self.set_wallpapers([(monitor, image_path)])[0]
+
+    def set_wallpapers(self, assignments: Sequence) -> List[bool]:
+        with self._lock:
+            self.batches += 1
+            results = []
+            for monitor, image_path in assignments:
+                if image_path in self.fail_paths:
+                    results.append(False)
+                    continue
+                self.current[monitor.name] = image_path
+                self.history.append((monitor.name, image_path))
+                results.append(True)
+            return results
@@ -1,27 +1,246 @@
-"""Linux-specific implementations (placeholder for future development)."""
+"""Linux-specific implementations for monitor detection and wallpaper setting."""
 
-from typing import List
+import json
+import os
+import re
+import shutil
+import subprocess
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
 
 from ..monitors import MonitorInfo
 
+# "HDMI-1 connected primary 1920x1080+0+0 (normal left inverted ...) 527mm x 296mm"
+XRANDR_MONITOR = re.compile(
+    r"^(?P<name>\S+) connected(?P<primary> primary)? "
+    r"(?P<width>\d+)x(?P<height>\d+)\+(?P<x>-?\d+)\+(?P<y>-?\d+)"
+)
+
+DRM_ROOT = Path("/sys/class/drm")
+
+Runner = Callable[..., subprocess.CompletedProcess]
+
+
+def parse_xrandr(output: str) -> List[MonitorInfo]:
+    """Parse the output of ``xrandr --query``; outputs that are off are skipped"""
+    monitors = []
+    for line in output.splitlines():
+        match = XRANDR_MONITOR.match(line)
+        if not match:
+            continue
+        monitors.append(
+            MonitorInfo(
+                handle=len(monitors),
+                width=int(match["width"]),
+                height=int(match["height"]),
+                x=int(match["x"]),
+                y=int(match["y"]),
+                is_primary=bool(match["primary"]),
+                name=match["name"],
+            )
+        )
+    if monitors and not any(monitor.is_primary for monitor in monitors):
+        monitors[0].is_primary = True
+    return monitors
+
+
+def read_drm_monitors(root: Path = DRM_ROOT) -> List[MonitorInfo]:
+    """Read connected outputs from DRM sysfs, for Wayland or when X is unavailable
+
+    sysfs has no layout information, so monitors are placed left to right at their
+    preferred (first listed) mode.
+    """
+    monitors = []
+    x = 0
+    for connector in sorted(root.glob("card*-*")):
+        try:
+            if (connector / "status").read_text().strip() != "connected":
+                continue
+            modes = (connector / "modes").read_text().split()
+        except OSError:
+            continue
+        if not modes:
+            continue
+        width, _, height = modes[0].partition("x")
+        try:
+            width, height = int(width), int(height.rstrip("i"))
+        except ValueError:
+            continue
+        monitors.append(
+            MonitorInfo(
+                handle=len(monitors),
+                width=width,
+                height=height,
+                x=x,
+                y=0,
+                is_primary=not monitors,
+                # "card0-HDMI-A-1" -> "HDMI-A-1"
+                name=connector.name.split("-", 1)[1],
+            )
+        )
+        x += width
+    return monitors
+
 
 class LinuxMonitorDetector:
-    """Linux-specific monitor detection (to be implemented)"""
+    """Linux monitor detection via xrandr, falling back to DRM sysfs
+
+    Results are cached for ``cache_seconds`` so repeated lookups (startup,
+    hotplug polling, reloads) don't spawn xrandr every time.
+    """
+
+    def __init__(
+        self,
+        cache_seconds: float = 2.0,
+        runner: Runner = subprocess.run,
+        drm_root: Path = DRM_ROOT,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.cache_seconds = cache_seconds
+        self.runner = runner
+        self.drm_root = drm_root
+        self.clock = clock
+        self._cached: Optional[List[MonitorInfo]] = None
+        self._cached_at = 0.0
 
     def detect_monitors(self) -> List[MonitorInfo]:
-        """Detect all connected monitors using Linux APIs"""
-        # TODO: Implement using xrandr or other Linux APIs
-        raise NotImplementedError("Linux monitor detection not yet implemented")
+        """Detect all connected monitors"""
+        now = self.clock()
+        if self._cached is None or now - self._cached_at >= self.cache_seconds:
+            self._cached = self._detect()
+            self._cached_at = now
+        return list(self._cached)
+
+    def _detect(self) -> List[MonitorInfo]:
+        if os.environ.get("DISPLAY") and shutil.which("xrandr"):
+            try:
+                # --current reports the known state without reprobing outputs
+                result = self.runner(
+                    ["xrandr", "--query", "--current"],
+                    capture_output=True,
+                    text=True,
+                    timeout=5,
+                )
+                monitors = parse_xrandr(result.stdout)
+                if monitors:
+                    return monitors
+            except (OSError, subprocess.SubprocessError) as e:
+                print(f"Error running xrandr: {e}")
+        return read_drm_monitors(self.drm_root)
+
+
+def detect_desktop(environ: Optional[Dict[str, str]] = None) -> str:
+    """Name of the wallpaper backend for the running desktop environment"""
+    environ = os.environ if environ is None else environ
+    desktop = environ.get("XDG_CURRENT_DESKTOP", "").lower()
+    if "kde" in desktop:
+        return "kde"
+    if "xfce" in desktop:
+        return "xfce"
+    if any(name in desktop for name in ("gnome", "unity", "budgie", "pantheon")):
+        return "gnome"
+    if "cinnamon" in desktop:
+        return "cinnamon"
+    return "feh"
+
+
+KDE_SCRIPT = """
+var paths = %s;
+var all = desktops();
+for (var i = 0; i < all.length; i++) {
+    var path = paths[all[i].screen];
+    if (!path) continue;
+    all[i].wallpaperPlugin = "org.kde.image";
+    all[i].currentConfigGroup = ["Wallpaper", "org.kde.image", "General"];
+    all[i].writeConfig("Image", "file://" + path);
+}
+"""
 
 
 class LinuxWallpaperSetter:
-    """Linux-specific wallpaper setting (to be implemented)"""
+    """Sets wallpapers on GNOME, Cinnamon, KDE Plasma, XFCE or any X11 desktop via feh
+
+    All monitors are updated with a single command per call: ``set_wallpapers``
+    takes every new assignment of a rotation tick at once. KDE and feh support
+    per-monitor wallpapers; GNOME and Cinnamon show one image on all monitors.
+    """
+
+    def __init__(self, desktop: Optional[str] = None, runner: Runner = subprocess.run):
+        self.desktop = desktop or detect_desktop()
+        self.runner = runner
+        self.current: Dict[str, str] = {}  # monitor name -> image path
+        self.screens: Dict[str, int] = {}  # monitor name -> screen index
 
     def set_wallpaper(self, monitor: MonitorInfo, image_path: str) -> bool:
-        """Set wallpaper using Linux APIs"""
-        # TODO: Implement for various Linux desktop environments:
-        # - GNOME: gsettings
-        # - KDE: plasma-apply-wallpaperimage
-        # - XFCE: xfconf-query
-        # - Others: feh, nitrogen, etc.
-        raise NotImplementedError("Linux wallpaper setting not yet implemented")
+        """Set the wallpaper of one monitor"""
+        return self.set_wallpapers([(monitor, image_path)])[0]
+
+    def set_wallpapers(self, assignments: Sequence) -> List[bool]:
+        """Set wallpapers for several ``(monitor, image_path)`` pairs in one command
+
+        Returns whether each assignment was applied; assignments set by the same
+        command share its result.
+        """
+        for monitor, image_path in assignments:
+            self.current[monitor.name] = image_path
+            self.screens[monitor.name] = monitor.handle
+        results = [True] * len(assignments)
+        if not assignments:
+            return results
+        for command, stdin, covered in self._commands(assignments):
+            if not self._run(command, stdin):
+                for index in covered:
+                    results[index] = False
+        return results
+
+    def _run(self, command: List[str], stdin: Optional[str]) -> bool:
+        try:
+            result = self.runner(command, input=stdin, capture_output=True, text=True, timeout=10)
+        except (OSError, subprocess.SubprocessError) as e:
+            print(f"Error setting wallpaper via {command[0]}: {e}")
+            return False
+        if result.returncode != 0:
+            print(f"Error setting wallpaper via {command[0]}: {result.stderr.strip()}")
+            return False
+        return True
+
+    def _commands(self, assignments: Sequence):
+        """(command line, stdin, indices of the assignments it sets) for the desktop's tool"""
+        everything = range(len(assignments))
+        if self.desktop in ("gnome", "cinnamon"):
+            # One image for the whole desktop: the last assignment wins
+            uri = Path(assignments[-1][1]).as_uri()
+            schema = f"/org/{self.desktop}/desktop/background/"
+            keys = f"picture-uri='{uri}'\n"
+            if self.desktop == "gnome":
+                keys += f"picture-uri-dark='{uri}'\n"
+            return [(["dconf", "load", schema], "[/]\n" + keys, everything)]
+        if self.desktop == "kde":
+            paths = {self.screens[name]: path for name, path in self.current.items()}
+            script = KDE_SCRIPT % json.dumps({str(k): v for k, v in paths.items()})
+            qdbus = shutil.which("qdbus6") or "qdbus"
+            return [
+                (
+                    [qdbus, "org.kde.plasmashell", "/PlasmaShell",
+                     "org.kde.PlasmaShell.evaluateScript", script],
+                    None,
+                    everything,
+                )
+            ]
+        if self.desktop == "xfce":
+            # xfconf-query sets one property per call; only changed monitors are sent
+            return [
+                (
+                    ["xfconf-query", "-c", "xfce4-desktop", "--create", "-t", "string",
+                     "-p", f"/backdrop/screen0/monitor{monitor.name}/workspace0/last-image",
+                     "-s", image_path],
+                    None,
+                    [index],
+                )
+                for index, (monitor, image_path) in enumerate(assignments)
+            ]
+        # feh assigns images to Xinerama screens in order
+        ordered = sorted(self.current, key=lambda name: self.screens[name])
+        images = [self.current[name] for name in ordered]
+        return [(["feh", "--no-fehbg", "--bg-fill", *images], None, everything)]
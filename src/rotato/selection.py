@@ -0,0 +1,363 @@
+"""Wallpaper selection strategies."""
+
+import heapq
+import os
+import random
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from .catalog import ImageCatalog
+
+
+class SelectionStrategy:
+    """Chooses the next image from a monitor's pool
+
+    Strategies work on catalog ids. ``set_pool`` may be called again whenever the
+    pool changes and only applies the difference. State is exported keyed by path
+    so it survives restarts and catalog rebuilds.
+    """
+
+    name = "random"
+
+    def __init__(self, catalog: ImageCatalog, rng: Optional[random.Random] = None):
+        self.catalog = catalog
+        self.rng = rng or random.Random()
+        self.pool: Sequence[int] = ()
+
+    def set_pool(self, pool: Sequence[int]):
+        """Switch to a new pool of catalog ids"""
+        self.pool = pool
+
+    def set_catalog(self, catalog: ImageCatalog):
+        """Move to a rebuilt catalog, carrying state over by path; call before ``set_pool``"""
+        self.catalog = catalog
+        self.pool = ()
+
+    def pick(self) -> Optional[int]:
+        """Choose the next image, or None if the pool is empty"""
+        if not self.pool:
+            return None
+        return self.pool[self.rng.randrange(len(self.pool))]
+
+    def mark_shown(self, image_id: int, when: float):
+        """Record that an image was shown (picked or set explicitly)"""
+
+    def upcoming(self, count: int) -> List[int]:
+        """Best guess at the next ``count`` picks, without consuming them"""
+        if not self.pool:
+            return []
+        return [self.pool[self.rng.randrange(len(self.pool))] for _ in range(count)]
+
+    def to_state(self) -> Dict:
+        """Selection state keyed by path, for persisting"""
+        return {}
+
+    def load_state(self, state: Dict):
+        """Restore state saved by ``to_state``; call before ``set_pool``"""
+
+    def seed_history(self, last_shown: Dict[str, float]):
+        """Learn when paths were last shown, e.g. from the rotation history"""
+
+
+# Sort key for images that were never shown
+NEVER_SHOWN = float("-inf")
+
+
+def _diff_pools(old: Sequence[int], new: Sequence[int]):
+    """Ids added to and removed from a pool"""
+    old_ids, new_ids = set(old), set(new)
+    return new_ids - old_ids, old_ids - new_ids
+
+
+def _remap(ids: Iterable[int], old: ImageCatalog, new: ImageCatalog) -> List[int]:
+    """Ids of the same paths in another catalog, dropping paths it doesn't hold"""
+    return [image_id for image_id in map(new.find, old.paths(ids)) if image_id >= 0]
+
+
+class ShuffleBagStrategy(SelectionStrategy):
+    """Shows every image once, in random order, before any repeats
+
+    The bag is a shuffled permutation consumed from the end in O(1) per pick.
+    Images added to the pool are dropped into the unconsumed part of the bag at a
+    random position; removed images are skipped lazily when they come up. Images
+    already shown this cycle are remembered, so restored state can tell them
+    apart from images added since.
+    """
+
+    name = "shuffle"
+
+    def __init__(self, catalog: ImageCatalog, rng: Optional[random.Random] = None):
+        super().__init__(catalog, rng)
+        self.bag = array("I")
+        self.removed: Set[int] = set()  # Ids still in the bag but no longer in the pool
+        self.shown: Set[int] = set()  # Ids consumed from the bag this cycle
+        self.last_pick: Optional[int] = None
+        self.resumed = False  # Bag was restored from saved state
+
+    def set_pool(self, pool: Sequence[int]):
+        if self.resumed:
+            # Continue the saved cycle: images shown in it wait for the next
+            # cycle, images added since the state was saved join the bag
+            self.resumed = False
+            self.pool = pool
+            in_bag = set(self.bag)
+            self.removed = in_bag - set(pool)
+            for image_id in pool:
+                if image_id not in in_bag and image_id not in self.shown:
+                    self._insert(image_id)
+            return
+
+        added, removed = _diff_pools(self.pool, pool)
+        self.pool = pool
+        self.removed |= removed
+        for image_id in added:
+            if image_id in self.removed:
+                # Came back before its turn; it is still in the bag
+                self.removed.discard(image_id)
+            else:
+                self._insert(image_id)
+
+    def set_catalog(self, catalog: ImageCatalog):
+        old = self.catalog
+        self.pool = array("I", _remap(self.pool, old, catalog))
+        self.bag = array("I", _remap(self.bag, old, catalog))
+        self.removed = set(_remap(self.removed, old, catalog))
+        self.shown = set(_remap(self.shown, old, catalog))
+        if self.last_pick is not None:
+            [self.last_pick] = _remap([self.last_pick], old, catalog) or [None]
+        self.catalog = catalog
+
+    def _insert(self, image_id: int):
+        """Put an id at a uniformly random position of the unconsumed bag"""
+        self.bag.append(image_id)
+        position = self.rng.randrange(len(self.bag))
+        self.bag[-1], self.bag[position] = self.bag[position], self.bag[-1]
+
+    def _refill(self):
+        self.bag = array("I", self.pool)
+        self.rng.shuffle(self.bag)
+        self.removed.clear()
+        self.shown.clear()
+        # Don't show the same image twice in a row across cycles
+        if len(self.bag) > 1 and self.bag[-1] == self.last_pick:
+            self.bag[-1], self.bag[0] = self.bag[0], self.bag[-1]
+
+    def pick(self) -> Optional[int]:
+        if not self.pool:
+            return None
+        while True:
+            if not self.bag:
+                self._refill()
+            image_id = self.bag.pop()
+            if image_id in self.removed:
+                self.removed.discard(image_id)
+                continue
+            self.last_pick = image_id
+            self.shown.add(image_id)
+            return image_id
+
+    def upcoming(self, count: int) -> List[int]:
+        result = []
+        for image_id in reversed(self.bag):
+            if len(result) >= count:
+                break
+            if image_id not in self.removed:
+                result.append(image_id)
+        return result
+
+    def to_state(self) -> Dict:
+        return {
+            "remaining": [
+                self.catalog.path(image_id)
+                for image_id in self.bag
+                if image_id not in self.removed
+            ],
+            "shown": self.catalog.paths(self.shown),
+        }
+
+    def load_state(self, state: Dict):
+        ids = (self.catalog.find(path) for path in state.get("remaining", []))
+        self.bag = array("I", (image_id for image_id in ids if image_id >= 0))
+        shown = (self.catalog.find(path) for path in state.get("shown", []))
+        self.shown = {image_id for image_id in shown if image_id >= 0}
+        self.removed.clear()
+        self.resumed = True
+
+
+class LeastRecentlyShownStrategy(SelectionStrategy):
+    """Always shows the image that has gone longest without being shown
+
+    A heap ordered by last-shown time gives O(log n) picks. Never-shown images
+    come first in random order. Entries for removed images or outdated
+    timestamps are discarded lazily when they reach the top.
+    """
+
+    name = "lru"
+
+    def __init__(self, catalog: ImageCatalog, rng: Optional[random.Random] = None):
+        super().__init__(catalog, rng)
+        self.last_shown: Dict[int, float] = {}
+        self.heap: List = []
+        self.members: Set[int] = set()
+
+    def set_catalog(self, catalog: ImageCatalog):
+        last_shown = {self.catalog.path(i): when for i, when in self.last_shown.items()}
+        super().set_catalog(catalog)
+        self.last_shown = {}
+        self.heap = []
+        self.members = set()
+        self.seed_history(last_shown)
+
+    def _push(self, image_id: int):
+        heapq.heappush(
+            self.heap, (self.last_shown.get(image_id, NEVER_SHOWN), self.rng.random(), image_id)
+        )
+
+    def set_pool(self, pool: Sequence[int]):
+        members = set(pool)
+        added = members - self.members
+        self.pool = pool
+        self.members = members
+        for image_id in added:
+            self._push(image_id)
+        self._compact()
+
+    def _compact(self):
+        """Drop stale entries once they outnumber live ones"""
+        if len(self.heap) > 2 * len(self.members) + 64:
+            self.heap = [entry for entry in self.heap if self._valid(entry)]
+            heapq.heapify(self.heap)
+
+    def _valid(self, entry) -> bool:
+        shown, _tiebreak, image_id = entry
+        return image_id in self.members and shown == self.last_shown.get(image_id, NEVER_SHOWN)
+
+    def pick(self) -> Optional[int]:
+        while self.heap:
+            if self._valid(self.heap[0]):
+                return self.heap[0][2]
+            heapq.heappop(self.heap)
+        return None
+
+    def mark_shown(self, image_id: int, when: float):
+        self.last_shown[image_id] = when
+        if image_id in self.members:
+            self._push(image_id)
+            self._compact()
+
+    def upcoming(self, count: int) -> List[int]:
+        seen = set()
+        result = []
+        for entry in heapq.nsmallest(count * 4, self.heap):
+            if self._valid(entry) and entry[2] not in seen:
+                seen.add(entry[2])
+                result.append(entry[2])
+                if len(result) == count:
+                    break
+        return result
+
+    def to_state(self) -> Dict:
+        return {
+            "last_shown": {
+                self.catalog.path(image_id): when for image_id, when in self.last_shown.items()
+            }
+        }
+
+    def load_state(self, state: Dict):
+        self.seed_history(state.get("last_shown", {}))
+
+    def seed_history(self, last_shown: Dict[str, float]):
+        for path, when in last_shown.items():
+            image_id = self.catalog.find(path)
+            if image_id >= 0 and when > self.last_shown.get(image_id, NEVER_SHOWN):
+                self.last_shown[image_id] = when
+
+
+class WeightedRandomStrategy(SelectionStrategy):
+    """Random choice with per-source weights, O(1) per pick via an alias table
+
+    ``weights`` maps path prefixes (usually source folders) to relative weights;
+    the longest matching prefix applies and other images weigh 1. The alias
+    table is rebuilt in O(n) when the pool changes.
+    """
+
+    name = "weighted"
+
+    def __init__(
+        self,
+        catalog: ImageCatalog,
+        rng: Optional[random.Random] = None,
+        weights: Optional[Dict[str, float]] = None,
+    ):
+        super().__init__(catalog, rng)
+        prefixes = {os.path.normpath(prefix): weight for prefix, weight in (weights or {}).items()}
+        self.weights = sorted(prefixes.items(), key=lambda item: -len(item[0]))
+        self.probability = array("d")
+        self.alias = array("I")
+
+    def _weight(self, image_id: int) -> float:
+        path = self.catalog.path(image_id)
+        for prefix, weight in self.weights:
+            if path.startswith(prefix):
+                return weight
+        return 1.0
+
+    def set_pool(self, pool: Sequence[int]):
+        self.pool = pool
+        n = len(pool)
+        weights = [self._weight(image_id) for image_id in pool]
+        total = sum(weights)
+        self.probability = array("d", bytes(8 * n))
+        self.alias = array("I", bytes(4 * n))
+        if not n or total <= 0:
+            return
+
+        # Vose's alias method
+        scaled = [weight * n / total for weight in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        for i in small + large:
+            self.probability[i] = 1.0
+
+    def pick(self) -> Optional[int]:
+        if not self.pool:
+            return None
+        i = self.rng.randrange(len(self.pool))
+        if self.rng.random() >= self.probability[i]:
+            i = self.alias[i]
+        return self.pool[i]
+
+    def upcoming(self, count: int) -> List[int]:
+        return [self.pick() for _ in range(count)] if self.pool else []
+
+
+STRATEGIES = {
+    strategy.name: strategy
+    for strategy in (
+        SelectionStrategy,
+        ShuffleBagStrategy,
+        LeastRecentlyShownStrategy,
+        WeightedRandomStrategy,
+    )
+}
+
+
+def create_strategy(
+    name: str,
+    catalog: ImageCatalog,
+    weights: Optional[Dict[str, float]] = None,
+    rng: Optional[random.Random] = None,
+) -> SelectionStrategy:
+    """Create a selection strategy by its config name"""
+    if name not in STRATEGIES:
+        print(f"Unknown selection strategy '{name}', using 'shuffle'")
+        name = ShuffleBagStrategy.name
+    if name == WeightedRandomStrategy.name:
+        return WeightedRandomStrategy(catalog, rng, weights)
+    return STRATEGIES[name](catalog, rng)
@@ -0,0 +1,344 @@
+"""Deterministic rotation simulation against a virtual clock.
+
+Drives DesktopBackgroundManager's selection and scheduling code with virtual
+timers and the fake wallpaper setter, so weeks of rotation across several
+monitors run in seconds. The report covers how evenly images are repeated, the
+CPU cost of each rotation tick and how far rotations stray from their interval.
+With a fixed seed (and without ``charge_cpu``) runs are exactly reproducible.
+"""
+
+import contextlib
+import heapq
+import itertools
+import os
+import statistics
+import tempfile
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import yaml
+
+from .catalog import CatalogSnapshot, ImageCatalog
+from .monitors import MonitorManager
+from .platform.fake import FakeMonitorDetector, FakeWallpaperSetter, parse_monitor_spec
+from .wallpaper import WallpaperManager
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+# Where synthetic images pretend to live
+SYNTHETIC_SOURCE = "/simulated"
+
+# Virtual time simulations start at, so runs are reproducible
+SIMULATION_EPOCH = 1_700_000_000.0
+
+
+class VirtualTimer:
+    """threading.Timer stand-in that fires when its VirtualClock is advanced"""
+
+    def __init__(self, clock: "VirtualClock", interval: float, function: Callable[[], None]):
+        self.clock = clock
+        self.interval = interval
+        self.function = function
+        self.due: Optional[float] = None
+        self.finished = False
+
+    def start(self):
+        self.due = self.clock() + self.interval
+        self.clock._schedule(self)
+
+    def cancel(self):
+        self.finished = True
+
+    def is_alive(self) -> bool:
+        return self.due is not None and not self.finished
+
+
+@dataclass
+class Tick:
+    """One timer callback"""
+
+    due: float  # Virtual time it was scheduled for
+    fired: float  # Virtual time it ran
+    cpu_seconds: float
+
+
+class VirtualClock:
+    """Simulated time, usable as a ``clock`` and ``timer_factory`` for the manager
+
+    Time only moves in ``run_until``, which fires due timers in order. With
+    ``charge_cpu`` time also passes while a callback runs, by the wall-clock time
+    it takes, so slow ticks delay later ones the way they would on a desktop.
+    """
+
+    def __init__(self, start: float = 0.0, charge_cpu: bool = False):
+        self.now = start
+        self.charge_cpu = charge_cpu
+        self.ticks: List[Tick] = []
+        self._heap: List = []
+        self._order = itertools.count()
+        self._callback_started: Optional[float] = None
+
+    def __call__(self) -> float:
+        if self.charge_cpu and self._callback_started is not None:
+            return self.now + time.perf_counter() - self._callback_started
+        return self.now
+
+    def timer(self, interval: float, function: Callable[[], None]) -> VirtualTimer:
+        """A timer that calls ``function`` ``interval`` virtual seconds after start()"""
+        return VirtualTimer(self, interval, function)
+
+    def _schedule(self, timer: VirtualTimer):
+        heapq.heappush(self._heap, (timer.due, next(self._order), timer))
+
+    @property
+    def pending(self) -> int:
+        return sum(1 for _due, _order, timer in self._heap if not timer.finished)
+
+    def run_until(self, deadline: float) -> int:
+        """Fire every timer due up to ``deadline`` and return how many ran"""
+        fired = 0
+        while self._heap and self._heap[0][0] <= deadline:
+            due, _order, timer = heapq.heappop(self._heap)
+            if timer.finished:
+                continue
+            timer.finished = True
+            self.now = max(self.now, due)
+            fired_at = self.now
+            self._callback_started = time.perf_counter()
+            cpu_start = time.process_time()
+            try:
+                timer.function()
+            finally:
+                cpu = time.process_time() - cpu_start
+                if self.charge_cpu:
+                    self.now += time.perf_counter() - self._callback_started
+                self._callback_started = None
+            self.ticks.append(Tick(due, fired_at, cpu))
+            fired += 1
+        self.now = max(self.now, deadline)
+        return fired
+
+
+def _percentile(values: Sequence[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+@dataclass
+class MonitorStats:
+    """Simulation results for one monitor"""
+
+    rotations: int = 0
+    pool_size: int = 0
+    distinct_shown: int = 0
+    min_shows: int = 0  # Fewest times any pool image was shown (0 if some never were)
+    max_shows: int = 0
+    min_repeat_gap: Optional[int] = None  # Rotations between two shows of the same image
+    median_repeat_gap: Optional[float] = None
+    interval_seconds: float = 0.0  # Configured rotation interval
+    max_interval_error: float = 0.0  # Largest deviation of a rotation interval, seconds
+    drift_seconds: float = 0.0  # Lateness of the last rotation against a perfect schedule
+
+
+@dataclass
+class SimulationReport:
+    """Outcome of a simulation run"""
+
+    simulated_seconds: float = 0.0
+    wall_seconds: float = 0.0
+    ticks: int = 0
+    tick_cpu_median: float = 0.0
+    tick_cpu_p99: float = 0.0
+    tick_cpu_max: float = 0.0
+    max_tick_delay: float = 0.0  # Latest a timer fired after it was due, seconds
+    monitors: Dict[str, MonitorStats] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    def summary(self) -> str:
+        lines = [
+            f"Simulated {self.simulated_seconds / SECONDS_PER_DAY:g} days in "
+            f"{self.wall_seconds:.2f}s: {self.ticks} ticks, CPU per tick "
+            f"median {self.tick_cpu_median * 1e6:.0f}us, p99 {self.tick_cpu_p99 * 1e6:.0f}us, "
+            f"max {self.tick_cpu_max * 1e6:.0f}us; "
+            f"latest tick {self.max_tick_delay * 1e3:.2f}ms late"
+        ]
+        for name, stats in self.monitors.items():
+            gaps = (
+                f"repeat gap min {stats.min_repeat_gap}, median {stats.median_repeat_gap:g}"
+                if stats.min_repeat_gap is not None
+                else "no repeats"
+            )
+            lines.append(
+                f"  {name}: {stats.rotations} rotations, "
+                f"{stats.distinct_shown}/{stats.pool_size} images shown "
+                f"{stats.min_shows}-{stats.max_shows} times, {gaps}; "
+                f"interval error max {stats.max_interval_error * 1e3:.2f}ms, "
+                f"drift {stats.drift_seconds * 1e3:.2f}ms"
+            )
+        return "\n".join(lines)
+
+
+def synthetic_snapshot(image_count: int, monitor_names: Sequence[str]) -> CatalogSnapshot:
+    """A catalog of made-up image paths with every image in every monitor's pool"""
+    catalog = ImageCatalog()
+    ids = catalog.intern_many(
+        f"{SYNTHETIC_SOURCE}/{i // 1000:03d}/IMG_{i:06d}.jpg" for i in range(image_count)
+    )
+    return CatalogSnapshot(catalog, dict.fromkeys(monitor_names, ids))
+
+
+def simulation_config(config: Dict, workdir: Path) -> Dict:
+    """Copy of ``config`` that keeps the simulation from touching the user's files"""
+    config = yaml.safe_load(yaml.safe_dump(config))
+    global_config = config["global"]
+    global_config.update(
+        {
+            "stats_file": None,
+            "prometheus_textfile": None,
+            "selection_state_file": None,
+            "history_file": None,
+            "local_mirror": None,
+            "hotkeys": {},
+        }
+    )
+    global_config.setdefault("cache_file", str(workdir / "image_cache.json"))
+    return config
+
+
+def run_simulation(app, clock: VirtualClock, days: float) -> SimulationReport:
+    """Rotate ``app`` for ``days`` of virtual time and summarize what happened
+
+    ``app`` must have been built with ``clock`` and ``clock.timer`` and have a
+    published snapshot.
+    """
+    duration = days * SECONDS_PER_DAY
+    # Keep every rotation in memory for the report
+    for monitor_config in app.monitor_configs.values():
+        expected = duration / (monitor_config.rotation_interval_minutes * 60) + 2
+        app.history.max_entries_per_monitor = max(
+            app.history.max_entries_per_monitor, int(expected)
+        )
+
+    start = clock.now
+    wall_start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        app.start_rotation()
+        clock.run_until(start + duration)
+        app.stop_rotation()
+    wall_seconds = time.perf_counter() - wall_start
+
+    cpu = [tick.cpu_seconds for tick in clock.ticks]
+    report = SimulationReport(
+        simulated_seconds=duration,
+        wall_seconds=wall_seconds,
+        ticks=len(clock.ticks),
+        tick_cpu_median=statistics.median(cpu) if cpu else 0.0,
+        tick_cpu_p99=_percentile(cpu, 0.99),
+        tick_cpu_max=max(cpu, default=0.0),
+        max_tick_delay=max((tick.fired - tick.due for tick in clock.ticks), default=0.0),
+    )
+    for monitor in app.monitor_manager.monitors:
+        monitor_config = app.monitor_configs.get(monitor.name)
+        if monitor_config is None:
+            continue
+        entries = app.history.since(start, monitor.name)
+        report.monitors[monitor.name] = _monitor_stats(
+            entries,
+            len(app.snapshot.pool(monitor.name)),
+            monitor_config.rotation_interval_minutes * 60,
+        )
+    return report
+
+
+def _monitor_stats(entries, pool_size: int, interval: float) -> MonitorStats:
+    stats = MonitorStats(rotations=len(entries), pool_size=pool_size, interval_seconds=interval)
+    counts = Counter(entry.path for entry in entries)
+    stats.distinct_shown = len(counts)
+    stats.max_shows = max(counts.values(), default=0)
+    stats.min_shows = min(counts.values(), default=0) if len(counts) >= pool_size else 0
+
+    gaps = []
+    last_index: Dict[str, int] = {}
+    for index, entry in enumerate(entries):
+        if entry.path in last_index:
+            gaps.append(index - last_index[entry.path])
+        last_index[entry.path] = index
+    if gaps:
+        stats.min_repeat_gap = min(gaps)
+        stats.median_repeat_gap = statistics.median(gaps)
+
+    times = [entry.timestamp for entry in entries]
+    errors = [later - earlier - interval for earlier, later in zip(times, times[1:])]
+    stats.max_interval_error = max((abs(error) for error in errors), default=0.0)
+    if len(times) > 1:
+        stats.drift_seconds = times[-1] - times[0] - (len(times) - 1) * interval
+    return stats
+
+
+def simulate(
+    config: Optional[Dict] = None,
+    monitors: str = "1920x1080",
+    images: Optional[int] = None,
+    days: float = 7,
+    interval_minutes: Optional[float] = None,
+    strategy: Optional[str] = None,
+    seed: int = 0,
+    charge_cpu: bool = False,
+) -> SimulationReport:
+    """Simulate rotation for ``days`` on fake ``monitors``
+
+    With ``images`` the pools are that many synthetic images and no files are
+    read; otherwise images are discovered and filtered from ``config``'s sources
+    as usual. ``interval_minutes`` and ``strategy`` override every monitor's
+    setting.
+    """
+    from .config import ConfigManager
+    from .core import DesktopBackgroundManager
+
+    with tempfile.TemporaryDirectory(prefix="rotato-sim-") as tmpdir:
+        workdir = Path(tmpdir)
+        if config is None:
+            config = ConfigManager(str(workdir / "unused.yaml")).default_config
+        config = simulation_config(config, workdir)
+        if images is not None:
+            config["global"]["cache_file"] = str(workdir / "image_cache.json")
+            config["monitors"] = [
+                {**monitor, "image_sources": [SYNTHETIC_SOURCE], "filters": {}}
+                for monitor in config["monitors"]
+            ]
+        if interval_minutes is not None:
+            config["global"]["rotation_interval_minutes"] = interval_minutes
+        for monitor_config in config["monitors"]:
+            if interval_minutes is not None:
+                monitor_config["rotation_interval_minutes"] = interval_minutes
+            if strategy is not None:
+                monitor_config["selection"] = strategy
+        config_path = workdir / "config.yaml"
+        config_path.write_text(yaml.safe_dump(config), encoding="utf-8")
+
+        clock = VirtualClock(start=SIMULATION_EPOCH, charge_cpu=charge_cpu)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            app = DesktopBackgroundManager(
+                str(config_path),
+                monitor_manager=MonitorManager(
+                    FakeMonitorDetector(parse_monitor_spec(monitors))
+                ),
+                wallpaper_manager=WallpaperManager(FakeWallpaperSetter()),
+                clock=clock,
+                timer_factory=clock.timer,
+                seed=seed,
+            )
+            if images is not None:
+                names = [monitor.name for monitor in app.monitor_manager.monitors]
+                snapshot = synthetic_snapshot(images, names)
+            else:
+                snapshot = app.build_snapshot(app.config)
+            app.publish(app.config, snapshot)
+        return run_simulation(app, clock, days)
@@ -0,0 +1,171 @@
+"""Throttling and low-priority execution for background indexing."""
+
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+# Linux ioprio_set(2) syscall numbers and constants
+_IOPRIO_SYSCALLS = {"x86_64": 251, "aarch64": 30, "i686": 289, "armv7l": 314}
+_IOPRIO_WHO_PROCESS = 1
+_IOPRIO_CLASS_IDLE = 3
+_IOPRIO_CLASS_SHIFT = 13
+
+# Windows SetPriorityClass flag that also lowers I/O and memory priority
+_PROCESS_MODE_BACKGROUND_BEGIN = 0x00100000
+
+
+class Throttle:
+    """Rate limiter with an image and byte budget and load-based backoff
+
+    Budgets are token buckets refilled continuously, so short bursts are allowed
+    while the long-term rate stays under ``max_images_per_sec`` and
+    ``max_bytes_per_sec``. When the system load per CPU exceeds
+    ``max_load_per_cpu`` the caller is held back with an exponentially growing
+    pause until the load drops again. It can be shared by several threads;
+    waits happen outside its lock.
+    """
+
+    def __init__(
+        self,
+        max_images_per_sec: Optional[float] = None,
+        max_bytes_per_sec: Optional[float] = None,
+        max_load_per_cpu: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+        load: Optional[Callable[[], float]] = None,
+    ):
+        self.max_images_per_sec = max_images_per_sec
+        self.max_bytes_per_sec = max_bytes_per_sec
+        self.max_load_per_cpu = max_load_per_cpu
+        self.clock = clock
+        self.sleep = sleep
+        self.load = load or _load_per_cpu
+
+        now = clock()
+        self._last_refill = now
+        # Allow one second worth of burst
+        self._image_tokens = max_images_per_sec or 0.0
+        self._byte_tokens = max_bytes_per_sec or 0.0
+
+        self._backoff = 0.0
+        self._last_load_check = float("-inf")
+        self.throttled_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> Optional["Throttle"]:
+        """Build a throttle from the ``background_indexing`` config section"""
+        if not config or not config.get("enabled", True):
+            return None
+        max_mb = config.get("max_mb_per_sec")
+        return cls(
+            max_images_per_sec=config.get("max_images_per_sec"),
+            max_bytes_per_sec=max_mb * 1024 * 1024 if max_mb else None,
+            max_load_per_cpu=config.get("max_load_per_cpu"),
+        )
+
+    def acquire(self, images: int = 1, nbytes: int = 0):
+        """Wait until ``images`` and ``nbytes`` fit in the budget, then spend them"""
+        self._wait_for_load()
+
+        with self._lock:
+            self._refill()
+            wait = 0.0
+            if self.max_images_per_sec and images:
+                self._image_tokens -= images
+                if self._image_tokens < 0:
+                    wait = max(wait, -self._image_tokens / self.max_images_per_sec)
+            if self.max_bytes_per_sec and nbytes:
+                self._byte_tokens -= nbytes
+                if self._byte_tokens < 0:
+                    wait = max(wait, -self._byte_tokens / self.max_bytes_per_sec)
+        if wait > 0:
+            self._pause(wait)
+
+    def _refill(self):
+        now = self.clock()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        if self.max_images_per_sec:
+            self._image_tokens = min(
+                self.max_images_per_sec, self._image_tokens + elapsed * self.max_images_per_sec
+            )
+        if self.max_bytes_per_sec:
+            self._byte_tokens = min(
+                self.max_bytes_per_sec, self._byte_tokens + elapsed * self.max_bytes_per_sec
+            )
+
+    def _wait_for_load(self):
+        """Back off while the system is busy"""
+        if self.max_load_per_cpu is None:
+            return
+        while True:
+            with self._lock:
+                now = self.clock()
+                if now - self._last_load_check < 1.0 and self._backoff == 0:
+                    return
+                self._last_load_check = now
+                load = self.load()
+                if load is None or load <= self.max_load_per_cpu:
+                    self._backoff = 0.0
+                    return
+                self._backoff = min(8.0, self._backoff * 2 if self._backoff else 0.25)
+                backoff = self._backoff
+            self._pause(backoff)
+
+    def _pause(self, seconds: float):
+        with self._lock:
+            self.throttled_seconds += seconds
+        self.sleep(seconds)
+
+
+def _load_per_cpu() -> Optional[float]:
+    """One-minute load average per CPU, or None where unavailable"""
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return None
+
+
+def lower_process_priority():
+    """Run the current process at idle CPU and I/O priority where supported
+
+    Meant for processes that only index, such as ``rotato index
+    --background`` or the daemon's decode worker.
+    """
+    if sys.platform == "win32":
+        try:
+            import ctypes
+
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), _PROCESS_MODE_BACKGROUND_BEGIN)
+        except Exception as e:
+            print(f"Could not lower process priority: {e}")
+        return
+
+    try:
+        os.nice(10)
+    except OSError as e:
+        print(f"Could not lower CPU priority: {e}")
+
+    if sys.platform.startswith("linux"):
+        _set_idle_io_priority()
+
+
+def _set_idle_io_priority():
+    """Put the process in the idle I/O scheduling class (Linux)"""
+    try:
+        import ctypes
+        import platform
+
+        syscall_number = _IOPRIO_SYSCALLS.get(platform.machine())
+        if syscall_number is None:
+            return
+        libc = ctypes.CDLL(None, use_errno=True)
+        ioprio = _IOPRIO_CLASS_IDLE << _IOPRIO_CLASS_SHIFT
+        if libc.syscall(syscall_number, _IOPRIO_WHO_PROCESS, 0, ioprio) != 0:
+            print(f"Could not lower I/O priority: {os.strerror(ctypes.get_errno())}")
+    except Exception as e:
+        print(f"Could not lower I/O priority: {e}")
@@ -0,0 +1,280 @@
+"""Thumbnail pack: small previews of cataloged images in a single file.
+
+Thumbnails are made during analysis from the proxy the decoder produces anyway,
+so they cost a JPEG encode but no extra decode. They are appended to one pack
+file next to the image cache, and an index maps content ids to their offset and
+length. Readers memory-map the pack, so the tray (or a picker) can show the
+current and upcoming images of every monitor without opening the originals.
+
+The pack is only ever appended to. Space held by thumbnails of images that left
+the cache is reclaimed by rewriting the pack under a new name when more than
+half of it is dead; processes still reading the old pack drop the thumbnails
+they added to it at their next save. Missing thumbnails never make an analysis
+stale; ImageCache.backfill_thumbnails makes them again.
+"""
+
+import io
+import json
+import mmap
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from PIL import Image
+
+from .fileutil import atomic_write_json, file_lock, lock_path_for
+from .metrics import metrics
+
+# Longest side of a thumbnail in pixels; 0 turns thumbnails off
+THUMBNAIL_SIZE = 128
+THUMBNAIL_QUALITY = 80
+
+INDEX_FILE = "index.json"
+
+# Don't bother compacting packs smaller than this
+COMPACT_MIN_BYTES = 1024 * 1024
+
+
+def encode_thumbnail(proxy: Image.Image, size: int = THUMBNAIL_SIZE) -> bytes:
+    """JPEG thumbnail of an upright RGB proxy, at most ``size`` pixels on its longest side"""
+    thumb = proxy.copy()
+    thumb.thumbnail((size, size))
+    buffer = io.BytesIO()
+    thumb.save(buffer, "JPEG", quality=THUMBNAIL_QUALITY)
+    return buffer.getvalue()
+
+
+def thumbnail_dir_for(cache_file) -> Path:
+    """Directory holding the thumbnail pack of an image cache"""
+    cache_file = Path(cache_file)
+    return cache_file.with_name(cache_file.stem + ".thumbs")
+
+
+class ThumbnailPack:
+    """JPEG thumbnails keyed by content id, appended to one memory-mapped file
+
+    Nothing is written until the first ``add``. Additions go straight to the
+    pack file; the index is written by ``save``, which merges what other
+    processes saved in the meantime.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.pack_name: Optional[str] = None
+        self.entries: Dict[str, Tuple[int, int]] = {}  # content_id -> (offset, length)
+        self.pack_bytes = 0  # Size of the pack file, live and dead thumbnails
+
+        # Changes since the index was last read, replayed when saving
+        self._added: Set[str] = set()
+        self._removed: Set[str] = set()
+        self._lock = threading.Lock()
+        self._map: Optional[mmap.mmap] = None
+        self._map_file = None
+
+        self._load_index()
+
+    @classmethod
+    def for_cache(cls, cache_file) -> "ThumbnailPack":
+        return cls(thumbnail_dir_for(cache_file))
+
+    def __contains__(self, content_id: str) -> bool:
+        return content_id in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def live_bytes(self) -> int:
+        return sum(length for _offset, length in self.entries.values())
+
+    def add(self, content_id: str, data: bytes) -> bool:
+        """Append a thumbnail to the pack; False if it couldn't be written"""
+        with self._lock:
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                with file_lock(lock_path_for(self.directory / INDEX_FILE)):
+                    if self.pack_name is None or not (self.directory / self.pack_name).exists():
+                        self._start_pack()
+                    with open(self.directory / self.pack_name, "ab") as f:
+                        offset = f.seek(0, os.SEEK_END)
+                        f.write(data)
+            except OSError as e:
+                print(f"Error writing thumbnail: {e}")
+                return False
+            self.entries[content_id] = (offset, len(data))
+            self.pack_bytes = max(self.pack_bytes, offset + len(data))
+            self._added.add(content_id)
+            self._removed.discard(content_id)
+        metrics.inc("thumbnails_written_total")
+        return True
+
+    def get(self, content_id: str) -> Optional[bytes]:
+        """JPEG bytes of a thumbnail, or None if there is none"""
+        with self._lock:
+            entry = self.entries.get(content_id)
+            if entry is None:
+                return None
+            offset, length = entry
+            try:
+                if self._map is None or len(self._map) < offset + length:
+                    self._remap()
+            except (OSError, ValueError) as e:
+                print(f"Error reading thumbnails: {e}")
+                return None
+            if self._map is None or len(self._map) < offset + length:
+                return None
+            metrics.inc("thumbnail_reads_total")
+            return self._map[offset:offset + length]
+
+    def open_image(self, content_id: str) -> Optional[Image.Image]:
+        """Decoded thumbnail, or None if there is none"""
+        data = self.get(content_id)
+        if data is None:
+            return None
+        image = Image.open(io.BytesIO(data))
+        image.load()
+        return image
+
+    def discard(self, content_ids: Iterable[str]):
+        """Drop thumbnails; their space is reclaimed when the pack is compacted"""
+        with self._lock:
+            for content_id in content_ids:
+                if self.entries.pop(content_id, None) is not None:
+                    self._removed.add(content_id)
+                    self._added.discard(content_id)
+
+    def retain(self, content_ids: Set[str]):
+        """Drop thumbnails of all content ids not in ``content_ids``"""
+        self.discard([content_id for content_id in self.entries if content_id not in content_ids])
+
+    def save(self):
+        """Write the index, merging changes saved by other processes, and compact if due"""
+        with self._lock:
+            if not self._added and not self._removed:
+                return
+            try:
+                with file_lock(lock_path_for(self.directory / INDEX_FILE)):
+                    self._merge_from_disk()
+                    if self._needs_compaction():
+                        self._compact()
+                    atomic_write_json(
+                        self.directory / INDEX_FILE,
+                        {"pack": self.pack_name, "entries": self.entries},
+                    )
+            except (OSError, ValueError) as e:
+                print(f"Error saving thumbnail index: {e}")
+                return
+            self._added.clear()
+            self._removed.clear()
+
+    def close(self):
+        with self._lock:
+            self._unmap()
+
+    def _load_index(self):
+        index = self._read_index()
+        if index is not None:
+            self.pack_name, self.entries, self.pack_bytes = index
+
+    def _read_index(self) -> Optional[Tuple[str, Dict[str, Tuple[int, int]], int]]:
+        """(pack name, entries, pack size) from disk, or None if there is no usable pack"""
+        try:
+            with open(self.directory / INDEX_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            pack_name = data["pack"]
+            entries = {key: tuple(entry) for key, entry in data["entries"].items()}
+            return pack_name, entries, os.path.getsize(self.directory / pack_name)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Error loading thumbnail index: {e}")
+            return None
+
+    def _start_pack(self):
+        """Switch to the pack on disk, or start one (index lock held)
+
+        Called before the first append, and when another process compacted the
+        pack we were appending to; thumbnails added to that one are lost.
+        """
+        self._unmap()
+        if self._added:
+            metrics.inc("thumbnails_lost_total", len(self._added))
+            self._added.clear()
+        index = self._read_index()
+        if index is not None:
+            self.pack_name, self.entries, self.pack_bytes = index
+            return
+        self.pack_name = _new_pack_name()
+        self.pack_bytes = 0
+        (self.directory / self.pack_name).touch()
+        atomic_write_json(self.directory / INDEX_FILE, {"pack": self.pack_name, "entries": {}})
+
+    def _merge_from_disk(self):
+        """Replay local additions and removals onto the index on disk"""
+        ours = {content_id: self.entries[content_id] for content_id in self._added}
+        index = self._read_index()
+        if index is None:
+            return  # Nobody else wrote a pack
+        self._unmap()
+        pack_name, self.entries, self.pack_bytes = index
+        if pack_name != self.pack_name:
+            # Another process compacted the pack; what we appended went to the old one
+            metrics.inc("thumbnails_lost_total", len(ours))
+            ours = {}
+        self.pack_name = pack_name
+        self.entries.update(ours)
+        for content_id in self._removed:
+            self.entries.pop(content_id, None)
+
+    def _needs_compaction(self) -> bool:
+        return self.pack_bytes > COMPACT_MIN_BYTES and self.pack_bytes > 2 * self.live_bytes
+
+    def _compact(self):
+        """Copy live thumbnails to a new pack and delete the old one"""
+        old_name = self.pack_name
+        new_name = _new_pack_name()
+        entries: Dict[str, Tuple[int, int]] = {}
+        with open(self.directory / old_name, "rb") as src:
+            with open(self.directory / new_name, "wb") as dst:
+                for content_id, (offset, length) in sorted(
+                    self.entries.items(), key=lambda item: item[1][0]
+                ):
+                    src.seek(offset)
+                    entries[content_id] = (dst.tell(), length)
+                    dst.write(src.read(length))
+                dst.flush()
+                os.fsync(dst.fileno())
+        metrics.inc("thumbnail_compactions_total")
+        self.pack_name = new_name
+        self.entries = entries
+        self.pack_bytes = sum(length for _offset, length in entries.values())
+        # Old packs still open in another process can't be deleted on Windows yet
+        for stale in self.directory.glob("*.pack"):
+            if stale.name != new_name:
+                try:
+                    stale.unlink()
+                except OSError:
+                    pass
+
+    def _remap(self):
+        self._unmap()
+        if self.pack_name is None:
+            return
+        self._map_file = open(self.directory / self.pack_name, "rb")
+        if os.fstat(self._map_file.fileno()).st_size == 0:
+            return
+        self._map = mmap.mmap(self._map_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _unmap(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._map_file is not None:
+            self._map_file.close()
+            self._map_file = None
+
+
+def _new_pack_name() -> str:
+    return f"thumbs-{uuid.uuid4().hex[:12]}.pack"
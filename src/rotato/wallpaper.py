@@ -1,39 +1,85 @@
 """Wallpaper management."""
 
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 
+from . import archives
+from .metrics import metrics
 from .monitors import MonitorInfo
 
 
 class WallpaperManager:
     """Manages setting wallpapers on different monitors"""
 
-    def __init__(self):
+    def __init__(self, setter=None):
+        self.setter = setter  # Created on first use and kept for the session
         self.current_wallpapers: Dict[str, str] = {}  # monitor_name -> image_path
 
-    def set_wallpaper(self, monitor: MonitorInfo, image_path: str):
+    def get_setter(self):
+        """The platform wallpaper setter, created once"""
+        if self.setter is None:
+            from .platform import get_platform_wallpaper_setter
+
+            self.setter = get_platform_wallpaper_setter()
+        return self.setter
+
+    def set_wallpaper(self, monitor: MonitorInfo, image_path: str) -> bool:
         """Set wallpaper for specific monitor - platform-specific implementation"""
-        from .platform import get_platform_wallpaper_setter
+        return bool(self.set_wallpapers([(monitor, image_path)]))
 
-        setter = get_platform_wallpaper_setter()
+    def set_wallpapers(self, assignments: Sequence[Tuple[MonitorInfo, str]]) -> List[str]:
+        """Set wallpapers for several monitors at once
 
-        try:
-            # Convert to absolute path
-            abs_path = str(Path(image_path).resolve())
+        Setters that can update every monitor in one call (``set_wallpapers``)
+        get the whole batch and report a result per monitor. A monitor whose
+        image can't be prepared is left out of the batch. Returns the names of
+        monitors that were updated.
+        """
+        if not assignments:
+            return []
+        # Desktops need a real file: archive members are extracted now
+        batch = []
+        for monitor, image_path in assignments:
+            try:
+                batch.append((monitor, _desktop_path(image_path)))
+            except Exception as e:
+                metrics.inc("wallpaper_set_failures_total")
+                print(f"Error preparing wallpaper {image_path}: {e}")
+        if not batch:
+            return []
 
+        try:
+            setter = self.get_setter()
             # Set wallpaper using platform-specific implementation
-            result = setter.set_wallpaper(monitor, abs_path)
+            with metrics.timer("wallpaper_set_seconds"):
+                if hasattr(setter, "set_wallpapers"):
+                    results = setter.set_wallpapers(batch)
+                else:
+                    results = [setter.set_wallpaper(monitor, path) for monitor, path in batch]
+        except Exception as e:
+            metrics.inc("wallpaper_set_failures_total", len(batch))
+            print(f"Error setting wallpaper: {e}")
+            return []
 
+        updated = []
+        for (monitor, abs_path), result in zip(batch, results):
             if result:
                 self.current_wallpapers[monitor.name] = abs_path
-                print(f"Set wallpaper for {monitor.name}: {Path(image_path).name}")
+                metrics.inc("wallpaper_set_total")
+                print(f"Set wallpaper for {monitor.name}: {Path(abs_path).name}")
+                updated.append(monitor.name)
             else:
-                print(f"Failed to set wallpaper: {image_path}")
-
-        except Exception as e:
-            print(f"Error setting wallpaper: {e}")
+                metrics.inc("wallpaper_set_failures_total")
+                print(f"Failed to set wallpaper: {abs_path}")
+        return updated
 
     def get_current_wallpaper(self, monitor_name: str) -> Optional[str]:
         """Get current wallpaper path for monitor"""
         return self.current_wallpapers.get(monitor_name)
+
+
+def _desktop_path(image_path: str) -> str:
+    """Absolute path of a file the desktop can read for ``image_path``"""
+    if archives.split_member(image_path):
+        return archives.materialize(image_path)
+    return str(Path(image_path).resolve())
@@ -0,0 +1,186 @@
+"""Tests for images inside zip and tar archives."""
+
+import io
+import tarfile
+import tempfile
+import zipfile
+from pathlib import Path
+
+from PIL import Image
+
+from rotato import archives
+from rotato.cache import ImageCache
+from rotato.images import ImageManager
+
+
+def _png(color, size=(40, 20)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def _make_zip(path: Path):
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("stored/a.png", _png((10, 10, 10)), compress_type=zipfile.ZIP_STORED)
+        zf.writestr("deflated/b.png", _png((200, 200, 200)), compress_type=zipfile.ZIP_DEFLATED)
+        zf.writestr("readme.txt", "not an image")
+
+
+def _make_tar_gz(path: Path, count: int = 4):
+    members = {f"m{i}.png": _png((i * 40, 0, 0)) for i in range(count)}
+    with tarfile.open(path, "w:gz") as tf:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    return members
+
+
+def test_discovery_lists_members_without_extracting():
+    """Test that archive sources yield virtual paths for image members only"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        archive = Path(tmpdir) / "pack.zip"
+        _make_zip(archive)
+        manager = ImageManager(ImageCache(str(Path(tmpdir) / "cache.json")), [".png"])
+
+        images = manager.discover_images([str(archive)])
+        assert sorted(images) == [
+            f"{archive}!/deflated/b.png",
+            f"{archive}!/stored/a.png",
+        ]
+        assert sorted(p.name for p in Path(tmpdir).iterdir()) == ["pack.zip"]
+
+
+def test_members_are_analyzed_and_keyed_by_crc():
+    """Test analysis of stored and compressed members, and reuse across archives"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        _make_zip(tmp / "pack.zip")
+        cache = ImageCache(str(tmp / "cache.json"))
+
+        stored = cache.get_image_info(f"{tmp / 'pack.zip'}!/stored/a.png")
+        deflated = cache.get_image_info(f"{tmp / 'pack.zip'}!/deflated/b.png")
+        assert (stored.width, stored.height) == (40, 20)
+        assert stored.brightness < 50 < 150 < deflated.brightness
+        assert stored.content_id.startswith("zip:")
+
+        # The same member in another archive reuses the analysis
+        with zipfile.ZipFile(tmp / "copy.zip", "w") as zf:
+            zf.writestr("a.png", _png((10, 10, 10)))
+        before = len(cache.content_index)
+        copy = cache.get_image_info(f"{tmp / 'copy.zip'}!/a.png")
+        assert copy.content_id == stored.content_id
+        assert len(cache.content_index) == before
+
+        # Entries for members that disappear are pruned
+        with zipfile.ZipFile(tmp / "pack.zip", "w") as zf:
+            zf.writestr("stored/a.png", _png((10, 10, 10)))
+        cache.prune()
+        assert sorted(Path(path).name for path in cache.cache) == ["a.png", "a.png"]
+
+
+def test_plain_tar_members_are_memory_mapped():
+    """Test that uncompressed tar members are read in place"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        archive = Path(tmpdir) / "pack.tar"
+        data = _png((50, 100, 150))
+        with tarfile.open(archive, "w") as tf:
+            info = tarfile.TarInfo("x/c.png")
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+
+        [path] = archives.list_members(str(archive), [".png"])
+        with archives.open_member(path) as f:
+            assert isinstance(f.raw, archives._MappedSlice)
+            assert f.read() == data
+            f.seek(-4, io.SEEK_END)
+            assert f.read() == data[-4:]
+        assert archives.member_content_id(path).startswith(f"tar:{len(data)}:")
+
+
+def test_compressed_tar_is_decompressed_once(monkeypatch):
+    """Test that members of a compressed tar are mapped from one decompressed copy"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        monkeypatch.setattr(tempfile, "tempdir", str(tmp / "temp"))
+        (tmp / "temp").mkdir()
+        archive = tmp / "pack.tar.gz"
+        members = _make_tar_gz(archive)
+
+        opened = []
+        real_open = archives._DECOMPRESSORS[".gz"]
+        monkeypatch.setitem(
+            archives._DECOMPRESSORS, ".gz", lambda *args: opened.append(args) or real_open(*args)
+        )
+        paths = archives.list_members(str(archive), [".png"])
+        ids = {archives.member_content_id(path) for path in paths}
+        for path in paths:
+            with archives.open_member(path) as f:
+                assert isinstance(f.raw, archives._MappedSlice)
+                assert f.read() == members[path.rsplit("!/", 1)[1]]
+
+        assert len(ids) == 4
+        assert len(opened) == 1
+        assert len(list((tmp / "temp" / "rotato-unpacked").iterdir())) == 1
+
+
+def test_compressed_tar_is_not_unpacked_to_set_a_wallpaper(monkeypatch):
+    """Test that a wallpaper is read straight out of a compressed tar"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        monkeypatch.setattr(tempfile, "tempdir", str(tmp / "temp"))
+        (tmp / "temp").mkdir()
+        members = _make_tar_gz(tmp / "pack.tar.gz")
+
+        target = archives.materialize(f"{tmp / 'pack.tar.gz'}!/m2.png", str(tmp / "out"))
+
+        assert Path(target).read_bytes() == members["m2.png"]
+        assert not list((tmp / "temp" / "rotato-unpacked").glob("*.tar"))
+
+
+def test_unpacked_tars_are_kept_within_budget(monkeypatch):
+    """Test that the least recently used decompressed copies are dropped first"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        monkeypatch.setattr(tempfile, "tempdir", str(tmp / "temp"))
+        (tmp / "temp").mkdir()
+        monkeypatch.setattr(archives, "UNPACKED_BUDGET_MB", 0)
+        for name in ("first", "second"):
+            _make_tar_gz(tmp / f"{name}.tar.gz")
+            with archives.open_member(f"{tmp / name}.tar.gz!/m0.png") as f:
+                assert isinstance(f.raw, archives._MappedSlice)
+
+        assert len(list((tmp / "temp" / "rotato-unpacked").iterdir())) == 1
+
+
+def test_archives_in_scanned_directories_are_discovered():
+    """Test that archives found while scanning a folder contribute their members"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        (tmp / "packs").mkdir()
+        _make_zip(tmp / "packs" / "pack.zip")
+        Image.new("RGB", (40, 20), "red").save(tmp / "loose.png")
+        manager = ImageManager(ImageCache(str(tmp / "cache.json")), [".png"])
+
+        expected = [
+            f"{tmp / 'loose.png'}",
+            f"{tmp / 'packs' / 'pack.zip'}!/deflated/b.png",
+            f"{tmp / 'packs' / 'pack.zip'}!/stored/a.png",
+        ]
+        assert sorted(manager.discover_images([str(tmp)])) == expected
+        flat = manager.discover_images([str(tmp / "packs")], recursive=False)
+        assert sorted(flat) == expected[1:]
+
+
+def test_materialize_extracts_only_chosen_member():
+    """Test that setting a wallpaper writes just that member to a temp file"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        _make_zip(tmp / "pack.zip")
+        target = archives.materialize(f"{tmp / 'pack.zip'}!/deflated/b.png", str(tmp / "out"))
+
+        assert Path(target).read_bytes() == _png((200, 200, 200))
+        assert archives.materialize(
+            f"{tmp / 'pack.zip'}!/deflated/b.png", str(tmp / "out")
+        ) == target
+        assert len(list((tmp / "out").iterdir())) == 1
@@ -0,0 +1,204 @@
+"""Tests for image caching."""
+
+import json
+import os
+import tempfile
+from dataclasses import asdict, replace
+from pathlib import Path
+
+from PIL import Image
+
+from rotato import cache as cache_module
+from rotato.cache import ImageCache
+
+
+def _make_image(path: Path, size=(64, 36), color=(120, 120, 120)):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", size, color).save(path)
+    return path
+
+
+def test_get_image_info_analyzes_image():
+    """Test that a new image is analyzed and cached"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        image = _make_image(Path(tmpdir) / "a.png")
+        cache = ImageCache(str(Path(tmpdir) / "cache.json"))
+
+        info = cache.get_image_info(str(image))
+
+        assert info is not None
+        assert (info.width, info.height) == (64, 36)
+        assert info.content_id is not None
+        assert str(image.resolve()) in cache.cache
+
+
+def test_low_priority_decodes_in_a_worker_process():
+    """Test that low priority applies to the decode worker, not the caller"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        image = _make_image(Path(tmpdir) / "a.png")
+        cache = ImageCache(str(Path(tmpdir) / "cache.json"))
+        cache.low_priority = True
+        niceness = os.nice(0) if hasattr(os, "nice") else None
+
+        info = cache.get_image_info(str(image))
+        assert cache._decoder is not None
+        cache.close()
+
+        assert info is not None and (info.width, info.height) == (64, 36)
+        assert cache._decoder is None
+        if niceness is not None:
+            assert os.nice(0) == niceness
+
+
+def test_moved_image_reuses_analysis(monkeypatch):
+    """Test that a moved file is matched by content identity instead of re-analyzed"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        image = _make_image(Path(tmpdir) / "old" / "a.png")
+        cache_file = str(Path(tmpdir) / "cache.json")
+        cache = ImageCache(cache_file)
+        original = cache.get_image_info(str(image))
+        cache.save_cache()
+
+        moved = Path(tmpdir) / "new" / "renamed.png"
+        moved.parent.mkdir()
+        image.rename(moved)
+
+        def fail_open(*args, **kwargs):
+            raise AssertionError("image should not be decoded again")
+
+        monkeypatch.setattr("rotato.cache.Image.open", fail_open)
+        reloaded = ImageCache(cache_file)
+        info = reloaded.get_image_info(str(moved))
+
+        assert info is not None
+        assert reloaded.cache[str(moved.resolve())] is info
+        assert info.brightness == original.brightness
+        assert info.content_id == original.content_id
+
+
+def test_prune_removes_missing_stale_and_excess_entries():
+    """Test that pruning drops vanished, stale and least recently seen entries"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = ImageCache(str(Path(tmpdir) / "cache.json"))
+        paths = [_make_image(Path(tmpdir) / f"{i}.png") for i in range(4)]
+        infos = [cache.get_image_info(str(p)) for p in paths]
+
+        paths[0].unlink()
+        infos[1].last_seen = 0.0  # not seen for a long time
+        infos[2].last_seen -= 10  # older than infos[3]
+
+        report = cache.prune(max_age_days=30, max_entries=1)
+
+        assert report.removed_missing == 1
+        assert report.removed_stale == 1
+        assert report.removed_evicted == 1
+        assert report.bytes_reclaimed > 0
+        assert list(cache.cache) == [str(paths[3].resolve())]
+        assert list(cache.content_index.values()) == [str(paths[3].resolve())]
+
+
+def test_prune_keeps_entries_on_unreachable_paths():
+    """Test that images on an unmounted share aren't pruned as missing"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        share = Path(tmpdir) / "share"
+        cache = ImageCache(str(Path(tmpdir) / "cache.json"))
+        paths = [_make_image(share / "photos" / f"{i}.png") for i in range(3)]
+        for path in paths:
+            cache.get_image_info(str(path))
+
+        share.rename(Path(tmpdir) / "unmounted")
+        report = cache.prune()
+
+        assert report.removed_missing == 0
+        assert report.unreachable == 3
+        assert len(cache.cache) == 3
+
+
+def test_save_and_load_roundtrip():
+    """Test that the cache survives a save/load cycle"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache_file = str(Path(tmpdir) / "cache.json")
+        cache = ImageCache(cache_file)
+        image = _make_image(Path(tmpdir) / "a.png")
+        info = cache.get_image_info(str(image))
+        cache.prune()
+        cache.save_cache()
+
+        reloaded = ImageCache(cache_file)
+
+        assert reloaded.cache[str(image.resolve())] == info
+        assert reloaded.last_prune == cache.last_prune
+
+
+def test_concurrent_saves_merge_entries():
+    """Test that two cache instances sharing a file keep each other's entries"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache_file = str(Path(tmpdir) / "cache.json")
+        first = ImageCache(cache_file)
+        second = ImageCache(cache_file)
+
+        a = _make_image(Path(tmpdir) / "a.png")
+        b = _make_image(Path(tmpdir) / "b.png", color=(9, 9, 9))
+        first.get_image_info(str(a))
+        second.get_image_info(str(b))
+        first.save_cache()
+        second.save_cache()
+
+        merged = ImageCache(cache_file)
+
+        expected = {str(a.resolve()), str(b.resolve())}
+        assert set(merged.cache) == expected
+        assert set(second.cache) == expected
+        assert not list(Path(tmpdir).glob("*.tmp"))
+
+
+def test_analyze_many_reports_each_outcome():
+    """Test batch analysis of new, cached, duplicate and missing images"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = ImageCache(str(Path(tmpdir) / "cache.json"))
+        cached = _make_image(Path(tmpdir) / "cached.png")
+        cache.get_image_info(str(cached))
+        new = [_make_image(Path(tmpdir) / f"new{i}.png", color=(i, 0, 0)) for i in range(3)]
+        copy = Path(tmpdir) / "copy.png"
+        copy.write_bytes(new[0].read_bytes())
+        os.utime(copy, (new[0].stat().st_atime, new[0].stat().st_mtime))
+
+        paths = [str(cached), *map(str, new), str(copy), str(Path(tmpdir) / "gone.png")]
+        report = cache.analyze_many(paths, workers=2)
+
+        assert (report.cached, report.analyzed, report.moved, report.failed) == (1, 3, 1, 1)
+        assert len(cache.cache) == 5
+
+
+def test_entries_store_their_path_once():
+    """Test that entries are slotted and don't repeat the path they're keyed by"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache_file = Path(tmpdir) / "cache.json"
+        cache = ImageCache(str(cache_file))
+        image = _make_image(Path(tmpdir) / "a.png")
+        info = cache.get_image_info(str(image))
+        cache.save_cache()
+
+        assert not hasattr(info, "__dict__")
+        data = json.loads(cache_file.read_text(encoding="utf-8"))
+        assert "path" not in data["entries"][str(image.resolve())]
+
+        # Caches written before still load
+        data["entries"][str(image.resolve())]["path"] = str(image.resolve())
+        cache_file.write_text(json.dumps(data), encoding="utf-8")
+        assert ImageCache(str(cache_file)).cache[str(image.resolve())] == info
+
+
+def test_slots_fallback_for_python_39(monkeypatch):
+    """Test the __slots__ helper used where dataclass(slots=True) is missing"""
+    monkeypatch.setattr(cache_module.sys, "version_info", (3, 9, 0))
+
+    @cache_module._slotted
+    class Point:
+        x: int
+        y: int = 2
+
+    point = Point(1)
+    assert (point.x, point.y) == (1, 2) and not hasattr(point, "__dict__")
+    assert replace(point, y=3) == Point(1, 3)
+    assert asdict(point) == {"x": 1, "y": 2}
@@ -0,0 +1,23 @@
+"""Tests for the interned image catalog."""
+
+from rotato.catalog import ImageCatalog, split_path
+
+
+def test_split_path_roundtrip():
+    """Test that split parts join back to the original path"""
+    for path in ["/a/b/c.jpg", "C:\\Pictures\\x.png", "relative.jpg", "C:/mixed\\y.webp"]:
+        directory, name = split_path(path)
+        assert directory + name == path
+
+
+def test_catalog_interns_paths():
+    """Test that the same path always maps to the same id and directories are shared"""
+    catalog = ImageCatalog()
+    pool_a = catalog.intern_many(["/p/1.jpg", "/p/2.jpg", "/q/3.jpg"])
+    pool_b = catalog.intern_many(["/q/3.jpg", "/p/1.jpg"])
+
+    assert list(pool_b) == [pool_a[2], pool_a[0]]
+    assert len(catalog) == 3
+    assert catalog.path(pool_a[1]) == "/p/2.jpg"
+    assert catalog.find("/q/3.jpg") == pool_a[2]
+    assert catalog.find("/q/missing.jpg") == -1
@@ -1,11 +1,21 @@
 """Tests for configuration management."""
 
+import copy
 import tempfile
+import threading
+import time
 from pathlib import Path
 
 import pytest
 
-from rotato.config import ConfigManager, FilterConfig, MonitorConfig
+from rotato.config import (
+    ConfigError,
+    ConfigManager,
+    ConfigWatcher,
+    FilterConfig,
+    MonitorConfig,
+    diff_configs,
+)
 
 
 def test_filter_config_defaults():
@@ -61,3 +71,114 @@ def test_config_manager_load_save():
 
         assert loaded_config["global"]["rotation_interval_minutes"] == 20
         assert loaded_config["monitors"][0]["monitor_name"] == "test"
+
+
+def test_diff_configs_minimal_work():
+    """Test that config diffs only flag what actually changed"""
+    base = {
+        "global": {"supported_formats": [".jpg"], "hotkeys": {"trigger_rotation": "a"}},
+        "monitors": [
+            {"monitor_name": "auto", "image_sources": ["/a"], "rotation_interval_minutes": 10},
+            {"monitor_name": "M2", "image_sources": ["/b"], "filters": {"min_width": 100}},
+        ],
+    }
+    monitors = ["M1", "M2"]
+
+    assert diff_configs(base, copy.deepcopy(base), monitors).unchanged
+
+    changed = copy.deepcopy(base)
+    changed["global"]["hotkeys"] = {"trigger_rotation": "b"}
+    changed["monitors"][0]["rotation_interval_minutes"] = 5
+    changed["monitors"][1]["image_sources"] = ["/b", "/c"]
+    diff = diff_configs(base, changed, monitors)
+
+    assert diff.hotkeys_changed
+    assert not diff.full_rescan
+    assert diff.rescan_sources == {("/c", True)}
+    assert diff.refilter_monitors == {"M2"}
+    assert diff.reschedule_monitors == {"M1"}
+
+    rescan = copy.deepcopy(base)
+    rescan["global"]["supported_formats"] = [".jpg", ".png"]
+    diff = diff_configs(base, rescan, monitors)
+
+    assert diff.full_rescan
+    assert diff.refilter_monitors == {"M1", "M2"}
+
+
+def test_config_manager_keeps_last_good_config():
+    """Test that a broken config file does not replace a working one"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        config_path = Path(tmpdir) / "test_config.yaml"
+        manager = ConfigManager(str(config_path))
+        good = {"global": {"rotation_interval_minutes": 20}, "monitors": []}
+        manager.save_config(good)
+        assert manager.load_config() == good
+
+        config_path.write_text("global: [unclosed\n", encoding="utf-8")
+        assert manager.load_config() == good
+
+        config_path.write_text("just a string\n", encoding="utf-8")
+        assert manager.load_config() == good
+
+        # Misspelled keys are caught before the config is accepted
+        typo = {
+            "global": {"rotation_interval_minutes": 20},
+            "monitors": [
+                {"monitor_name": "auto", "image_sources": [], "rotation_intervl_minutes": 5}
+            ],
+        }
+        manager.save_config(typo)
+        assert manager.load_config() == good
+        filter_typo = {"monitor_name": "auto", "image_sources": [], "filters": {"min_wdth": 1}}
+        manager.save_config({"global": {}, "monitors": [filter_typo]})
+        assert manager.load_config() == good
+        assert manager.last_good_config == good
+
+
+def test_unknown_global_keys_warn(capsys):
+    """Test that an unknown global key is reported but doesn't reject the file"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        manager = ConfigManager(str(Path(tmpdir) / "test_config.yaml"))
+        typo = {"global": {"rotation_intervl_minutes": 20}, "monitors": []}
+        manager.save_config(typo)
+
+        assert manager.load_config() == typo
+        assert "unknown key 'rotation_intervl_minutes'" in capsys.readouterr().out
+
+
+def test_broken_config_fails_first_load():
+    """Test that a broken file at startup is an error, not a switch to the defaults"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        config_path = Path(tmpdir) / "test_config.yaml"
+        config_path.write_text("global: [unclosed\n", encoding="utf-8")
+
+        with pytest.raises(ConfigError):
+            ConfigManager(str(config_path)).load_config()
+
+
+def test_config_watcher_debounces_changes():
+    """Test that several quick saves trigger a single callback"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        config_path = Path(tmpdir) / "test_config.yaml"
+        config_path.write_text("a: 1\n", encoding="utf-8")
+        changes = threading.Event()
+        calls = []
+
+        def on_change():
+            calls.append(config_path.read_text(encoding="utf-8"))
+            changes.set()
+
+        watcher = ConfigWatcher(config_path, on_change, poll_interval=0.05, debounce=0.5)
+        watcher.start()
+        try:
+            for i in range(3):
+                time.sleep(0.03)
+                config_path.write_text(f"a: {i + 10}\n" * (i + 2), encoding="utf-8")
+            assert changes.wait(5)
+            time.sleep(0.8)
+        finally:
+            watcher.stop()
+
+        assert len(calls) == 1
+        assert calls[0].startswith("a: 12")
@@ -0,0 +1,288 @@
+"""Tests for the main application logic."""
+
+import tempfile
+import threading
+from pathlib import Path
+
+import yaml
+from PIL import Image
+
+from rotato.core import DesktopBackgroundManager
+from rotato.monitors import MonitorInfo, MonitorManager
+
+MONITOR = MonitorInfo(handle=1, width=64, height=36, x=0, y=0, is_primary=True, name="DISPLAY1")
+
+
+class StaticDetector:
+    def detect_monitors(self):
+        return [MONITOR]
+
+
+def _write_config(path: Path, sources, **global_overrides):
+    config = {
+        "global": {
+            "rotation_interval_minutes": 10,
+            "cache_file": str(path.parent / "cache.json"),
+            "stats_file": None,
+            "selection_state_file": str(path.parent / "selection_state.json"),
+            "history_file": str(path.parent / "history.jsonl"),
+            "max_recursion_depth": 10,
+            "supported_formats": [".png"],
+            "hotkeys": {},
+            **global_overrides,
+        },
+        "monitors": [{"monitor_name": "auto", "image_sources": [str(s) for s in sources]}],
+    }
+    path.write_text(yaml.dump(config), encoding="utf-8")
+
+
+def _make_images(directory: Path, count: int):
+    directory.mkdir(parents=True, exist_ok=True)
+    for i in range(count):
+        Image.new("RGB", (64, 36), (i, i, i)).save(directory / f"{i}.png")
+
+
+def _make_app(config_path: Path) -> DesktopBackgroundManager:
+    return DesktopBackgroundManager(
+        str(config_path), monitor_manager=MonitorManager(StaticDetector())
+    )
+
+
+def test_reload_swaps_in_new_catalog():
+    """Test that a background reload publishes a complete new snapshot"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        _make_images(tmp / "a", 2)
+        _make_images(tmp / "b", 3)
+        config_path = tmp / "config.yaml"
+        _write_config(config_path, [tmp / "a"])
+
+        app = _make_app(config_path)
+        app.discover_and_filter_images()
+        old_snapshot = app.snapshot
+        assert len(old_snapshot.pool("DISPLAY1")) == 2
+
+        _write_config(config_path, [tmp / "a", tmp / "b"])
+        app.reload_config()
+        app._reload_thread.join(timeout=30)
+
+        assert len(app.snapshot.pool("DISPLAY1")) == 5
+        # The previous snapshot is untouched for readers still holding it
+        assert len(old_snapshot.pool("DISPLAY1")) == 2
+
+
+def test_reload_only_rescans_changed_sources(monkeypatch):
+    """Test that adding a source leaves existing sources alone"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        _make_images(tmp / "a", 2)
+        _make_images(tmp / "b", 3)
+        config_path = tmp / "config.yaml"
+        _write_config(config_path, [tmp / "a"])
+
+        app = _make_app(config_path)
+        app.discover_and_filter_images()
+
+        scanned = []
+        discover = app.image_manager.discover_images
+        monkeypatch.setattr(
+            app.image_manager,
+            "discover_images",
+            lambda sources, recursive=True: scanned.extend(sources) or discover(sources, recursive),
+        )
+        _write_config(config_path, [tmp / "a", tmp / "b"])
+        app._apply_config(app.config_manager.load_config())
+
+        assert scanned == [str(tmp / "b")]
+        assert len(app.snapshot.pool("DISPLAY1")) == 5
+
+
+def test_manual_reload_picks_up_new_images():
+    """Test that reloading an unchanged config still rescans the sources"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        _make_images(tmp / "a", 1)
+        config_path = tmp / "config.yaml"
+        _write_config(config_path, [tmp / "a"])
+
+        app = _make_app(config_path)
+        app.discover_and_filter_images()
+        Image.new("RGB", (64, 36), "white").save(tmp / "a" / "new.png")
+
+        # The config watcher only redoes what the config change requires
+        app._apply_config(app.config_manager.load_config())
+        assert len(app.snapshot.pool("DISPLAY1")) == 1
+
+        app.reload_config()
+        app._reload_thread.join(timeout=30)
+        assert len(app.snapshot.pool("DISPLAY1")) == 2
+
+
+def test_manual_reload_keeps_unreachable_sources():
+    """Test that rescanning while a share is offline keeps its images"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        _make_images(tmp / "share", 3)
+        _make_images(tmp / "local", 2)
+        config_path = tmp / "config.yaml"
+        _write_config(config_path, [tmp / "share", tmp / "local"])
+
+        app = _make_app(config_path)
+        app.discover_and_filter_images()
+        assert len(app.snapshot.pool("DISPLAY1")) == 5
+
+        (tmp / "share").rename(tmp / "away")
+        Image.new("RGB", (64, 36), "white").save(tmp / "local" / "new.png")
+        app._apply_config(app.config_manager.load_config(), rescan=True)
+
+        pool = app.snapshot.catalog.paths(app.snapshot.pool("DISPLAY1"))
+        assert len(pool) == 6
+        assert sum(Path(path).parent == tmp / "share" for path in pool) == 3
+
+
+def test_published_catalog_is_never_modified():
+    """Test that an incremental reload builds a new catalog of only current sources"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        _make_images(tmp / "a", 2)
+        _make_images(tmp / "b", 3)
+        _make_images(tmp / "c", 4)
+        config_path = tmp / "config.yaml"
+        _write_config(config_path, [tmp / "a", tmp / "b"])
+
+        app = _make_app(config_path)
+        app.discover_and_filter_images()
+        old_snapshot = app.snapshot
+        old_paths = old_snapshot.catalog.paths(old_snapshot.pool("DISPLAY1"))
+
+        _write_config(config_path, [tmp / "a", tmp / "c"])
+        app._apply_config(app.config_manager.load_config())
+
+        assert len(old_snapshot.catalog) == 5
+        assert old_snapshot.catalog.paths(old_snapshot.pool("DISPLAY1")) == old_paths
+        # Images of the dropped source don't linger in the new catalog
+        assert len(app.snapshot.catalog) == 6
+        assert len(app.snapshot.pool("DISPLAY1")) == 6
+
+
+def test_hotplug_refilters_only_changed_monitors(monkeypatch):
+    """Test that a new monitor gets a pool without rediscovering any source"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        _make_images(tmp / "a", 3)
+        config_path = tmp / "config.yaml"
+        _write_config(config_path, [tmp / "a"])
+
+        detector = StaticDetector()
+        app = DesktopBackgroundManager(
+            str(config_path), monitor_manager=MonitorManager(detector)
+        )
+        app.discover_and_filter_images()
+        first_pool = app.snapshot.pool("DISPLAY1")
+
+        scanned = []
+        filtered = []
+        discover = app.image_manager.discover_images
+        filter_images = app.image_manager.filter_images
+        monkeypatch.setattr(
+            app.image_manager,
+            "discover_images",
+            lambda sources, recursive=True: scanned.extend(sources) or discover(sources, recursive),
+        )
+        monkeypatch.setattr(
+            app.image_manager,
+            "filter_images",
+            lambda paths, filters, monitor: filtered.append(monitor.name)
+            or filter_images(paths, filters, monitor),
+        )
+        second = MonitorInfo(handle=2, width=64, height=36, x=64, y=0, is_primary=False, name="DISPLAY2")
+        monkeypatch.setattr(detector, "detect_monitors", lambda: [MONITOR, second])
+
+        changes = app.monitor_manager.refresh()
+        assert changes.added == {"DISPLAY2"} and not changes.resized
+        app.on_monitors_changed(changes)
+        app._reload_thread.join(timeout=30)
+
+        assert scanned == [] and filtered == ["DISPLAY2"]
+        assert app.snapshot.pool("DISPLAY1") is first_pool
+        assert len(app.snapshot.pool("DISPLAY2")) == 3
+
+
+def test_rotation_sets_all_monitors_in_one_batch(monkeypatch):
+    """Test the rotation pipeline end to end on the fake platform backend"""
+    monkeypatch.setenv("ROTATO_PLATFORM", "fake")
+    monkeypatch.setenv("ROTATO_FAKE_MONITORS", "64x36,64x36")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        _make_images(tmp / "a", 4)
+        config_path = tmp / "config.yaml"
+        _write_config(config_path, [tmp / "a"])
+
+        app = DesktopBackgroundManager(str(config_path))
+        app.discover_and_filter_images()
+        app.start_rotation()
+        try:
+            app.trigger_rotation()
+        finally:
+            app.stop_rotation()
+
+        setter = app.wallpaper_manager.setter
+        assert setter.batches == 2
+        assert set(setter.current) == {"FAKE1", "FAKE2"}
+        assert app.history.current("FAKE1") is not None
+
+
+def test_concurrent_scheduling_leaves_one_timer_per_monitor():
+    """Test that timers rescheduled from several threads are never orphaned"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        config_path = tmp / "config.yaml"
+        _write_config(config_path, [tmp / "a"])
+        timers = []
+
+        def timer_factory(interval, function):
+            timers.append(threading.Timer(3600, function))
+            return timers[-1]
+
+        app = DesktopBackgroundManager(
+            str(config_path),
+            monitor_manager=MonitorManager(StaticDetector()),
+            timer_factory=timer_factory,
+        )
+        app.is_running = True
+        threads = [
+            threading.Thread(
+                target=lambda: [app.schedule_next_rotation("DISPLAY1") for _ in range(50)]
+            )
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sum(not timer.finished.is_set() for timer in timers) == 1
+        app.stop_rotation()
+        assert all(timer.finished.is_set() for timer in timers)
+
+
+def test_rotation_uses_local_mirror(monkeypatch):
+    """Test that wallpapers are set from mirrored copies once they are prefetched"""
+    monkeypatch.setenv("ROTATO_PLATFORM", "fake")
+    monkeypatch.setenv("ROTATO_FAKE_MONITORS", "64x36")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        _make_images(tmp / "a", 3)
+        config_path = tmp / "config.yaml"
+        _write_config(config_path, [tmp / "a"], local_mirror={"directory": str(tmp / "mirror")})
+
+        app = DesktopBackgroundManager(str(config_path))
+        app.discover_and_filter_images()
+        assert app.mirror.wait_idle(10)
+        app.start_rotation()
+        app.stop_rotation()
+
+        [shown] = app.wallpaper_manager.setter.current.values()
+        assert Path(shown).parent == tmp / "mirror"
+        assert app.history.current("FAKE1").startswith(str(tmp / "a"))
+        app.mirror.stop()
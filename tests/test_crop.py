@@ -0,0 +1,91 @@
+"""Tests for orientation handling, focal points and smart cropping."""
+
+import tempfile
+from dataclasses import replace
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+from rotato.cache import ANALYSIS_VERSION, ImageCache, ImageInfo
+from rotato.crop import crop_box, render_crop
+from rotato.monitors import MonitorInfo
+
+
+def _info(width, height, focal_x=0.5, focal_y=0.5) -> ImageInfo:
+    return ImageInfo(
+        width, height, width / height, 128.0, 1000, 0.0,
+        focal_x=focal_x, focal_y=focal_y,
+    )
+
+
+def _detail_on_right(path: Path):
+    """Flat gray image with a busy checkerboard near the right edge"""
+    img = Image.new("RGB", (400, 200), (120, 120, 120))
+    draw = ImageDraw.Draw(img)
+    for x in range(300, 380, 8):
+        for y in range(60, 140, 8):
+            if (x + y) // 8 % 2:
+                draw.rectangle([x, y, x + 7, y + 7], fill=(255, 255, 255))
+    img.save(path)
+
+
+def test_crop_box_centers_on_focal_point_and_stays_inside():
+    """Test the crop box for wide and tall targets"""
+    assert crop_box(_info(4000, 2000, focal_x=0.75), 1000, 1000) == (2000, 0, 4000, 2000)
+    assert crop_box(_info(4000, 2000, focal_x=0.5), 1000, 1000) == (1000, 0, 3000, 2000)
+    assert crop_box(_info(4000, 2000, focal_x=0.1), 1000, 1000) == (0, 0, 2000, 2000)
+    assert crop_box(_info(1000, 2000, focal_y=0.0), 2000, 1000) == (0, 0, 1000, 500)
+    assert crop_box(_info(1920, 1080), 1920, 1080) == (0, 0, 1920, 1080)
+
+
+def test_focal_point_follows_detail():
+    """Test that the focal point lands on the busy part of the image"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "detail.png"
+        _detail_on_right(path)
+        info = ImageCache(str(Path(tmpdir) / "cache.json")).get_image_info(str(path))
+
+    assert 0.7 < info.focal_x < 0.95
+    assert 0.35 < info.focal_y < 0.65
+    assert info.analysis_version == ANALYSIS_VERSION
+
+
+def test_exif_orientation_gives_display_size():
+    """Test that a rotated phone photo is stored as portrait"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "phone.jpg"
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Rotate 90° clockwise to display
+        Image.new("RGB", (400, 300), (90, 90, 90)).save(path, exif=exif)
+
+        info = ImageCache(str(Path(tmpdir) / "cache.json")).get_image_info(str(path))
+    assert (info.width, info.height) == (300, 400)
+    assert info.aspect_ratio < 1
+
+
+def test_entries_from_older_analysis_are_refreshed():
+    """Test that cache entries without a focal point are analyzed again"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "detail.png"
+        _detail_on_right(path)
+        cache = ImageCache(str(Path(tmpdir) / "cache.json"))
+        info = cache.get_image_info(str(path))
+        cache.cache[str(path.resolve())] = replace(info, focal_x=0.5, analysis_version=0)
+
+        refreshed = cache.get_image_info(str(path))
+    assert refreshed.analysis_version == ANALYSIS_VERSION
+    assert refreshed.focal_x > 0.7
+
+
+def test_render_crop_fills_monitor():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "detail.png"
+        _detail_on_right(path)
+        info = ImageCache(str(Path(tmpdir) / "cache.json")).get_image_info(str(path))
+        monitor = MonitorInfo(0, 100, 100, 0, 0, True, "M")
+
+        rendered = render_crop(str(path), info, monitor, str(Path(tmpdir) / "out"))
+        with Image.open(rendered) as img:
+            assert img.size == (100, 100)
+            # The crop kept the busy right-hand side
+            assert max(img.convert("L").getextrema()) > 200
@@ -0,0 +1,209 @@
+"""Tests for budgeted decoding and the decode quarantine."""
+
+import os
+import pickle
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from PIL import Image, ImageStat
+
+from rotato import cache as cache_module
+from rotato.cache import ImageCache
+from rotato.decode import (
+    CORRUPT,
+    TIMEOUT,
+    TOO_LARGE,
+    DecodePolicy,
+    DecodePool,
+    DecodeRejected,
+    call_with_timeout,
+    decode_for_analysis,
+)
+
+
+def _gradient(width: int, height: int) -> Image.Image:
+    """RGB image whose brightness varies from top to bottom"""
+    img = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    img.paste((200, 40, 40), (0, 0, width // 4, height // 4))
+    return img
+
+
+def _brightness(img: Image.Image) -> float:
+    return sum(ImageStat.Stat(img.convert("RGB")).mean) / 3
+
+
+@pytest.mark.parametrize("suffix", [".bmp", ".tif", ".ppm"])
+def test_uncompressed_images_over_budget_are_read_in_strips(suffix):
+    """Test that strip statistics match a full decode"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / f"big{suffix}"
+        source = _gradient(640, 480)
+        source.save(path)
+        tight = DecodePolicy(max_memory_mb=0.2)
+
+        with Image.open(path) as img:
+            brightness, proxy = decode_for_analysis(img, tight, 64)
+
+    assert brightness == pytest.approx(_brightness(source), abs=0.5)
+    assert proxy.size == (214, 160)
+    # Strips are placed the right way up, also for bottom-up BMPs
+    assert _brightness(proxy.crop((0, 0, 214, 20))) < _brightness(proxy.crop((0, 140, 214, 160)))
+
+
+def test_jpeg_is_drafted_within_budget():
+    """Test that a JPEG too big to decode at full size is decoded scaled down"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "big.jpg"
+        source = _gradient(2048, 1536)
+        source.save(path, quality=95)
+        # Full size would need ~25 MB
+        policy = DecodePolicy(max_memory_mb=4)
+
+        with Image.open(path) as img:
+            brightness, proxy = decode_for_analysis(img, policy, 64)
+
+    assert brightness == pytest.approx(_brightness(source), abs=2)
+    assert min(proxy.size) >= 128
+
+
+def test_compressed_images_over_budget_are_rejected():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "big.png"
+        _gradient(640, 480).save(path)
+
+        with Image.open(path) as img, pytest.raises(DecodeRejected) as rejected:
+            decode_for_analysis(img, DecodePolicy(max_memory_mb=0.2), 64)
+        assert rejected.value.reason == TOO_LARGE
+
+        with Image.open(path) as img, pytest.raises(DecodeRejected) as rejected:
+            decode_for_analysis(img, DecodePolicy(max_pixels=1000), 64)
+        assert rejected.value.reason == TOO_LARGE
+
+
+def test_sixteen_bit_images_are_scaled_not_clipped():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "deep.png"
+        Image.new("I;16", (64, 64), 32768).save(path)
+
+        with Image.open(path) as img:
+            brightness, _proxy = decode_for_analysis(img, DecodePolicy(), 64)
+
+    assert brightness == pytest.approx(127.5, abs=1)
+
+
+def test_only_the_first_frame_is_analyzed():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "anim.gif"
+        frames = [Image.new("RGB", (32, 32), color) for color in ("black", "white", "white")]
+        frames[0].save(path, save_all=True, append_images=frames[1:])
+
+        with Image.open(path) as img:
+            brightness, _proxy = decode_for_analysis(img, DecodePolicy(), 64)
+
+    assert brightness < 1
+
+
+def test_call_with_timeout_interrupts_main_thread_and_abandons_workers():
+    with pytest.raises(DecodeRejected) as rejected:
+        call_with_timeout(time.sleep, (5,), 0.05)
+    assert rejected.value.reason == TIMEOUT
+    assert call_with_timeout(sum, ([1, 2],), 1) == 3
+
+    outcome = {}
+
+    def in_thread():
+        start = time.monotonic()
+        try:
+            call_with_timeout(time.sleep, (5,), 0.05)
+        except DecodeRejected as e:
+            outcome["reason"] = e.reason
+        outcome["elapsed"] = time.monotonic() - start
+
+    thread = threading.Thread(target=in_thread)
+    thread.start()
+    thread.join()
+    assert outcome["reason"] == TIMEOUT
+    assert outcome["elapsed"] < 1
+
+
+def test_decode_pool_kills_jobs_that_overrun():
+    """Test that a job stuck in one uninterruptible call is killed, not abandoned"""
+    start = time.monotonic()
+    with DecodePool(workers=2, kill_after=0.5) as pool:
+        stuck = pool.submit(time.sleep, 30)
+        quick = pool.submit(sum, [1, 2])
+        with pytest.raises(DecodeRejected) as rejected:
+            stuck.result()
+        assert rejected.value.reason == TIMEOUT
+        assert quick.result() == 3
+        # The killed worker is replaced
+        assert [pool.submit(sum, [i, 1]).result() for i in range(3)] == [1, 2, 3]
+    assert time.monotonic() - start < 15
+
+    copy = pickle.loads(pickle.dumps(DecodeRejected(CORRUPT, "bad header")))
+    assert (copy.reason, str(copy)) == (CORRUPT, "bad header")
+
+
+def test_isolated_decodes_run_in_a_worker_process():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "a.png"
+        Image.new("RGB", (40, 30), "white").save(path)
+        cache = ImageCache(str(Path(tmpdir) / "cache.json"))
+        cache.isolate_decodes = True
+
+        info = cache.get_image_info(str(path))
+        assert cache._decoder is not None
+        cache.close()
+        assert info is not None and (info.width, info.height, info.brightness) == (40, 30, 255)
+
+
+def test_rejected_images_are_quarantined_until_they_change(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        broken = Path(tmpdir) / "broken.jpg"
+        broken.write_bytes(b"not an image")
+        cache_file = str(Path(tmpdir) / "cache.json")
+        cache = ImageCache(cache_file)
+
+        assert cache.get_image_info(str(broken)) is None
+        entry = cache.quarantine[str(broken.resolve())]
+        assert entry["reason"] == CORRUPT
+        cache.save_cache()
+
+        # Quarantined images are not decoded again, even by another process
+        decodes = []
+        real_analyze = cache_module.analyze_image
+        monkeypatch.setattr(
+            cache_module,
+            "analyze_image",
+            lambda *args: decodes.append(args[0]) or real_analyze(*args),
+        )
+        reloaded = ImageCache(cache_file)
+        assert reloaded.get_image_info(str(broken)) is None
+        report = reloaded.analyze_many([str(broken)], workers=1)
+        assert report.quarantined == 1
+        assert decodes == []
+
+        # A changed file gets another chance
+        Image.new("RGB", (40, 30), "white").save(broken, format="JPEG")
+        os.utime(broken, (1_000_000, 1_000_000))
+        info = reloaded.get_image_info(str(broken))
+        assert info is not None and info.width == 40
+        assert reloaded.quarantine == {}
+        reloaded.save_cache()
+        assert ImageCache(cache_file).quarantine == {}
+
+
+def test_timeouts_are_quarantined(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "slow.png"
+        Image.new("RGB", (16, 16)).save(path)
+        cache = ImageCache(str(Path(tmpdir) / "cache.json"))
+        cache.decode_policy = DecodePolicy(timeout_seconds=0.05)
+        monkeypatch.setattr(cache_module, "analyze_image", lambda *args: time.sleep(5))
+
+        assert cache.get_image_info(str(path)) is None
+        assert cache.quarantine[str(path.resolve())]["reason"] == TIMEOUT
+        assert cache.release_quarantine() == 1
@@ -0,0 +1,57 @@
+"""Tests for the rotation history store."""
+
+import tempfile
+from pathlib import Path
+
+from rotato.history import RotationHistory
+
+
+def test_queries():
+    """Test last-N, since and never-shown queries across monitors"""
+    history = RotationHistory()
+    for step in range(10):
+        history.record("A" if step % 2 else "B", f"/w/{step}.jpg", 100.0 + step)
+
+    assert [entry.path for entry in history.last_n(3)] == ["/w/9.jpg", "/w/8.jpg", "/w/7.jpg"]
+    assert [entry.path for entry in history.last_n(2, "B")] == ["/w/8.jpg", "/w/6.jpg"]
+    assert [entry.timestamp for entry in history.since(107.0)] == [107.0, 108.0, 109.0]
+    assert [entry.path for entry in history.since(106.5, "A")] == ["/w/7.jpg", "/w/9.jpg"]
+    assert history.never_shown(["/w/1.jpg", "/w/new.jpg"]) == ["/w/new.jpg"]
+    assert history.never_shown(["/w/1.jpg", "/w/2.jpg"], "A") == ["/w/2.jpg"]
+    assert history.current("A") == "/w/9.jpg"
+    assert history.latest().monitor == "A"
+
+
+def test_persists_and_skips_torn_lines():
+    """Test that history survives a restart even if the last write was cut short"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        history_file = Path(tmpdir) / "history.jsonl"
+        history = RotationHistory(history_file)
+        history.record("A", "/w/1.jpg", 1.0)
+        history.record("A", "/w/2.jpg", 2.0)
+        with open(history_file, "a") as f:
+            f.write('{"t": 3.0, "m": "A", "p": "/w/')
+
+        restored = RotationHistory(history_file)
+        restored.load()
+        assert restored.current("A") == "/w/2.jpg"
+        assert restored.last_shown_times("A") == {"/w/1.jpg": 1.0, "/w/2.jpg": 2.0}
+
+
+def test_compaction_bounds_file():
+    """Test that old entries are dropped from memory and disk"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        history_file = Path(tmpdir) / "history.jsonl"
+        history = RotationHistory(history_file, max_entries_per_monitor=10)
+        for step in range(100):
+            history.record("A", f"/w/{step}.jpg", float(step))
+
+        lines = history_file.read_text().splitlines()
+        assert len(lines) <= 15
+        assert len(history) <= 15
+
+        restored = RotationHistory(history_file, max_entries_per_monitor=10)
+        restored.load()
+        assert len(restored) == 10
+        assert restored.last_n(1)[0].path == "/w/99.jpg"
+        assert restored.never_shown(["/w/0.jpg"]) == ["/w/0.jpg"]
@@ -0,0 +1,188 @@
+"""Tests for the control socket and the commands the app serves on it."""
+
+import base64
+import io
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+import yaml
+from PIL import Image
+
+from rotato.core import DesktopBackgroundManager
+from rotato.ipc import ControlError, ControlServer, send_command
+from rotato.monitors import MonitorManager
+from rotato.platform.fake import FakeMonitorDetector, FakeWallpaperSetter, parse_monitor_spec
+from rotato.simulate import VirtualClock
+from rotato.wallpaper import WallpaperManager
+
+
+@pytest.fixture
+def control_dir():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        yield Path(tmpdir)
+
+
+def _server(directory: Path, handlers) -> ControlServer:
+    return ControlServer(
+        handlers, address=str(directory / "run" / "control.sock"), authkey_file=directory / "key"
+    )
+
+
+def _send(directory: Path, command: str, **args):
+    return send_command(
+        command, address=str(directory / "run" / "control.sock"), authkey_file=directory / "key",
+        **args,
+    )
+
+
+def test_commands_round_trip(control_dir):
+    def fail():
+        raise ValueError("no images")
+
+    server = _server(control_dir, {"echo": lambda **args: args, "fail": fail})
+    assert server.start()
+    try:
+        assert _send(control_dir, "echo", path="/w/a.jpg", monitor="M1") == {
+            "path": "/w/a.jpg",
+            "monitor": "M1",
+        }
+        with pytest.raises(ControlError, match="no images"):
+            _send(control_dir, "fail")
+        with pytest.raises(ControlError, match="unknown command"):
+            _send(control_dir, "explode")
+        # Bad arguments are reported, not fatal to the server
+        with pytest.raises(ControlError):
+            _send(control_dir, "fail", unexpected=1)
+        assert _send(control_dir, "echo") == {}
+
+        # The socket and key are private to the user
+        assert os.stat(control_dir / "key").st_mode & 0o077 == 0
+        assert os.stat(control_dir / "run").st_mode & 0o077 == 0
+    finally:
+        server.stop()
+    assert not (control_dir / "key").exists()
+
+
+def test_client_reports_missing_server_and_wrong_key(control_dir):
+    with pytest.raises(ControlError, match="not running"):
+        _send(control_dir, "status")
+
+    server = _server(control_dir, {"status": lambda: "ok"})
+    assert server.start()
+    try:
+        (control_dir / "key").write_bytes(b"guessed")
+        with pytest.raises(ControlError, match="rejected"):
+            _send(control_dir, "status")
+    finally:
+        server.stop()
+
+
+def test_only_one_server_per_address(control_dir):
+    first = _server(control_dir, {})
+    assert first.start()
+    try:
+        assert not _server(control_dir, {}).start()
+    finally:
+        first.stop()
+
+    # A socket file left behind by a crash is replaced
+    (control_dir / "run" / "control.sock").touch()
+    second = _server(control_dir, {"status": lambda: "ok"})
+    assert second.start()
+    try:
+        assert _send(control_dir, "status") == "ok"
+    finally:
+        second.stop()
+
+
+def test_ctl_client_does_not_import_pil(control_dir):
+    """Test that `rotato ctl` stays a thin client"""
+    script = (
+        "import sys\n"
+        "from rotato.__main__ import ctl_command\n"
+        "code = ctl_command(['status'])\n"
+        "assert 'PIL' not in sys.modules, 'PIL was imported'\n"
+        "sys.exit(code)\n"
+    )
+    env = dict(os.environ, ROTATO_CONTROL_ADDRESS=str(control_dir / "none.sock"))
+    env["XDG_RUNTIME_DIR"] = str(control_dir)
+    result = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, env=env, timeout=30
+    )
+    assert result.returncode == 1, result.stderr
+    assert "not running" in result.stderr
+
+
+def _make_app(tmp: Path, clock: VirtualClock) -> DesktopBackgroundManager:
+    (tmp / "a").mkdir()
+    for i in range(3):
+        Image.new("RGB", (64, 36), (i * 40, 0, 0)).save(tmp / "a" / f"{i}.png")
+    config = {
+        "global": {
+            "rotation_interval_minutes": 10,
+            "cache_file": str(tmp / "cache.json"),
+            "stats_file": None,
+            "selection_state_file": None,
+            "history_file": None,
+            "supported_formats": [".png"],
+            "max_recursion_depth": 2,
+            "hotkeys": {},
+        },
+        "monitors": [{"monitor_name": "auto", "image_sources": [str(tmp / "a")]}],
+    }
+    (tmp / "config.yaml").write_text(yaml.dump(config), encoding="utf-8")
+    app = DesktopBackgroundManager(
+        str(tmp / "config.yaml"),
+        monitor_manager=MonitorManager(FakeMonitorDetector(parse_monitor_spec("64x36,64x36"))),
+        wallpaper_manager=WallpaperManager(FakeWallpaperSetter()),
+        clock=clock,
+        timer_factory=clock.timer,
+    )
+    app.discover_and_filter_images()
+    return app
+
+
+def test_app_commands(control_dir):
+    clock = VirtualClock(start=1000.0)
+    app = _make_app(control_dir, clock)
+    handlers = app.control_handlers()
+    setter = app.wallpaper_manager.setter
+    app.start_rotation()
+    try:
+        shown = handlers["next"](monitor="FAKE2")
+        assert shown["FAKE2"]["current"] == setter.current["FAKE2"]
+        assert setter.batches == 2
+
+        target = str(control_dir / "a" / "1.png")
+        assert handlers["set"](path=target, monitor="FAKE1") == ["FAKE1"]
+        assert setter.current["FAKE1"] == target
+        with pytest.raises(FileNotFoundError):
+            handlers["set"](path=str(control_dir / "missing.png"))
+        with pytest.raises(ValueError, match="Unknown monitor"):
+            handlers["next"](monitor="NOPE")
+
+        handlers["pause"]()
+        assert clock.pending == 0
+        clock.run_until(clock() + 3600)
+        assert app.history.current("FAKE1") == target
+        status = handlers["status"]()
+        assert status["paused"] and status["monitors"]["FAKE1"]["pool"] == 3
+
+        handlers["resume"]()
+        assert clock.pending == 2
+        clock.run_until(clock() + 600)
+        assert len(app.history.last_n(10, "FAKE1")) == 3
+        assert "counters" in handlers["stats"]()
+
+        # Previews come with thumbnails from the analysis pass
+        preview = handlers["preview"](count=2, thumbnails=True)
+        assert preview["FAKE1"]["current"]["path"] == app.history.current("FAKE1")
+        assert len(preview["FAKE2"]["upcoming"]) <= 2
+        thumbnail = base64.b64decode(preview["FAKE1"]["current"]["thumbnail"])
+        assert Image.open(io.BytesIO(thumbnail)).size == (64, 36)
+    finally:
+        app.stop_rotation()
@@ -0,0 +1,100 @@
+"""Tests for the index and verify commands."""
+
+import os
+import tempfile
+from pathlib import Path
+
+import yaml
+from PIL import Image
+
+from rotato.__main__ import compact_cache, index_command, show_stats, verify_command
+from rotato.cache import ImageCache
+
+
+def _make_image(path: Path, color=(120, 120, 120)) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", (64, 36), color).save(path)
+    return path
+
+
+def _write_config(tmp: Path, monitors) -> str:
+    config = {
+        "global": {
+            "cache_file": str(tmp / "cache.json"),
+            "supported_formats": [".png"],
+            "max_recursion_depth": 10,
+            "thumbnail_size": 0,
+        },
+        "monitors": monitors,
+    }
+    config_path = tmp / "config.yaml"
+    config_path.write_text(yaml.safe_dump(config), encoding="utf-8")
+    return str(config_path)
+
+
+def _cached_names(tmp: Path):
+    cache = ImageCache(str(tmp / "cache.json"))
+    return sorted(Path(path).relative_to(tmp.resolve()).as_posix() for path in cache.cache)
+
+
+def test_index_uses_each_monitors_recursive_setting():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        for folder in ("flat", "deep"):
+            _make_image(tmp / folder / "top.png")
+            _make_image(tmp / folder / "sub" / "nested.png", (10, 10, 10))
+        config = _write_config(
+            tmp,
+            [
+                {"monitor_name": "A", "image_sources": [str(tmp / "flat")], "recursive": False},
+                {"monitor_name": "B", "image_sources": [str(tmp / "deep")]},
+            ],
+        )
+
+        index_command(["--config", config, "--workers", "1"])
+
+        assert _cached_names(tmp) == ["deep/sub/nested.png", "deep/top.png", "flat/top.png"]
+
+
+def test_verify_clean_and_corrupted_cache(capsys):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        images = [_make_image(tmp / "images" / f"{i}.png", (i * 60, 0, 0)) for i in range(3)]
+        config = _write_config(
+            tmp, [{"monitor_name": "auto", "image_sources": [str(tmp / "images")]}]
+        )
+        index_command(["--config", config, "--workers", "1"])
+        capsys.readouterr()
+
+        assert verify_command(["--config", config, "--deep"]) == 0
+        assert "3 entries: 3 ok, 0 missing, 0 stale" in capsys.readouterr().out
+
+        # One image deleted, one rewritten, one changed in place with its old mtime
+        images[0].unlink()
+        _make_image(images[1], (0, 0, 250))
+        stat = images[2].stat()
+        data = bytearray(images[2].read_bytes())
+        data[-20] ^= 0xFF
+        images[2].write_bytes(bytes(data))
+        os.utime(images[2], ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        assert verify_command(["--config", config]) == 1
+        assert "3 entries: 1 ok, 1 missing, 1 stale" in capsys.readouterr().out
+        assert verify_command(["--config", config, "--deep"]) == 1
+        assert "3 entries: 0 ok, 1 missing, 2 stale" in capsys.readouterr().out
+
+        assert verify_command(["--config", config, "--deep", "--fix", "--workers", "1"]) == 0
+        assert _cached_names(tmp) == ["images/1.png", "images/2.png"]
+        assert verify_command(["--config", config, "--deep"]) == 0
+
+
+def test_cache_and_stats_commands_dont_write_a_config(monkeypatch, capsys):
+    """Test that --compact-cache and --stats read the config without creating one"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        monkeypatch.chdir(tmpdir)
+
+        compact_cache()
+        show_stats()
+
+        assert "Removed 0 of 0 cache entries" in capsys.readouterr().out
+        assert not (Path(tmpdir) / "config.yaml").exists()
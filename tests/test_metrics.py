@@ -0,0 +1,35 @@
+"""Tests for performance metrics."""
+
+from rotato.metrics import MetricsRegistry, format_prometheus
+
+
+def test_counters_and_histograms():
+    """Test counter increments and timing observations"""
+    registry = MetricsRegistry()
+    registry.inc("cache_hits_total")
+    registry.inc("cache_hits_total", 2)
+    registry.inc("filter_rejected_total", 3, {"criterion": "brightness"})
+    registry.observe("image_decode_seconds", 0.02)
+    with registry.timer("image_decode_seconds"):
+        pass
+
+    snapshot = registry.snapshot()
+
+    assert snapshot["counters"]["cache_hits_total"] == 3
+    assert snapshot["counters"]['filter_rejected_total{criterion="brightness"}'] == 3
+    assert snapshot["histograms"]["image_decode_seconds"]["count"] == 2
+
+
+def test_prometheus_format():
+    """Test Prometheus textfile rendering"""
+    registry = MetricsRegistry()
+    registry.inc("filter_rejected_total", 1, {"criterion": "min_width"})
+    registry.observe("cache_save_seconds", 2.0)
+
+    text = format_prometheus(registry.snapshot())
+
+    assert "# TYPE rotato_filter_rejected_total counter" in text
+    assert 'rotato_filter_rejected_total{criterion="min_width"} 1' in text
+    assert 'rotato_cache_save_seconds_bucket{le="+Inf"} 1' in text
+    assert 'rotato_cache_save_seconds_bucket{le="1.0"} 0' in text
+    assert "rotato_cache_save_seconds_count 1" in text
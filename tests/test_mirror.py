@@ -0,0 +1,67 @@
+"""Tests for the local mirror of network sources."""
+
+import tempfile
+from pathlib import Path
+
+from rotato.mirror import LocalMirror
+
+
+def _make_files(directory: Path, count: int, size: int):
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = directory / f"{i}.jpg"
+        path.write_bytes(bytes([i]) * size)
+        paths.append(str(path))
+    return paths
+
+
+def test_serves_local_copies_after_prefetch():
+    """Test that prefetched images resolve to local copies, even once the source is gone"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        paths = _make_files(tmp / "share", 3, 1000)
+        mirror = LocalMirror(str(tmp / "mirror"), max_size_mb=1)
+
+        assert mirror.resolve(paths[0]) == paths[0]  # Miss: copied in the background
+        mirror.prefetch(paths[1:])
+        assert mirror.wait_idle(10)
+
+        local = mirror.resolve(paths[0])
+        assert local != paths[0] and Path(local).read_bytes() == Path(paths[0]).read_bytes()
+        Path(paths[1]).unlink()
+        assert Path(mirror.resolve(paths[1])).exists()
+        mirror.stop()
+
+        # The index survives a restart
+        restarted = LocalMirror(str(tmp / "mirror"), max_size_mb=1)
+        assert restarted.resolve(paths[1]) != paths[1]
+
+
+def test_size_bound_evicts_least_recently_used():
+    """Test that urgent copies evict old ones and background fill only uses free space"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        paths = _make_files(tmp / "share", 5, 400 * 1024)
+        mirror = LocalMirror(str(tmp / "mirror"), max_size_mb=1, workers=1)
+
+        mirror.prefetch(paths)
+        assert mirror.wait_idle(10)
+        assert list(mirror.entries) == paths[:2]
+        assert mirror.total_bytes <= mirror.max_bytes
+
+        mirror.resolve(paths[0])  # Most recently used now
+        mirror.prefetch([paths[4]], urgent=True)
+        assert mirror.wait_idle(10)
+        assert list(mirror.entries) == [paths[0], paths[4]]
+        assert len(list((tmp / "mirror").glob("*.jpg"))) == 2
+
+
+def test_only_configured_sources_are_mirrored():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        [shared] = _make_files(tmp / "share", 1, 10)
+        [local] = _make_files(tmp / "local", 1, 10)
+        mirror = LocalMirror(str(tmp / "mirror"), sources=[str(tmp / "share")])
+        assert mirror.mirrors(shared) and not mirror.mirrors(local)
+        assert mirror.resolve(local) == local
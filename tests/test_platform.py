@@ -0,0 +1,167 @@
+"""Tests for the Linux and fake platform backends."""
+
+import subprocess
+import tempfile
+from pathlib import Path
+
+from rotato import archives
+from rotato.monitors import MonitorInfo
+from rotato.platform.fake import FakeMonitorDetector, FakeWallpaperSetter, parse_monitor_spec
+from rotato.platform.linux import (
+    LinuxMonitorDetector,
+    LinuxWallpaperSetter,
+    detect_desktop,
+    parse_xrandr,
+    read_drm_monitors,
+)
+from rotato.wallpaper import WallpaperManager
+
+XRANDR_OUTPUT = """Screen 0: minimum 320 x 200, current 4480 x 1440, maximum 16384 x 16384
+eDP-1 connected 1920x1080+0+360 (normal left inverted right x axis y axis) 344mm x 193mm
+   1920x1080     60.01*+
+HDMI-1 connected primary 2560x1440+1920+0 (normal left inverted right x axis y axis) 597mm x 336mm
+   2560x1440     59.95*+
+DP-1 disconnected (normal left inverted right x axis y axis)
+DP-2 connected (normal left inverted right x axis y axis)
+"""
+
+LEFT = MonitorInfo(handle=0, width=1920, height=1080, x=0, y=0, is_primary=True, name="L")
+RIGHT = MonitorInfo(handle=1, width=1920, height=1080, x=1920, y=0, is_primary=False, name="R")
+THIRD = MonitorInfo(handle=2, width=1280, height=1024, x=3840, y=0, is_primary=False, name="T")
+
+
+class RecordingRunner:
+    def __init__(self, stdout=""):
+        self.stdout = stdout
+        self.calls = []
+
+    def __call__(self, command, **kwargs):
+        self.calls.append((command, kwargs.get("input")))
+        return subprocess.CompletedProcess(command, 0, self.stdout, "")
+
+
+def test_parse_xrandr_skips_disconnected_and_off_outputs():
+    """Test that only active outputs are reported, with geometry and primary flag"""
+    monitors = parse_xrandr(XRANDR_OUTPUT)
+    assert [(m.name, m.width, m.height, m.x, m.y, m.is_primary) for m in monitors] == [
+        ("eDP-1", 1920, 1080, 0, 360, False),
+        ("HDMI-1", 2560, 1440, 1920, 0, True),
+    ]
+
+
+def test_read_drm_monitors():
+    """Test the sysfs fallback used without X"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        for name, status, modes in [
+            ("card0-eDP-1", "connected", "2256x1504\n1920x1080\n"),
+            ("card0-HDMI-A-1", "disconnected", ""),
+            ("card0-DP-2", "connected", "3840x2160\n"),
+        ]:
+            (root / name).mkdir()
+            (root / name / "status").write_text(status + "\n")
+            (root / name / "modes").write_text(modes)
+
+        monitors = read_drm_monitors(root)
+    assert [(m.name, m.width, m.height, m.x, m.is_primary) for m in monitors] == [
+        ("DP-2", 3840, 2160, 0, True),
+        ("eDP-1", 2256, 1504, 3840, False),
+    ]
+
+
+def test_detector_caches_results(monkeypatch):
+    """Test that detection within the cache window doesn't run xrandr again"""
+    monkeypatch.setenv("DISPLAY", ":0")
+    monkeypatch.setattr("shutil.which", lambda name: "/usr/bin/" + name)
+    runner = RecordingRunner(XRANDR_OUTPUT)
+    now = [0.0]
+    detector = LinuxMonitorDetector(cache_seconds=2.0, runner=runner, clock=lambda: now[0])
+
+    assert len(detector.detect_monitors()) == 2
+    now[0] = 1.0
+    detector.detect_monitors()
+    assert len(runner.calls) == 1
+    now[0] = 3.0
+    detector.detect_monitors()
+    assert len(runner.calls) == 2
+
+
+def test_setter_batches_all_monitors_in_one_command():
+    """Test that feh and KDE update every monitor with a single process"""
+    runner = RecordingRunner()
+    setter = LinuxWallpaperSetter("feh", runner)
+    assert setter.set_wallpapers([(RIGHT, "/w/b.jpg"), (LEFT, "/w/a.jpg")]) == [True, True]
+    assert runner.calls == [(["feh", "--no-fehbg", "--bg-fill", "/w/a.jpg", "/w/b.jpg"], None)]
+
+    setter.set_wallpaper(RIGHT, "/w/c.jpg")
+    assert runner.calls[-1][0][-2:] == ["/w/a.jpg", "/w/c.jpg"]
+
+    runner = RecordingRunner()
+    setter = LinuxWallpaperSetter("kde", runner)
+    setter.set_wallpapers([(LEFT, "/w/a.jpg"), (RIGHT, "/w/b.jpg")])
+    assert len(runner.calls) == 1
+    assert '"1": "/w/b.jpg"' in runner.calls[0][0][-1]
+
+
+def test_setter_reports_each_monitor():
+    """Test that a failed per-monitor command only fails its own monitor"""
+
+    def runner(command, **kwargs):
+        code = 1 if "monitorR" in " ".join(command) else 0
+        return subprocess.CompletedProcess(command, code, "", "no such property")
+
+    setter = LinuxWallpaperSetter("xfce", runner)
+    assert setter.set_wallpapers([(LEFT, "/w/a.jpg"), (RIGHT, "/w/b.jpg")]) == [True, False]
+
+
+def test_manager_skips_monitors_whose_image_cannot_be_prepared(monkeypatch):
+    """Test that one failed archive extraction doesn't abort the whole batch"""
+
+    def materialize(path):
+        raise OSError("archive is gone")
+
+    monkeypatch.setattr(archives, "materialize", materialize)
+    setter = FakeWallpaperSetter(fail_paths=[str(Path("/w/bad.jpg").resolve())])
+    manager = WallpaperManager(setter)
+    updated = manager.set_wallpapers(
+        [
+            (LEFT, "/w/a.jpg"),
+            (RIGHT, "/w/pack.zip!/b.jpg"),
+            (THIRD, "/w/bad.jpg"),
+        ]
+    )
+    assert updated == ["L"]
+    assert setter.current == {"L": str(Path("/w/a.jpg").resolve())}
+
+
+def test_gnome_setter_uses_one_dconf_load():
+    """Test that GNOME's light and dark pictures are set in one call"""
+    runner = RecordingRunner()
+    LinuxWallpaperSetter("gnome", runner).set_wallpaper(LEFT, "/w/a b.jpg")
+    [(command, stdin)] = runner.calls
+    assert command == ["dconf", "load", "/org/gnome/desktop/background/"]
+    assert "picture-uri='file:///w/a%20b.jpg'" in stdin
+    assert "picture-uri-dark=" in stdin
+
+
+def test_detect_desktop():
+    assert detect_desktop({"XDG_CURRENT_DESKTOP": "ubuntu:GNOME"}) == "gnome"
+    assert detect_desktop({"XDG_CURRENT_DESKTOP": "KDE"}) == "kde"
+    assert detect_desktop({}) == "feh"
+
+
+def test_fake_backend():
+    """Test the in-memory backend used for headless runs"""
+    monitors = parse_monitor_spec("1920x1080, 1080x1920")
+    assert [(m.name, m.width, m.x) for m in monitors] == [("FAKE1", 1920, 0), ("FAKE2", 1080, 1920)]
+    detector = FakeMonitorDetector(monitors)
+    assert detector.detect_monitors() == monitors
+
+    setter = FakeWallpaperSetter(fail_paths=["/bad.jpg"])
+    assert setter.set_wallpapers([(monitors[0], "/a.jpg"), (monitors[1], "/b.jpg")]) == [
+        True,
+        True,
+    ]
+    assert not setter.set_wallpaper(monitors[0], "/bad.jpg")
+    assert setter.current == {"FAKE1": "/a.jpg", "FAKE2": "/b.jpg"}
+    assert setter.batches == 2
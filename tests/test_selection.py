@@ -0,0 +1,137 @@
+"""Tests for wallpaper selection strategies."""
+
+import random
+from collections import Counter
+
+from rotato.catalog import ImageCatalog
+from rotato.selection import (
+    LeastRecentlyShownStrategy,
+    ShuffleBagStrategy,
+    WeightedRandomStrategy,
+    create_strategy,
+)
+
+
+def _pool(catalog, count, folder="/w"):
+    return catalog.intern_many([f"{folder}/{i}.jpg" for i in range(count)])
+
+
+def _show(strategy, count, start=0.0):
+    shown = []
+    for step in range(count):
+        image_id = strategy.pick()
+        strategy.mark_shown(image_id, start + step)
+        shown.append(image_id)
+    return shown
+
+
+def test_shuffle_bag_shows_everything_before_repeating():
+    """Test that each cycle covers the whole pool once, with no repeat across cycles"""
+    catalog = ImageCatalog()
+    pool = _pool(catalog, 20)
+    strategy = ShuffleBagStrategy(catalog, random.Random(1))
+    strategy.set_pool(pool)
+
+    shown = _show(strategy, 60)
+    for cycle in range(3):
+        assert sorted(shown[cycle * 20 : (cycle + 1) * 20]) == sorted(pool)
+    assert all(a != b for a, b in zip(shown, shown[1:]))
+
+
+def test_shuffle_bag_applies_pool_changes_incrementally():
+    """Test that a changed pool keeps the current cycle going"""
+    catalog = ImageCatalog()
+    pool = _pool(catalog, 10)
+    strategy = ShuffleBagStrategy(catalog, random.Random(2))
+    strategy.set_pool(pool)
+    shown = _show(strategy, 4)
+
+    removed = [image_id for image_id in pool if image_id not in shown][0]
+    added = catalog.intern("/w/new.jpg")
+    strategy.set_pool([image_id for image_id in pool if image_id != removed] + [added])
+    rest = _show(strategy, 6)
+
+    assert removed not in rest
+    assert sorted(shown + rest) == sorted(set(pool) - {removed} | {added})
+
+
+def test_shuffle_bag_state_roundtrip():
+    """Test that a restored bag finishes the saved cycle"""
+    catalog = ImageCatalog()
+    pool = _pool(catalog, 8)
+    strategy = ShuffleBagStrategy(catalog, random.Random(3))
+    strategy.set_pool(pool)
+    shown = _show(strategy, 3)
+
+    # A new catalog numbers paths differently; state is keyed by path
+    other = ImageCatalog()
+    other.intern("/elsewhere/x.jpg")
+    other_pool = _pool(other, 8)
+    restored = ShuffleBagStrategy(other, random.Random(4))
+    restored.load_state(strategy.to_state())
+    restored.set_pool(other_pool)
+
+    rest = [other.path(image_id) for image_id in _show(restored, 5)]
+    assert sorted(rest + [catalog.path(image_id) for image_id in shown]) == sorted(
+        catalog.path(image_id) for image_id in pool
+    )
+
+
+def test_shuffle_bag_takes_new_images_into_the_current_cycle():
+    """Test that images added by a rescan join the cycle, live or after a restart"""
+    catalog = ImageCatalog()
+    pool = _pool(catalog, 8)
+    strategy = ShuffleBagStrategy(catalog, random.Random(5))
+    strategy.set_pool(pool)
+    shown = [catalog.path(image_id) for image_id in _show(strategy, 3)]
+    state = strategy.to_state()
+
+    rescanned = ImageCatalog()
+    new_pool = rescanned.intern_many(["/w/new.jpg"] + catalog.paths(pool))
+    new_id = rescanned.find("/w/new.jpg")
+
+    strategy.set_catalog(rescanned)
+    strategy.set_pool(new_pool)
+    restored = ShuffleBagStrategy(rescanned, random.Random(6))
+    restored.load_state(state)
+    restored.set_pool(new_pool)
+
+    for selector in (strategy, restored):
+        rest = _show(selector, 6)
+        assert new_id in rest
+        assert sorted(shown + rescanned.paths(rest)) == sorted(rescanned.paths(new_pool))
+
+
+def test_lru_shows_least_recently_shown():
+    """Test that LRU cycles through never-shown images first, then the oldest"""
+    catalog = ImageCatalog()
+    pool = _pool(catalog, 5)
+    strategy = LeastRecentlyShownStrategy(catalog, random.Random(5))
+    strategy.set_pool(pool)
+
+    first = _show(strategy, 5)
+    assert sorted(first) == sorted(pool)
+    assert _show(strategy, 5, start=100.0) == first
+
+    restored = LeastRecentlyShownStrategy(catalog, random.Random(6))
+    restored.load_state(strategy.to_state())
+    restored.set_pool(pool)
+    assert restored.upcoming(5) == first
+
+
+def test_weighted_follows_source_weights():
+    """Test that the alias table picks sources in proportion to their weight"""
+    catalog = ImageCatalog()
+    heavy = _pool(catalog, 10, "/heavy")
+    light = _pool(catalog, 10, "/light")
+    strategy = WeightedRandomStrategy(catalog, random.Random(7), {"/heavy": 3})
+    strategy.set_pool(list(heavy) + list(light))
+
+    counts = Counter(catalog.path(strategy.pick()).split("/")[1] for _ in range(8000))
+    assert 2.6 < counts["heavy"] / counts["light"] < 3.4
+
+
+def test_create_strategy_falls_back_to_shuffle():
+    """Test that unknown strategy names use the shuffle bag"""
+    strategy = create_strategy("bogus", ImageCatalog())
+    assert isinstance(strategy, ShuffleBagStrategy)
@@ -0,0 +1,80 @@
+"""Tests for the virtual clock and the rotation simulator."""
+
+from rotato.simulate import VirtualClock, simulate
+
+
+def test_virtual_clock_fires_timers_in_order():
+    clock = VirtualClock(start=100.0)
+    fired = []
+    clock.timer(30, lambda: fired.append(("b", clock()))).start()
+    clock.timer(10, lambda: fired.append(("a", clock()))).start()
+    cancelled = clock.timer(20, lambda: fired.append(("x", clock())))
+    cancelled.start()
+    cancelled.cancel()
+    assert not cancelled.is_alive()
+
+    assert clock.run_until(125) == 1
+    assert clock() == 125
+    assert clock.pending == 1
+    clock.run_until(200)
+    assert fired == [("a", 110.0), ("b", 130.0)]
+    assert [tick.due for tick in clock.ticks] == [110.0, 130.0]
+
+
+def test_timers_started_by_callbacks_run_in_the_same_pass():
+    clock = VirtualClock()
+    fired = []
+
+    def repeat():
+        fired.append(clock())
+        clock.timer(60, repeat).start()
+
+    clock.timer(60, repeat).start()
+    clock.run_until(600)
+    assert fired == [60.0 * i for i in range(1, 11)]
+
+
+def test_charged_cpu_time_shows_up_as_drift():
+    clock = VirtualClock(charge_cpu=True)
+    fired = []
+
+    def busy():
+        fired.append(clock())
+        sum(range(20000))
+        clock.timer(60, busy).start()
+
+    clock.timer(60, busy).start()
+    clock.run_until(6000)
+    assert fired[-1] > 60.0 * len(fired)
+
+
+def test_shuffle_simulation_is_fair_and_on_schedule():
+    report = simulate(images=50, monitors="1920x1080,1080x1920", days=1, interval_minutes=10)
+
+    assert set(report.monitors) == {"FAKE1", "FAKE2"}
+    for stats in report.monitors.values():
+        # The first image at start, then one every 10 minutes for a day
+        assert stats.rotations == 145
+        assert stats.distinct_shown == 50
+        assert (stats.min_shows, stats.max_shows) == (2, 3)
+        assert stats.max_interval_error == 0
+        assert stats.drift_seconds == 0
+    assert report.ticks == 2 * 144
+    assert report.max_tick_delay == 0
+
+
+def test_lru_never_repeats_before_the_whole_pool_was_shown():
+    report = simulate(images=20, days=0.5, interval_minutes=5, strategy="lru")
+
+    stats = report.monitors["FAKE1"]
+    assert stats.min_repeat_gap == 20
+    assert stats.median_repeat_gap == 20
+
+
+def test_simulation_is_reproducible_with_a_seed():
+    def run(seed):
+        report = simulate(images=200, days=2, interval_minutes=15, strategy="random", seed=seed)
+        return report.monitors["FAKE1"]
+
+    assert run(1) == run(1)
+    assert run(1) != run(2)
@@ -0,0 +1,72 @@
+"""Tests for background indexing throttling."""
+
+import threading
+
+from rotato.throttle import Throttle
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_image_budget_limits_rate():
+    """Test that acquiring beyond the budget waits for tokens"""
+    clock = FakeClock()
+    throttle = Throttle(max_images_per_sec=10, clock=clock, sleep=clock.sleep)
+
+    for _ in range(30):
+        throttle.acquire()
+
+    # One second of burst, then 20 more images at 10/s
+    assert abs(clock.now - 2.0) < 1e-9
+
+
+def test_byte_budget_limits_rate():
+    """Test that large reads are spread out"""
+    clock = FakeClock()
+    throttle = Throttle(max_bytes_per_sec=1000, clock=clock, sleep=clock.sleep)
+
+    throttle.acquire(nbytes=3000)
+
+    assert abs(clock.now - 2.0) < 1e-9
+
+
+def test_backs_off_under_load():
+    """Test exponential backoff while load is high"""
+    clock = FakeClock()
+    loads = iter([2.0, 2.0, 2.0, 0.1])
+    throttle = Throttle(
+        max_load_per_cpu=0.75, clock=clock, sleep=clock.sleep, load=lambda: next(loads)
+    )
+
+    throttle.acquire()
+
+    assert clock.sleeps == [0.25, 0.5, 1.0]
+
+
+def test_shared_between_threads():
+    """Test that concurrent callers spend the budget exactly once each"""
+    clock = FakeClock()
+    throttle = Throttle(max_images_per_sec=10, clock=clock, sleep=lambda seconds: None)
+
+    def spend():
+        for _ in range(250):
+            throttle.acquire()
+
+    threads = [threading.Thread(target=spend) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Without advancing the clock every image is charged against the same bucket
+    assert throttle._image_tokens == 10 - 1000
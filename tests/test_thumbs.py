@@ -0,0 +1,139 @@
+"""Tests for the thumbnail pack and thumbnails made during analysis."""
+
+import io
+import os
+import tempfile
+from pathlib import Path
+
+from PIL import Image
+
+from rotato import thumbs
+from rotato.cache import ImageCache
+from rotato.thumbs import ThumbnailPack, encode_thumbnail
+
+
+def _jpeg(color, size=(40, 30)) -> bytes:
+    return encode_thumbnail(Image.new("RGB", size, color))
+
+
+def test_pack_round_trip_and_concurrent_writers():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        first = ThumbnailPack(tmpdir)
+        second = ThumbnailPack(tmpdir)
+        red, blue = _jpeg("red"), _jpeg("blue")
+        assert first.get("a") is None
+
+        first.add("a", red)
+        # Reading maps the pack; later appends extend the mapping
+        assert first.get("a") == red
+        second.add("b", blue)
+        first.add("c", blue)
+        assert first.get("c") == blue
+        first.save()
+        second.save()
+
+        # Both writers appended to one pack and the saved index has both
+        assert len(list(Path(tmpdir).glob("*.pack"))) == 1
+        reloaded = ThumbnailPack(tmpdir)
+        assert {key: reloaded.get(key) for key in "abc"} == {"a": red, "b": blue, "c": blue}
+        assert reloaded.open_image("a").size == (40, 30)
+        first.close()
+        second.close()
+        reloaded.close()
+
+
+def test_dead_thumbnails_are_compacted(monkeypatch):
+    monkeypatch.setattr(thumbs, "COMPACT_MIN_BYTES", 0)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        pack = ThumbnailPack(tmpdir)
+        keep = _jpeg("green")
+        for i in range(5):
+            pack.add(str(i), _jpeg((i * 50, 0, 0)))
+        pack.add("keep", keep)
+        pack.save()
+        old_pack = pack.pack_name
+        stale = ThumbnailPack(tmpdir)
+        stale.add("warm", keep)
+
+        pack.retain({"keep"})
+        pack.save()
+        assert pack.pack_name != old_pack
+        assert [p.name for p in Path(tmpdir).glob("*.pack")] == [pack.pack_name]
+        assert pack.pack_bytes == len(keep)
+        assert ThumbnailPack(tmpdir).get("keep") == keep
+
+        # A writer that appended to the old pack loses what it put there and
+        # moves to the new pack
+        stale.add("late", keep)
+        assert stale.pack_name == pack.pack_name
+        stale.save()
+        reloaded = ThumbnailPack(tmpdir)
+        assert "warm" not in reloaded
+        assert reloaded.get("late") == keep and reloaded.get("keep") == keep
+
+
+def test_analysis_stores_upright_thumbnails():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        paths = []
+        for i, size in enumerate([(800, 400), (300, 600), (50, 20)]):
+            path = tmp / f"{i}.png"
+            Image.new("RGB", size, (i * 80, 90, 0)).save(path)
+            paths.append(str(path))
+        # Stored sideways with an EXIF tag saying to rotate it upright
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        rotated = tmp / "rotated.jpg"
+        Image.new("RGB", (400, 200), "white").save(rotated, exif=exif)
+        paths.append(str(rotated))
+
+        cache = ImageCache(str(tmp / "cache.json"))
+        cache.thumbnail_size = 128
+        report = cache.analyze_many(paths, workers=2)
+        assert report.analyzed == 4
+        cache.save_cache()
+
+        sizes = [Image.open(io.BytesIO(cache.thumbnail(path))).size for path in paths]
+        assert sizes == [(128, 64), (64, 128), (50, 20), (64, 128)]
+        assert (tmp / "cache.thumbs" / "index.json").exists()
+
+        # A copy reuses the thumbnail of the same content
+        copy = tmp / "copy.png"
+        copy.write_bytes(Path(paths[0]).read_bytes())
+        os.utime(copy, (os.stat(paths[0]).st_atime, os.stat(paths[0]).st_mtime))
+        reloaded = ImageCache(str(tmp / "cache.json"))
+        reloaded.thumbnail_size = 128
+        assert reloaded.analyze_many([str(copy)], workers=1).moved == 1
+        assert reloaded.thumbnail(str(copy)) == cache.thumbnail(paths[0])
+
+
+def test_missing_thumbnails_are_backfilled_not_treated_as_stale(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = []
+        for i in range(3):
+            path = Path(tmpdir) / f"{i}.png"
+            Image.new("RGB", (64, 48), (i * 80, 0, 0)).save(path)
+            paths.append(str(path))
+        cache_file = str(Path(tmpdir) / "cache.json")
+        cache = ImageCache(cache_file)
+        assert cache.analyze_many(paths, workers=1).analyzed == 3
+        assert cache.thumbnail(paths[0]) is None
+        cache.save_cache()
+        assert not (Path(tmpdir) / "cache.thumbs").exists()
+
+        # Turning thumbnails on (or losing the pack) doesn't invalidate analysis
+        reloaded = ImageCache(cache_file)
+        reloaded.thumbnail_size = 32
+        assert reloaded.analyze_many(paths, workers=1).cached == 3
+        assert reloaded.missing_thumbnails(paths) == [str(Path(p).resolve()) for p in paths]
+
+        # A thumbnail that can't be stored is not retried on every lookup
+        monkeypatch.setattr(reloaded.thumbnails, "add", lambda content_id, data: False)
+        assert reloaded.backfill_thumbnails(paths[:1]) == 0
+        assert reloaded.backfill_thumbnails(paths[:1]) == 0
+        assert reloaded.get_image_info(paths[0]) is not None
+        monkeypatch.undo()
+
+        assert reloaded.backfill_thumbnails(paths, workers=2) == 2
+        assert Image.open(io.BytesIO(reloaded.thumbnail(paths[1]))).size == (32, 24)
+        assert reloaded.missing_thumbnails(paths) == []